@@ -0,0 +1,109 @@
+"""
+Benchmark: ImageGenerationClient throughput and latency against the local fake Imagen server.
+
+Usage:
+    python benchmarks/bench_image_client.py [--images 64] [--concurrency 1,4,8,16]
+                                            [--latency 0.3] [--jitter 0.1] [--error-rate 0.05]
+                                            [--image-size 1024x576]
+
+For each concurrency level a fresh client generates --images distinct prompts
+through a thread pool (as process_slides.py does). Reported per level:
+images/s, p50/p95 latency of one image (including retries), retries, failures
+and the number of TCP connections the server saw (keep-alive reuse).
+Finally the same prompts are run twice through a GeneratedImageCache to show
+the cold and warm (all hits) throughput.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from fake_imagen_server import FakeImagenServer, parse_size
+from src.utils.image_client import ImageGenerationClient, ImageGenerationError
+from src.utils.generated_image_cache import GeneratedImageCache
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run(client: ImageGenerationClient, prompts, concurrency: int, job):
+    latencies = []
+    failures = 0
+
+    def timed(prompt):
+        t0 = time.perf_counter()
+        try:
+            job(client, prompt)
+            return time.perf_counter() - t0, None
+        except ImageGenerationError as e:
+            return time.perf_counter() - t0, e
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency, error in pool.map(timed, prompts):
+            latencies.append(latency)
+            failures += error is not None
+    return time.perf_counter() - t0, latencies, failures
+
+
+def report(label: str, elapsed: float, latencies, failures: int, extra: str = ""):
+    print(f"{label:<18s} {len(latencies) / elapsed:8.1f} images/s  "
+          f"p50 {percentile(latencies, 50) * 1000:7.1f} ms  p95 {percentile(latencies, 95) * 1000:7.1f} ms  "
+          f"failed {failures:<3d} {extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the image generation client")
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--concurrency", default="1,4,8,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--image-size", type=parse_size, default=(1024, 576))
+    args = parser.parse_args()
+
+    with FakeImagenServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                          image_size=args.image_size, seed=0) as server:
+        print(f"Fake server: latency {args.latency}+-{args.jitter}s, error rate {args.error_rate}, "
+              f"image {args.image_size[0]}x{args.image_size[1]} ({len(server.image_b64) * 3 // 4 / 1e6:.1f} MB)")
+
+        def make_client(concurrency):
+            # Short backoff so injected errors do not dominate the measurement
+            return ImageGenerationClient(api_key="bench", base_url=server.base_url, pool_size=concurrency,
+                                         backoff_base=0.05, backoff_max=1.0)
+
+        levels = [int(c) for c in args.concurrency.split(",")]
+        for concurrency in levels:
+            prompts = [f"bench c={concurrency} #{i}" for i in range(args.images)]
+            connections = server.stats["connections"]
+            with make_client(concurrency) as client:
+                elapsed, latencies, failures = run(client, prompts, concurrency,
+                                                   lambda c, prompt: c.generate(prompt))
+                report(f"concurrency={concurrency}", elapsed, latencies, failures,
+                       f"retries {client.stats['retries']:<3d} "
+                       f"connections {server.stats['connections'] - connections}")
+
+        # Cold vs. warm generated-image cache
+        concurrency = max(levels)
+        prompts = [f"bench cache #{i}" for i in range(args.images)]
+        with tempfile.TemporaryDirectory() as tmp, make_client(concurrency) as client:
+            cache = GeneratedImageCache(tmp)
+            for label in ("cache cold", "cache warm"):
+                hits = cache.stats["hits"]
+                elapsed, latencies, failures = run(client, prompts, concurrency,
+                                                   lambda c, prompt: c.generate_cached(prompt, cache))
+                report(label, elapsed, latencies, failures,
+                       f"hit rate {(cache.stats['hits'] - hits) / len(prompts):.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: IntelligentPdfParser sequential vs. parallel page analysis.
+
+Usage:
+    python benchmarks/bench_pdf_parser.py [--pages 500] [--workers 1,2,4]
+
+A synthetic PDF is generated with PyMuPDF: every page has a title, a few
+paragraphs in two columns, a table-like grid of numbers, a logo shared by all
+pages and one page-specific picture. Each configuration parses the same file
+into a fresh image directory, and the resulting decks are compared so the
+parallel mode is checked to be equivalent to the sequential one.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import pymupdf as fitz
+from PIL import Image
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.converters.pdf_intelligent import IntelligentPdfParser
+
+LOREM = ("Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor "
+         "incididunt ut labore et dolore magna aliqua. ")
+
+
+def png_bytes(size, color) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def make_pdf(path: str, pages: int):
+    logo = png_bytes((240, 80), (0, 51, 102))
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page(width=960, height=540)
+        page.insert_text((40, 60), f"Section {i // 10} / Slide {i}", fontsize=28)
+        page.insert_image(fitz.Rect(800, 20, 920, 60), stream=logo)
+        for col in range(2):
+            rect = fitz.Rect(40 + col * 440, 100, 440 + col * 440, 300)
+            page.insert_textbox(rect, LOREM * 3, fontsize=11)
+        for row in range(6):
+            cells = "   ".join(f"{(i * 31 + row * 7 + c) % 1000:>5}" for c in range(8))
+            page.insert_text((40, 330 + row * 18), cells, fontsize=10)
+        page.insert_image(fitz.Rect(700, 330, 920, 500), stream=png_bytes((64, 48), (i % 256, 80, 160)))
+    doc.save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark IntelligentPdfParser page analysis")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts (1 = sequential)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "synthetic.pdf")
+        t0 = time.perf_counter()
+        make_pdf(pdf_path, args.pages)
+        print(f"Generated {args.pages}-page PDF in {time.perf_counter() - t0:.2f}s "
+              f"({os.path.getsize(pdf_path) / 1e6:.1f} MB), CPUs: {os.cpu_count()}")
+
+        baseline = None
+        for workers in (int(w) for w in args.workers.split(",")):
+            image_dir = os.path.join(tmp, f"images_{workers}")
+            pdf_parser = IntelligentPdfParser(workers=workers)
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                deck = pdf_parser.parse(pdf_path, output_image_dir=image_dir)
+            elapsed = time.perf_counter() - t0
+
+            # Image paths differ only by directory; compare the rest of the deck
+            dumped = deck.model_dump_json().replace(image_dir, "<images>")
+            if baseline is None:
+                baseline = (elapsed, dumped)
+            assert dumped == baseline[1], f"workers={workers} produced a different deck"
+            print(f"workers={workers:<2d} {elapsed:7.2f}s  {args.pages / elapsed:7.1f} pages/s  "
+                  f"speedup {baseline[0] / elapsed:.2f}x  ({len(os.listdir(image_dir))} image files)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: PdfToMarkdownConverter text extraction backends (pypdf vs. PyMuPDF).
+
+Usage:
+    python benchmarks/bench_pdf_to_md.py [--pages 500] [--backends pypdf,pymupdf] [--workers 1,2,4]
+                                         [--pdf path/to/file.pdf ...]
+
+By default the synthetic PDF of bench_pdf_parser.py is used as the corpus;
+pass --pdf (repeatable) to run on real documents instead. Each backend is run
+with every worker count on the same files, writing the Markdown with
+convert_to_file. Outputs of one backend are checked to be identical across
+worker counts (the backends themselves differ in line breaking, so only the
+slide count is compared between them).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_pdf_parser import make_pdf
+from src.converters.pdf_to_md import PdfToMarkdownConverter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PdfToMarkdownConverter backends")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--backends", default="pypdf,pymupdf", help="Comma-separated backend names")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts (1 = sequential)")
+    parser.add_argument("--pdf", action="append", help="Benchmark these PDFs instead of a synthetic one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = args.pdf
+        if not corpus:
+            corpus = [os.path.join(tmp, "synthetic.pdf")]
+            t0 = time.perf_counter()
+            make_pdf(corpus[0], args.pages)
+            print(f"Generated {args.pages}-page PDF in {time.perf_counter() - t0:.2f}s "
+                  f"({os.path.getsize(corpus[0]) / 1e6:.1f} MB)")
+        print(f"Corpus: {len(corpus)} file(s), CPUs: {os.cpu_count()}")
+
+        slide_counts = {}
+        reference = None
+        for backend in args.backends.split(","):
+            baseline = None
+            for workers in (int(w) for w in args.workers.split(",")):
+                converter = PdfToMarkdownConverter(backend=backend, workers=workers)
+                outputs = []
+                slides = 0
+                t0 = time.perf_counter()
+                for i, pdf_path in enumerate(corpus):
+                    md_path = os.path.join(tmp, f"{backend}_{workers}_{i}.md")
+                    slides += converter.convert_to_file(pdf_path, md_path)
+                    outputs.append(md_path)
+                elapsed = time.perf_counter() - t0
+
+                texts = []
+                for md_path in outputs:
+                    with open(md_path, "r", encoding="utf-8") as f:
+                        texts.append(f.read())
+                if baseline is None:
+                    baseline = texts
+                assert texts == baseline, f"{backend} workers={workers} produced different Markdown"
+                slide_counts[backend] = slides
+
+                if reference is None:
+                    reference = elapsed
+                chars = sum(len(text) for text in texts)
+                print(f"{backend:<8s} workers={workers:<2d} {elapsed:7.2f}s  {slides / elapsed:8.1f} slides/s  "
+                      f"{chars / 1e6:6.2f}M chars  vs first run {reference / elapsed:5.2f}x")
+
+        if len(set(slide_counts.values())) > 1:
+            print(f"Note: backends produced different slide counts: {slide_counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark: consecutive small-deck builds with and without the template cache.
+
+Usage:
+    python benchmarks/bench_template_cache.py [--template PATH] [--builds 100]
+
+"cold" opens the .pptx from disk for every build (template_cache=None);
+"warm" reuses one TemplateCache, so only the first build parses the template.
+Output is written to an in-memory buffer to keep disk I/O out of the timing.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.builder.slide_builder import SlideBuilder
+from src.builder.template_cache import TemplateCache
+from src.markdown_parser.md_parser import MarkdownParser
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DEFAULT_TEMPLATE = os.path.join(ROOT, '..', 'original_templates', 'JMDC2022_16対9(標準)_v1.1.pptx')
+
+
+def run(label: str, deck, template: str, builds: int, cache):
+    timings = []
+    for _ in range(builds):
+        t0 = time.perf_counter()
+        builder = SlideBuilder(template, template_cache=cache)
+        # build() prints a message per deck; keep the benchmark output readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            builder.build(deck, io.BytesIO())
+        timings.append(time.perf_counter() - t0)
+
+    total = sum(timings)
+    first = timings[0]
+    timings.sort()
+    print(f"{label:<6} total {total:7.2f} s  mean {total / builds * 1000:7.1f} ms  "
+          f"median {timings[builds // 2] * 1000:7.1f} ms  first {first * 1000:7.1f} ms")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark template cache (cold vs. warm builds).")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE, help="Path to PowerPoint template")
+    parser.add_argument("--input", default=os.path.join(ROOT, 'sample_proposal.md'), help="Small Markdown deck")
+    parser.add_argument("--builds", type=int, default=100, help="Number of consecutive builds")
+    args = parser.parse_args()
+
+    with open(args.input, "r", encoding="utf-8") as f:
+        deck = MarkdownParser().parse(f.read())
+    print(f"{args.builds} builds of a {len(deck.slides)}-slide deck using {os.path.basename(args.template)}")
+
+    cold = run("cold", deck, args.template, args.builds, None)
+    warm = run("warm", deck, args.template, args.builds, TemplateCache())
+    print(f"Speedup: {cold / warm:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
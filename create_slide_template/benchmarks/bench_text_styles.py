@@ -0,0 +1,83 @@
+"""
+Benchmark: styling text runs with per-property font setters vs. precompiled <a:rPr> stamping.
+
+Usage:
+    python benchmarks/bench_text_styles.py [--runs 20000]
+
+"legacy" is the previous SlideBuilder code path: add_run() and then set
+font.name / size / bold / italic / color through the python-pptx proxies.
+"compiled" stamps a copy of the rPr compiled once per style (src/builder/text_styles.py).
+Both spread the runs over the same text boxes so only run creation + styling is timed,
+and the resulting XML is compared to make sure the output is identical.
+"""
+import argparse
+import os
+import sys
+import time
+
+from lxml import etree
+from pptx import Presentation
+from pptx.util import Inches, Pt
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.builder.text_styles import StyleEngine
+from src.config.style_config import StyleConfig, TextStyle
+
+STYLES = list(TextStyle)
+# Runs are spread over this many text boxes (run insertion cost grows with the paragraph length)
+N_BOXES = 100
+
+
+def make_paragraphs(n_boxes: int):
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    return [
+        slide.shapes.add_textbox(Inches(1), Inches(1), Inches(4), Inches(1)).text_frame.paragraphs[0]
+        for _ in range(n_boxes)
+    ]
+
+
+def legacy(paragraphs, runs: int):
+    for i in range(runs):
+        style_type = STYLES[i % len(STYLES)]
+        run = paragraphs[i % N_BOXES].add_run()
+        run.text = f"テキスト {i}"
+
+        style = StyleConfig.get_font_style(style_type)
+        font = run.font
+        font.name = style["name"]
+        font.size = Pt(style["size"]) if style["size"] else None
+        font.bold = style["bold"]
+        font.italic = style["italic"]
+        if style["color"]:
+            font.color.rgb = style["color"]
+
+
+def compiled(paragraphs, runs: int):
+    engine = StyleEngine()
+    for i in range(runs):
+        style_type = STYLES[i % len(STYLES)]
+        engine.for_text_style(style_type).add_run(paragraphs[i % N_BOXES], f"テキスト {i}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text run styling")
+    parser.add_argument("--runs", type=int, default=20000)
+    args = parser.parse_args()
+
+    results = {}
+    for label, fn in (("legacy", legacy), ("compiled", compiled)):
+        paragraphs = make_paragraphs(N_BOXES)
+        t0 = time.perf_counter()
+        fn(paragraphs, args.runs)
+        elapsed = time.perf_counter() - t0
+        results[label] = (elapsed, [etree.tostring(p._p) for p in paragraphs])
+        print(f"{label:9s} {elapsed:7.3f}s  {args.runs / elapsed:10,.0f} runs/s")
+
+    assert results["legacy"][1] == results["compiled"][1], "styled XML differs"
+    print(f"speedup: {results['legacy'][0] / results['compiled'][0]:.2f}x (identical XML)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Local stand-in for the Imagen :predict endpoint (offline tests and benchmarks).
+
+Usage:
+    python benchmarks/fake_imagen_server.py [--port 8765] [--latency 0.5] [--jitter 0.2]
+                                            [--error-rate 0.05] [--image-size 1024x576]
+
+Then point the image generation client at it:
+    export IMAGE_API_BASE_URL=http://127.0.0.1:8765/v1beta/models
+    export GEMINI_API_KEY=dummy
+
+POST <base>/<model>:predict with {"instances": [{"prompt": ...}], "parameters": {"sampleCount": n}}
+is answered with {"predictions": [{"mimeType": "image/png", "bytesBase64Encoded": ...}] * n}
+after `latency` +- `jitter` seconds. A fraction `error_rate` of the requests fail with
+`error_status` (503 by default, 429 also sends Retry-After). The image is a PNG of random
+pixels (so it does not compress) of the given size, generated once per process.
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+from PIL import Image
+
+
+class FakeImagenServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.5, jitter: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 503, image_size: Tuple[int, int] = (1024, 576),
+                 seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+        width, height = image_size
+        buf = io.BytesIO()
+        Image.frombytes("RGB", (width, height), os.urandom(width * height * 3)).save(buf, format="PNG")
+        self.image_b64 = base64.b64encode(buf.getvalue()).decode("ascii")
+
+        self.stats = {"requests": 0, "errors": 0, "connections": 0}
+        self._stats_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1beta/models"
+
+    def start(self) -> "FakeImagenServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-imagen", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _draw(self) -> Tuple[float, bool]:
+        with self._random_lock:
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            fail = self._random.random() < self.error_rate
+        return delay, fail
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # keep-alive
+
+            def setup(self):
+                super().setup()
+                server._count("connections")
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if not self.path.split("?")[0].endswith(":predict"):
+                    return self._reply(404, {"error": {"code": 404, "message": f"Unknown path {self.path}"}})
+                try:
+                    request = json.loads(body)
+                    request["instances"][0]["prompt"]
+                except (ValueError, KeyError, IndexError, TypeError):
+                    return self._reply(400, {"error": {"code": 400, "message": "Invalid :predict request"}})
+
+                server._count("requests")
+                delay, fail = server._draw()
+                time.sleep(delay)
+                if fail:
+                    server._count("errors")
+                    headers = {"Retry-After": "1"} if server.error_status == 429 else {}
+                    return self._reply(server.error_status,
+                                       {"error": {"code": server.error_status, "message": "Injected error"}}, headers)
+
+                sample_count = int(request.get("parameters", {}).get("sampleCount", 1))
+                prediction = {"mimeType": "image/png", "bytesBase64Encoded": server.image_b64}
+                self._reply(200, {"predictions": [prediction] * sample_count})
+
+            def _reply(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def parse_size(value: str) -> Tuple[int, int]:
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake Imagen :predict server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="Mean response time in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Uniform +- jitter of the response time")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of the failed requests")
+    parser.add_argument("--image-size", type=parse_size, default=(1024, 576), help="WIDTHxHEIGHT")
+    args = parser.parse_args()
+
+    server = FakeImagenServer(args.host, args.port, args.latency, args.jitter, args.error_rate,
+                              args.error_status, args.image_size)
+    print(f"Fake Imagen server on {server.base_url} "
+          f"(latency {args.latency}+-{args.jitter}s, error rate {args.error_rate}, "
+          f"image {args.image_size[0]}x{args.image_size[1]}, {len(server.image_b64) * 3 // 4 / 1e6:.1f} MB)")
+    print(f"  export IMAGE_API_BASE_URL={server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
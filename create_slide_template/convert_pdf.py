@@ -7,8 +7,13 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.converters.pdf_intelligent import IntelligentPdfParser
 from src.converters.deck_to_md import DeckToMarkdownConverter
+from src.converters.pdf_pipeline import (stream_pdf_pages, write_intermediate, intermediate_edited,
+                                        intermediate_stale)
 from src.markdown_parser.md_parser import MarkdownParser
+from src.markdown_parser.slide_cache import SlideCache
 from src.builder.slide_builder import SlideBuilder
+from src.builder.package_writer import COMPRESSION_POLICIES
+from src.utils.image_pipeline import ImagePipeline
 
 def main():
     parser = argparse.ArgumentParser(description="Convert PDF to JMDC PowerPoint Template via Intermediate Markdown.")
@@ -17,6 +22,22 @@ def main():
     parser.add_argument("--template", help="Path to PowerPoint template", 
                         default="/Users/hiratani/Documents/AntigravityProjects/original_templates/JMDC2022_16対9(標準)_基本テンプレ_v1.2.pptx")
     parser.add_argument("--intermediate", help="Intermediate Markdown path", default=None)
+    parser.add_argument("--incremental", action="store_true", help="Reuse unchanged slides from the previous output (tracked in <output>.manifest.json)")
+    parser.add_argument("--compression", choices=sorted(COMPRESSION_POLICIES), default="default",
+                        help="Zip compression policy (default: store images uncompressed, deflate XML)")
+    parser.add_argument("--cache-dir", help="Reuse parsed slides whose Markdown is unchanged (slide cache directory)", default=None)
+    parser.add_argument("--image-dpi", type=int, default=0,
+                        help="Downsample pictures to this resolution at their on-slide size, e.g. 150 (default: 0, embed originals)")
+    parser.add_argument("--image-cache-dir", help="Keep downsampled pictures across runs (image cache directory)", default=None)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Analyze PDF pages in this many processes (default: 1, sequential)")
+    parser.add_argument("--page-cache-dir", default=None,
+                        help="Per-page analysis cache / resume checkpoints (default: .page_cache next to the intermediate Markdown)")
+    parser.add_argument("--no-page-cache", action="store_true", help="Analyze every page again instead of reusing cached pages")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream pages extract -> intermediate Markdown -> build without holding the whole deck in memory")
+    parser.add_argument("--max-in-flight", type=int, default=8,
+                        help="--stream: maximum number of extracted pages waiting to be built (default: 8)")
     parser.add_argument("--only-extract", action="store_true", help="Stop after generating intermediate Markdown (for manual editing)")
 
     args = parser.parse_args()
@@ -28,17 +49,37 @@ def main():
         if not output_dir: output_dir = "."
         args.intermediate = os.path.join(output_dir, f"{base_name}_intermediate.md")
 
+    # An intermediate Markdown edited since it was extracted from this same PDF takes precedence over re-extracting
+    if not args.only_extract and intermediate_edited(args.intermediate, args.input_pdf):
+        print(f"Intermediate Markdown {args.intermediate} was edited after extraction; building from it "
+              f"(delete it to re-extract from the PDF).")
+        build_pptx(args, read_intermediate(args))
+        return
+    if intermediate_stale(args.intermediate, args.input_pdf):
+        print(f"Warning: {args.intermediate} was edited, but was extracted from a different version of "
+              f"{args.input_pdf}; re-extracting overwrites it.")
+
     # 1. Parse PDF intelligently
     print(f"Reading PDF: {args.input_pdf}")
     if not os.path.exists(args.input_pdf):
         print(f"Error: Input file not found: {args.input_pdf}")
         return
 
-    # Use Intelligent Parser which returns PresentationDeck directly
-    pdf_parser = IntelligentPdfParser()
+    # Images and the page cache go next to intermediate MD
+    image_dir = os.path.join(os.path.dirname(args.intermediate), "extracted_images")
+    page_cache_dir = None
+    if not args.no_page_cache:
+        page_cache_dir = args.page_cache_dir or os.path.join(os.path.dirname(args.intermediate), ".page_cache")
+    
+    # Use Intelligent Parser which returns PresentationDeck directly.
+    # Pages analyzed by an earlier (possibly failed) run of the same PDF are reused from the page cache.
+    pdf_parser = IntelligentPdfParser(workers=args.workers, page_cache_dir=page_cache_dir)
+    
+    if args.stream:
+        run_streaming(args, pdf_parser, image_dir)
+        return
+    
     try:
-        # Images go next to intermediate MD
-        image_dir = os.path.join(os.path.dirname(args.intermediate), "extracted_images")
         deck = pdf_parser.parse(args.input_pdf, output_image_dir=image_dir)
         print(f"PDF Analysis successful. Identified {len(deck.slides)} slides.")
     except Exception as e:
@@ -52,13 +93,9 @@ def main():
     serializer = DeckToMarkdownConverter()
     md_content = serializer.convert(deck)
     
-    # Ensure dir exists
-    int_dir = os.path.dirname(args.intermediate)
-    if int_dir and not os.path.exists(int_dir):
-        os.makedirs(int_dir)
-        
-    with open(args.intermediate, "w", encoding="utf-8") as f:
-        f.write(md_content)
+    # Written atomically; the marker remembers what we wrote (and from which PDF),
+    # so a later run can tell whether the user edited it (checked at startup, see above)
+    write_intermediate(args.intermediate, md_content, args.input_pdf)
     
     print("Intermediate Markdown saved. You can edit this file now.")
     
@@ -66,26 +103,53 @@ def main():
         print("Extraction complete. Exiting as requested.")
         return
 
-    # 3. Read back Markdown
-    # In a real workflow, this might be a separate step/script run by the user.
-    # For now, we proceed automatically to demonstrate validity.
-    print("Reading back Markdown content...")
+    # 3. Build PowerPoint from the extracted deck (the Markdown we just wrote has the same content)
+    build_pptx(args, deck)
+
+def read_intermediate(args):
+    print(f"Reading back Markdown content from {args.intermediate}...")
     with open(args.intermediate, "r", encoding="utf-8") as f:
         final_md_text = f.read()
     
-    md_parser = MarkdownParser()
+    md_parser = MarkdownParser(cache=SlideCache(args.cache_dir) if args.cache_dir else None)
     final_deck = md_parser.parse(final_md_text)
+    if args.cache_dir:
+        print(f"Slide cache: {len(md_parser.changed_slides)} of {len(final_deck.slides)} slides changed {md_parser.changed_slides}")
+    return final_deck
 
-    # 4. Build PowerPoint
+def build_pptx(args, slides):
     print(f"Generating PowerPoint using template...")
     if not os.path.exists(args.template):
          print(f"Error: Template file not found: {args.template}")
          return
          
-    builder = SlideBuilder(args.template)
-    builder.build(final_deck, args.output)
+    image_pipeline = ImagePipeline(dpi=args.image_dpi, cache_dir=args.image_cache_dir) if args.image_dpi > 0 else None
+    builder = SlideBuilder(args.template, image_pipeline=image_pipeline)
+    builder.build(slides, args.output, incremental_build=args.incremental, compression=args.compression)
     
     print(f"Success! Saved to {args.output}")
 
+def run_streaming(args, pdf_parser, image_dir):
+    """
+    Pages flow extract -> intermediate Markdown -> build one at a time through bounded queues,
+    so at most --max-in-flight extracted pages are held in memory and extraction overlaps with building.
+    The intermediate Markdown is still written (for later manual editing) but not read back.
+    """
+    if not args.only_extract and not os.path.exists(args.template):
+        print(f"Error: Template file not found: {args.template}")
+        return
+    
+    print(f"Streaming conversion (max {args.max_in_flight} pages in flight), "
+          f"writing intermediate Markdown to {args.intermediate}...")
+    pages = stream_pdf_pages(pdf_parser, args.input_pdf, image_dir, max_in_flight=args.max_in_flight,
+                             intermediate_path=args.intermediate)
+    
+    if args.only_extract:
+        n_pages = sum(1 for _ in pages)
+        print(f"Extraction complete ({n_pages} slides). Exiting as requested.")
+        return
+    
+    build_pptx(args, pages)
+
 if __name__ == "__main__":
     main()
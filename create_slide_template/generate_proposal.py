@@ -1,35 +1,53 @@
 import os
 import sys
+import time
 import argparse
 
 # Adjust path to include src to allow running from root
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.markdown_parser.md_parser import MarkdownParser
+from src.markdown_parser.slide_cache import SlideCache
 from src.builder.slide_builder import SlideBuilder
+from src.builder.package_writer import COMPRESSION_POLICIES
+from src.utils.image_pipeline import ImagePipeline
+from src.builder.batch import load_manifest, expand_glob, run_batch, print_summary
 
 def main():
     parser = argparse.ArgumentParser(description="Generate PowerPoint proposal from Markdown.")
-    parser.add_argument("input_file", help="Path to input Markdown file")
+    parser.add_argument("input_file", nargs="?", help="Path to input Markdown file")
     parser.add_argument("--template", help="Path to PowerPoint template", 
                         default="/Users/hiratani/Documents/AntigravityProjects/original_templates/JMDC2022_16対9(標準)_基本テンプレ_v1.2.pptx")
     parser.add_argument("--output", help="Output file path", default="output/proposal.pptx")
+    parser.add_argument("--incremental", action="store_true", help="Reuse unchanged slides from the previous output (tracked in <output>.manifest.json)")
+    parser.add_argument("--compression", choices=sorted(COMPRESSION_POLICIES), default="default",
+                        help="Zip compression policy (default: store images uncompressed, deflate XML)")
+    parser.add_argument("--cache-dir", help="Reuse parsed slides whose Markdown is unchanged (slide cache directory)", default=None)
+    parser.add_argument("--image-dpi", type=int, default=0,
+                        help="Downsample pictures to this resolution at their on-slide size, e.g. 150 (default: 0, embed originals)")
+    parser.add_argument("--image-cache-dir", help="Keep downsampled pictures across runs (image cache directory)", default=None)
+    
+    # Batch mode
+    parser.add_argument("--manifest", help="Batch mode: JSON list of {\"input\": ..., \"output\": ...}", default=None)
+    parser.add_argument("--glob", help="Batch mode: glob of Markdown files (written to --output-dir)", default=None)
+    parser.add_argument("--output-dir", help="Output directory for --glob", default="output")
+    parser.add_argument("--workers", type=int, help="Batch mode: number of worker processes (default: CPU count)", default=None)
     
     args = parser.parse_args()
 
+    if args.manifest or args.glob:
+        run_batch_mode(args)
+        return
+    
+    if not args.input_file:
+        parser.error("input_file is required unless --manifest or --glob is given")
+
     # 1. Parse Markdown
     print(f"Parsing {args.input_file}...")
     if not os.path.exists(args.input_file):
         print(f"Error: Input file not found: {args.input_file}")
         return
 
-    with open(args.input_file, "r", encoding="utf-8") as f:
-        md_text = f.read()
-    
-    md_parser = MarkdownParser()
-    deck = md_parser.parse(md_text)
-    print(f"Parsed {len(deck.slides)} slides. Deck Title: {deck.title}")
-
     # 2. Build Presentation
     print(f"Building presentation using template: {os.path.basename(args.template)}...")
     if not os.path.exists(args.template):
@@ -41,10 +59,42 @@ def main():
     if output_dir and not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    builder = SlideBuilder(args.template)
-    builder.build(deck, args.output)
+    image_pipeline = ImagePipeline(dpi=args.image_dpi, cache_dir=args.image_cache_dir) if args.image_dpi > 0 else None
+    builder = SlideBuilder(args.template, image_pipeline=image_pipeline)
+    md_parser = MarkdownParser(cache=SlideCache(args.cache_dir) if args.cache_dir else None)
+    
+    # Stream slides from the file straight into the builder so memory stays flat
+    with open(args.input_file, "r", encoding="utf-8") as f:
+        builder.build(md_parser.parse_iter(f), args.output, incremental_build=args.incremental,
+                      compression=args.compression)
+    
+    if args.cache_dir:
+        print(f"Slide cache: {len(md_parser.changed_slides)} of {len(md_parser.slide_hashes)} slides changed {md_parser.changed_slides}")
     
     print(f"Success! Presentation saved to {args.output}")
 
+def run_batch_mode(args):
+    try:
+        jobs = load_manifest(args.manifest) if args.manifest else expand_glob(args.glob, args.output_dir)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if not jobs:
+        print("Error: No input files found for batch mode.")
+        sys.exit(1)
+    if not os.path.exists(args.template):
+         print(f"Error: Template file not found: {args.template}")
+         sys.exit(1)
+
+    print(f"Batch building {len(jobs)} decks with {args.workers or os.cpu_count()} workers...")
+    t0 = time.perf_counter()
+    results = run_batch(jobs, args.template, workers=args.workers, cache_dir=args.cache_dir,
+                        incremental_build=args.incremental, compression=args.compression,
+                        image_dpi=args.image_dpi, image_cache_dir=args.image_cache_dir)
+    print_summary(results, time.perf_counter() - t0)
+
+    if not all(r["ok"] for r in results):
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
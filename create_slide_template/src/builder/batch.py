@@ -0,0 +1,164 @@
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.builder.slide_builder import SlideBuilder
+from src.builder.template_cache import DEFAULT_TEMPLATE_CACHE
+from src.markdown_parser.md_parser import MarkdownParser
+from src.markdown_parser.slide_cache import SlideCache
+from src.utils.image_pipeline import ImagePipeline
+
+Job = Tuple[str, str] # (input Markdown, output PPTX)
+
+
+def load_manifest(manifest_path: str) -> List[Job]:
+    """
+    マニフェスト (JSON) を読み込む。
+    Format: [{"input": "reports/a.md", "output": "output/a.pptx"}, ...]
+    相対パスはマニフェストのあるディレクトリ基準。
+    """
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    for entry in entries:
+        jobs.append((
+            os.path.join(base_dir, entry["input"]),
+            os.path.join(base_dir, entry["output"])
+        ))
+    check_unique_outputs(jobs)
+    return jobs
+
+
+def expand_glob(pattern: str, output_dir: str) -> List[Job]:
+    """
+    glob に一致する各 Markdown を output_dir 以下に .pptx で出力するジョブを作る。
+    パターンのワイルドカードより下のディレクトリ構成は保つ
+    ("reports/**/*.md" なら reports/q1/a.md -> <output_dir>/q1/a.pptx)。
+    """
+    base_dir = _glob_base_dir(pattern)
+    jobs = []
+    for input_path in sorted(glob.glob(pattern, recursive=True)):
+        rel_path = os.path.splitext(os.path.relpath(input_path, base_dir))[0]
+        jobs.append((input_path, os.path.join(output_dir, f"{rel_path}.pptx")))
+    check_unique_outputs(jobs)
+    return jobs
+
+
+def _glob_base_dir(pattern: str) -> str:
+    """ワイルドカードを含まない先頭部分のディレクトリ"""
+    parts = os.path.normpath(pattern).split(os.sep)
+    for i, part in enumerate(parts):
+        if glob.has_magic(part):
+            return os.sep.join(parts[:i]) or os.curdir
+    return os.path.dirname(pattern) or os.curdir
+
+
+def check_unique_outputs(jobs: List[Job]):
+    """複数のジョブが同じファイルに出力する場合は ValueError (並列に書くと互いに上書きしてしまう)"""
+    seen: Dict[str, str] = {}
+    for input_path, output_path in jobs:
+        key = os.path.normcase(os.path.abspath(output_path))
+        if key in seen:
+            raise ValueError(f"{seen[key]} and {input_path} would both be written to {output_path}")
+        seen[key] = input_path
+
+
+def _init_worker(template_path: str):
+    # ワーカーごとにテンプレートを1回だけパースしておく (以降のビルドはコピーを使う)
+    DEFAULT_TEMPLATE_CACHE.load(template_path)
+
+
+def build_one(input_path: str, output_path: str, template_path: str, cache_dir: Optional[str] = None,
+              incremental_build: bool = False, compression: str = "default",
+              image_dpi: int = 0, image_cache_dir: Optional[str] = None) -> Dict:
+    """
+    1ファイルを parse -> build -> save する。例外は結果に記録して返す (バッチを止めない)。
+    incremental_build / compression / image_dpi / image_cache_dir は単体実行時のオプションと同じ。
+    """
+    t0 = time.perf_counter()
+    result = {"input": input_path, "output": output_path, "ok": False, "seconds": 0.0, "error": None}
+    image_pipeline = ImagePipeline(dpi=image_dpi, cache_dir=image_cache_dir) if image_dpi > 0 else None
+    try:
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        builder = SlideBuilder(template_path, image_pipeline=image_pipeline)
+        with open(input_path, "r", encoding="utf-8") as f:
+            md_parser = MarkdownParser(cache=SlideCache(cache_dir) if cache_dir else None)
+            builder.build(md_parser.parse_iter(f), output_path, incremental_build=incremental_build,
+                          compression=compression)
+        result["ok"] = True
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if image_pipeline is not None:
+            image_pipeline.shutdown()
+    result["seconds"] = time.perf_counter() - t0
+    return result
+
+
+def run_batch(jobs: List[Job], template_path: str, workers: Optional[int] = None,
+              cache_dir: Optional[str] = None, **build_options) -> List[Dict]:
+    """
+    ジョブを ProcessPoolExecutor で並列に処理し、入力順の結果リストを返す。
+    build_options は build_one にそのまま渡す (incremental_build, compression, image_dpi, image_cache_dir)。
+
+    ワーカーが異常終了するとプールが壊れ、実行中・待機中のジョブは全て BrokenProcessPool になる。
+    どのジョブが原因かは分からないので、巻き込まれたジョブは新しいプールで1件ずつやり直し、
+    それでも異常終了したジョブだけをエラーとして記録する。
+    """
+    results: List[Optional[Dict]] = [None] * len(jobs)
+
+    broken = _run_pool(jobs, range(len(jobs)), results, template_path, workers, cache_dir, build_options)
+    if broken:
+        print(f"Warning: A worker process died; retrying {len(broken)} affected jobs one at a time.")
+    for i in broken:
+        _run_pool(jobs, [i], results, template_path, 1, cache_dir, build_options, record_broken=True)
+
+    return results
+
+
+def _run_pool(jobs: List[Job], indices: Iterable[int], results: List[Optional[Dict]], template_path: str,
+              workers: Optional[int], cache_dir: Optional[str], build_options: Dict,
+              record_broken: bool = False) -> List[int]:
+    """indices のジョブを1つのプールで処理して results に書く。プールが壊れて終わらなかったジョブを返す"""
+    broken = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(template_path,)) as pool:
+        futures = {
+            pool.submit(build_one, jobs[i][0], jobs[i][1], template_path, cache_dir, **build_options): i
+            for i in indices
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool) and not record_broken:
+                    broken.append(i)
+                    continue
+                input_path, output_path = jobs[i]
+                results[i] = {"input": input_path, "output": output_path, "ok": False,
+                              "seconds": 0.0, "error": f"{type(e).__name__}: {e}"}
+    return sorted(broken)
+
+
+def print_summary(results: List[Dict], wall_seconds: float):
+    print("\n=== Batch Summary ===")
+    for r in results:
+        status = "OK  " if r["ok"] else "FAIL"
+        line = f"[{status}] {r['seconds']:7.2f}s  {r['input']} -> {r['output']}"
+        if r["error"]:
+            line += f"\n         {r['error']}"
+        print(line)
+
+    n_ok = sum(1 for r in results if r["ok"])
+    cpu_seconds = sum(r["seconds"] for r in results)
+    print(f"{n_ok}/{len(results)} succeeded, {len(results) - n_ok} failed. "
+          f"Wall {wall_seconds:.2f}s, summed build time {cpu_seconds:.2f}s")
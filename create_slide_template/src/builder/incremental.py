@@ -0,0 +1,236 @@
+import copy
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+from typing import Dict, List, Optional
+
+from pptx import Presentation
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.package import XmlPart
+from pptx.parts.image import ImagePart
+from pptx.parts.slide import SlidePart
+
+from src.schema.slide_schema import SlideContent
+
+# SlideBuilder の出力内容が変わったら上げる (以前の出力を再利用しないようにするため)
+BUILDER_VERSION = "2"
+
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_R_ATTR_PREFIX = "{%s}" % R_NS
+
+# スライド自身の rels のうち、コピーせずに新しいスライド側のものを使う種類
+_SKIPPED_SLIDE_RELS = {RT.SLIDE_LAYOUT, RT.NOTES_SLIDE}
+
+
+class UnsupportedSlide(Exception):
+    """前回出力のスライドをそのまま移植できない (再生成が必要)"""
+
+
+def manifest_path_for(output_path: str) -> str:
+    return f"{output_path}.manifest.json"
+
+
+def build_key(*paths: str, settings: str = "") -> str:
+    """
+    テンプレート・レイアウト定義など、全スライドの出力に影響する入力のハッシュ。
+    settings: ファイル以外で出力に影響する設定 (画像の縮小 dpi・JPEG 品質など)
+    """
+    h = hashlib.sha256(BUILDER_VERSION.encode("utf-8"))
+    for path in paths:
+        with open(path, "rb") as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    h.update(settings.encode("utf-8"))
+    return h.hexdigest()
+
+
+def slide_fingerprint(content: SlideContent) -> str:
+    """
+    SlideContent の内容ハッシュ。
+    参照している画像ファイルは中身を読まず、パス + mtime + サイズで変更を検出する。
+    """
+    h = hashlib.sha256(content.model_dump_json().encode("utf-8"))
+    image_paths = [content.image_path] + [e.content for e in content.elements if e.type == "image"]
+    for path in image_paths:
+        if path and os.path.exists(path):
+            st = os.stat(path)
+            h.update(f"{path}:{st.st_mtime_ns}:{st.st_size}".encode("utf-8"))
+    return h.hexdigest()
+
+
+class PreviousBuild:
+    """
+    前回の出力 PPTX とサイドカーのマニフェスト。
+    fingerprint から前回のスライドを引けるようにする (位置が移動したスライドも再利用できる)。
+    """
+
+    def __init__(self, prs, slide_offset: int, fingerprints: List[str]):
+        self.prs = prs
+        self._slides = list(prs.slides)
+        self._by_fingerprint: Dict[str, int] = {}
+        for i, fp in enumerate(fingerprints):
+            self._by_fingerprint.setdefault(fp, slide_offset + i)
+
+    @classmethod
+    def load(cls, output_path: str, key: str) -> Optional["PreviousBuild"]:
+        manifest_path = manifest_path_for(output_path)
+        if not (os.path.exists(output_path) and os.path.exists(manifest_path)):
+            return None
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("build_key") != key:
+                print("Incremental build: template or builder changed, rebuilding all slides.")
+                return None
+            # 出力ファイルは後で上書きされるので、メモリに読み込んでから開く
+            with open(output_path, "rb") as f:
+                prs = Presentation(io.BytesIO(f.read()))
+            return cls(prs, manifest["slide_offset"], manifest["slides"])
+        except Exception as e:
+            print(f"Warning: Ignoring previous build of {output_path}: {e}")
+            return None
+
+    def find(self, fingerprint: str):
+        i = self._by_fingerprint.get(fingerprint)
+        if i is None or i >= len(self._slides):
+            return None
+        return self._slides[i]
+
+
+def discard_manifest(output_path: str):
+    """出力を上書きする前に呼ぶ (保存が中断したとき、古いマニフェストが新しい出力を指さないように)"""
+    try:
+        os.remove(manifest_path_for(output_path))
+    except FileNotFoundError:
+        pass
+
+
+def write_manifest(output_path: str, key: str, slide_offset: int, fingerprints: List[str]):
+    manifest = {
+        "build_key": key,
+        "slide_offset": slide_offset,
+        "slides": fingerprints,
+    }
+    # 一時ファイルに書いてから置き換える (中断しても前回のマニフェストか新しいものが必ず残る)
+    path = manifest_path_for(output_path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def check_transplantable(src_slide):
+    """前回のスライドが移植可能か (他スライドへの内部リンクなどが無いか) を確認する"""
+    for rel in src_slide.part.rels.values():
+        if rel.is_external or rel.reltype in _SKIPPED_SLIDE_RELS:
+            continue
+        if isinstance(rel.target_part, SlidePart):
+            raise UnsupportedSlide(f"slide links to another slide ({rel.reltype})")
+
+
+def transplant_slide(src_slide, dest_prs, layout):
+    """
+    前回の出力のスライドを dest_prs の末尾に移植する。
+    スライド XML をコピーし、チャート (埋め込みブック含む) などの関連パートは
+    新しいパート名で複製、画像は dest 側の画像パートに (重複排除して) 追加する。
+    """
+    check_transplantable(src_slide)
+
+    new_slide = dest_prs.slides.add_slide(layout)
+    dest_part = new_slide.part
+
+    rid_map = {}
+    for rId, rel in src_slide.part.rels.items():
+        if rel.reltype in _SKIPPED_SLIDE_RELS:
+            continue
+        if rel.is_external:
+            rid_map[rId] = dest_part.relate_to(rel.target_ref, rel.reltype, is_external=True)
+        elif isinstance(rel.target_part, ImagePart):
+            _, rid_map[rId] = dest_part.get_or_add_image_part(io.BytesIO(rel.target_part.blob))
+        else:
+            clone = _clone_part(rel.target_part, dest_part.package)
+            rid_map[rId] = dest_part.relate_to(clone, rel.reltype)
+
+    _replace_slide_xml(new_slide._element, copy.deepcopy(src_slide._element))
+    _remap_rids(new_slide._element, rid_map)
+
+    return new_slide
+
+
+def _replace_slide_xml(dest_el, src_el):
+    """
+    dest のスライド XML を src の内容で置き換える。
+    Slide / SlideShapes プロキシが保持している p:sld, p:cSld, p:spTree 要素はそのまま残し、
+    その中身だけを入れ替える。
+    """
+    dest_csld, src_csld = dest_el.cSld, src_el.cSld
+    dest_tree, src_tree = dest_csld.spTree, src_csld.spTree
+
+    _move_children(src_tree, dest_tree)
+
+    # p:cSld の spTree 以外 (bg, extLst など) は spTree の前後の位置を保って移す
+    for child in list(dest_csld):
+        if child is not dest_tree:
+            dest_csld.remove(child)
+    before = True
+    for child in list(src_csld):
+        if child is src_tree:
+            before = False
+        elif before:
+            dest_tree.addprevious(child)
+        else:
+            dest_csld.append(child)
+    dest_csld.attrib.update(src_csld.attrib)
+
+    # p:sld の cSld 以外 (clrMapOvr, transition, timing など)
+    for child in list(dest_el):
+        if child is not dest_csld:
+            dest_el.remove(child)
+    for child in list(src_el):
+        if child is not src_csld:
+            dest_el.append(child)
+    dest_el.attrib.update(src_el.attrib)
+
+
+def _move_children(src, dest):
+    for child in list(dest):
+        dest.remove(child)
+    dest.attrib.clear()
+    dest.attrib.update(src.attrib)
+    for child in list(src):
+        dest.append(child)
+
+
+def _clone_part(src_part, package):
+    """src_part (とその関連パート) を新しいパート名で package に複製する"""
+    if isinstance(src_part, SlidePart):
+        raise UnsupportedSlide("nested reference to a slide part")
+
+    tmpl = re.sub(r'\d*(\.\w+)$', r'%d\1', str(src_part.partname))
+    clone = type(src_part).load(package.next_partname(tmpl), src_part.content_type, package, src_part.blob)
+
+    rid_map = {}
+    for rId, rel in src_part.rels.items():
+        if rel.is_external:
+            rid_map[rId] = clone.relate_to(rel.target_ref, rel.reltype, is_external=True)
+        else:
+            rid_map[rId] = clone.relate_to(_clone_part(rel.target_part, package), rel.reltype)
+
+    if isinstance(clone, XmlPart):
+        _remap_rids(clone._element, rid_map)
+    return clone
+
+
+def _remap_rids(root, rid_map: Dict[str, str]):
+    # 旧 rId -> 新 rId を一括で置換する (同時置換なので rId の入れ替わりにも安全)
+    for el in root.iter():
+        for attr, value in el.attrib.items():
+            if attr.startswith(_R_ATTR_PREFIX) and value in rid_map:
+                el.set(attr, rid_map[value])
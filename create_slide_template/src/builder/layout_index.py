@@ -0,0 +1,104 @@
+import json
+import os
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Set, Tuple
+
+from src.schema.slide_schema import SlideType, LAYOUT_MAP
+
+DEFAULT_LAYOUT_MAPPING = os.path.join(os.path.dirname(__file__), '../../config/layout_mapping.json')
+
+# layout_mapping.json のレイアウト名がテンプレートに無い場合の位置ベースのフォールバック
+# Template structure:
+# Master 0 (Index 0): Title, TOC, Section, Content, Back
+FALLBACK_LAYOUT_ORDER = {
+    SlideType.COVER: 0,
+    SlideType.TOC: 1,
+    SlideType.SECTION: 2,
+    SlideType.CONTENT: 3,
+    SlideType.BACK_COVER: 4
+}
+
+
+# 警告済みの (テンプレート, レイアウト名, role, idx)。SlideBuilder を作るたびに同じ警告を出さないため
+_warned_placeholders: Set[Tuple[Optional[str], str, str, int]] = set()
+
+
+class PlaceholderSlot(NamedTuple):
+    """レイアウト上のプレースホルダー位置 (EMU)"""
+    idx: int
+    left: int
+    top: int
+    width: int
+    height: int
+
+
+class CompiledLayout(NamedTuple):
+    layout: object # pptx.slide.SlideLayout
+    slots: Dict[str, PlaceholderSlot] # role (title, subtitle, body, content, footer, date) -> slot
+
+
+@lru_cache(maxsize=None)
+def load_layout_mapping(mapping_path: str) -> Dict[str, Dict[str, int]]:
+    """layout_mapping.json を レイアウト名 -> {role: idx} に変換して返す (パスごとに1回だけ読む)"""
+    with open(mapping_path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+
+    mapping = {}
+    for layout_name, roles in raw.get("layouts", {}).items():
+        mapping[layout_name] = {
+            role: spec["idx"] for role, spec in roles.items()
+            if isinstance(spec, dict) and "idx" in spec
+        }
+    return mapping
+
+
+class LayoutIndex:
+    """
+    テンプレート読み込み時に1回だけ作る、SlideType -> (レイアウト, role -> プレースホルダー) の表。
+    スライド生成時はプレースホルダーを走査せずに、idx と位置を引ける。
+    """
+
+    def __init__(self, prs, mapping_path: str = DEFAULT_LAYOUT_MAPPING, template_key: Optional[str] = None):
+        """template_key: テンプレートの識別子 (パスなど)。見つからないプレースホルダーの警告はテンプレートごとに1回だけ出す"""
+        role_map = load_layout_mapping(os.path.abspath(mapping_path))
+        layouts_by_name = {layout.name: layout for layout in prs.slide_layouts}
+
+        self._compiled: Dict[SlideType, CompiledLayout] = {}
+        for slide_type, fallback_index in FALLBACK_LAYOUT_ORDER.items():
+            layout_name = self._layout_name(slide_type)
+            layout = layouts_by_name.get(layout_name)
+            if layout is None:
+                layout = prs.slide_layouts[fallback_index]
+
+            placeholders = {ph.placeholder_format.idx: ph for ph in layout.placeholders}
+            slots = {}
+            for role, idx in role_map.get(layout_name, {}).items():
+                ph = placeholders.get(idx)
+                if ph is None:
+                    warning_key = (template_key, layout_name, role, idx)
+                    if warning_key not in _warned_placeholders:
+                        _warned_placeholders.add(warning_key)
+                        print(f"Warning: Placeholder idx {idx} ({layout_name}/{role}) not found in template layout '{layout.name}'")
+                    continue
+                slots[role] = PlaceholderSlot(idx, ph.left, ph.top, ph.width, ph.height)
+
+            self._compiled[slide_type] = CompiledLayout(layout, slots)
+
+    @staticmethod
+    def _layout_name(slide_type: SlideType) -> Optional[str]:
+        for name, mapped_type in LAYOUT_MAP.items():
+            if mapped_type == slide_type:
+                return name
+        return None
+
+    def layout_for(self, slide_type: SlideType):
+        return self._compiled.get(slide_type, self._compiled[SlideType.CONTENT]).layout
+
+    def slot(self, slide_type: SlideType, *roles: str) -> Optional[PlaceholderSlot]:
+        """roles を順に探し、最初に見つかった role のプレースホルダーを返す"""
+        compiled = self._compiled.get(slide_type, self._compiled[SlideType.CONTENT])
+        for role in roles:
+            slot = compiled.slots.get(role)
+            if slot is not None:
+                return slot
+        return None
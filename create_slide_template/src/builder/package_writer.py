@@ -0,0 +1,149 @@
+import os
+import time
+import zipfile
+from typing import Dict, IO, Iterable, Tuple, Union
+
+from pptx.opc.serialized import PackageWriter
+
+# 既に圧縮済みの形式。deflate しても小さくならず CPU だけを使うので無圧縮で格納する
+PRECOMPRESSED_EXTENSIONS = frozenset({
+    "png", "jpg", "jpeg", "gif", "tif", "tiff", "wdp", "webp",
+    "xlsx", "xlsm", "docx", "pptx", "zip",
+    "mp3", "m4a", "mp4", "m4v", "mov", "wmv", "avi",
+})
+
+XML_EXTENSIONS = frozenset({"xml", "rels", "vml"})
+
+
+class CompressionPolicy:
+    """
+    パート (zip メンバー) ごとの圧縮方法。
+    - xml_level:    XML パート (.xml/.rels/.vml) の deflate レベル (0-9)
+    - binary_level: その他のバイナリ (emf, svg, bin など) の deflate レベル
+    - store_extensions: 無圧縮 (ZIP_STORED) で格納する拡張子
+    """
+
+    def __init__(self, xml_level: int = 6, binary_level: int = 6,
+                 store_extensions: Iterable[str] = PRECOMPRESSED_EXTENSIONS):
+        self.xml_level = xml_level
+        self.binary_level = binary_level
+        self.store_extensions = frozenset(store_extensions)
+
+    def member_settings(self, membername: str) -> Tuple[int, int]:
+        """(compress_type, compresslevel) を返す"""
+        ext = membername.rsplit(".", 1)[-1].lower()
+        if ext in self.store_extensions:
+            return zipfile.ZIP_STORED, 0
+        level = self.xml_level if ext in XML_EXTENSIONS else self.binary_level
+        if level <= 0:
+            return zipfile.ZIP_STORED, 0
+        return zipfile.ZIP_DEFLATED, level
+
+
+COMPRESSION_POLICIES: Dict[str, CompressionPolicy] = {
+    # 画像などは無圧縮、XML は標準レベル
+    "default": CompressionPolicy(),
+    # 速度優先 (サーバーからの配信向け)
+    "fast": CompressionPolicy(xml_level=1, binary_level=1),
+    # サイズ優先 (保存・アップロード向け)
+    "small": CompressionPolicy(xml_level=9, binary_level=9),
+    # python-pptx 標準と同じ: 全パートを deflate
+    "legacy": CompressionPolicy(store_extensions=()),
+}
+
+
+class _CountingStream:
+    """シークできないストリーム (パイプ・ソケット) 用。書き込んだバイト数を数える"""
+
+    def __init__(self, stream: IO[bytes]):
+        self._stream = stream
+        self.bytes_written = 0
+
+    def write(self, data) -> int:
+        self._stream.write(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.bytes_written
+
+    def flush(self):
+        self._stream.flush()
+
+
+class _PolicyZipWriter:
+    """python-pptx の物理パッケージライターと同じインターフェースで、圧縮方法をパートごとに選ぶ"""
+
+    def __init__(self, stream: IO[bytes], policy: CompressionPolicy):
+        self._zipf = zipfile.ZipFile(stream, "w", strict_timestamps=False)
+        self._policy = policy
+        self.stats = {"parts": 0, "uncompressed_bytes": 0, "stored_parts": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._zipf.close()
+
+    def write(self, pack_uri, blob: bytes):
+        compress_type, level = self._policy.member_settings(pack_uri.membername)
+        self._zipf.writestr(pack_uri.membername, blob, compress_type=compress_type, compresslevel=level)
+        self.stats["parts"] += 1
+        self.stats["uncompressed_bytes"] += len(blob)
+        if compress_type == zipfile.ZIP_STORED:
+            self.stats["stored_parts"] += 1
+
+
+class _PolicyPackageWriter(PackageWriter):
+    def __init__(self, stream, pkg_rels, parts, policy: CompressionPolicy):
+        super().__init__(stream, pkg_rels, parts)
+        self._policy = policy
+        self.stats = {}
+
+    def _write(self):
+        with _PolicyZipWriter(self._pkg_file, self._policy) as phys_writer:
+            self._write_content_types_stream(phys_writer)
+            self._write_pkg_rels(phys_writer)
+            self._write_parts(phys_writer)
+        self.stats = phys_writer.stats
+
+
+def save_presentation(prs, output: Union[str, IO[bytes]], policy: CompressionPolicy = COMPRESSION_POLICIES["default"]) -> Dict:
+    """
+    prs を output (ファイルパス、または書き込み可能なバイナリストリーム) に保存する。
+    ストリームはシークできなくてもよく (パイプ・ソケット)、一時ファイルは作らない。ストリームは閉じない。
+    Returns: {"bytes_written", "uncompressed_bytes", "parts", "stored_parts", "save_seconds"}
+    """
+    t0 = time.perf_counter()
+
+    if isinstance(output, (str, os.PathLike)):
+        with open(output, "wb") as f:
+            stats = _write_stream(prs, f, policy)
+    else:
+        stats = _write_stream(prs, output, policy)
+
+    stats["save_seconds"] = time.perf_counter() - t0
+    return stats
+
+
+def _write_stream(prs, stream: IO[bytes], policy: CompressionPolicy) -> Dict:
+    package = prs.part.package
+    seekable = _is_seekable(stream)
+    target = stream if seekable else _CountingStream(stream)
+    start = stream.tell() if seekable else 0
+
+    writer = _PolicyPackageWriter(target, package._rels, tuple(package.iter_parts()), policy)
+    writer._write()
+
+    stats = dict(writer.stats)
+    stats["bytes_written"] = (stream.tell() - start) if seekable else target.bytes_written
+    if hasattr(stream, "flush"):
+        stream.flush()
+    return stats
+
+
+def _is_seekable(stream) -> bool:
+    try:
+        return stream.seekable()
+    except (AttributeError, OSError, ValueError):
+        return False
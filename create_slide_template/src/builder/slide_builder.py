@@ -2,38 +2,53 @@ from pptx import Presentation
 from pptx.util import Inches
 import os
 import sys
-
-from pptx.util import Pt
-from pptx.dml.color import RGBColor
+import time
+from typing import Dict, IO, Iterable, Optional, Union
 
 # Adjust path to include src if running from root
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
 
 from src.schema.slide_schema import PresentationDeck, SlideContent, SlideType
-from src.schema.slide_schema import PresentationDeck, SlideContent, SlideType
-from src.config.style_config import StyleConfig, TextStyle, JMDCFont, JMDCColor
+from src.config.style_config import TextStyle
 from src.utils.chart_builder import ChartBuilder
+from src.builder.template_cache import DEFAULT_TEMPLATE_CACHE, TemplateCache
+from src.builder.layout_index import LayoutIndex, DEFAULT_LAYOUT_MAPPING
+from src.builder import incremental
+from src.builder.package_writer import COMPRESSION_POLICIES, CompressionPolicy, save_presentation
+from src.builder.text_styles import DEFAULT_STYLE_ENGINE
+from src.utils.image_pipeline import ImagePipeline
 
 class SlideBuilder:
-    def __init__(self, template_path: str):
+    def __init__(self, template_path: str, template_cache: Optional[TemplateCache] = DEFAULT_TEMPLATE_CACHE,
+                 layout_mapping_path: str = DEFAULT_LAYOUT_MAPPING,
+                 image_pipeline: Optional[ImagePipeline] = None):
+        """
+        template_cache: パース済みテンプレートのキャッシュ (既定はプロセス内共有)。
+                        None を渡すと毎回ファイルから読み込む。
+        layout_mapping_path: レイアウトごとのプレースホルダー role -> idx の定義 (config/layout_mapping.json)
+        image_pipeline: 指定すると画像を表示サイズまで縮小・再エンコードしてから貼る (例: ImagePipeline(dpi=150))。
+                        既定 (None) は元の画像ファイルをそのまま埋め込む。複数の SlideBuilder で共有してよい。
+        """
         if not os.path.exists(template_path):
             raise FileNotFoundError(f"Template not found: {template_path}")
-        self.prs = Presentation(template_path)
+        if template_cache is not None:
+            self.prs = template_cache.load(template_path)
+        else:
+            self.prs = Presentation(template_path)
+        self.template_path = template_path
+        self.layout_mapping_path = layout_mapping_path
         
-        # Hardcoded layout map based on analysis (could be dynamic later)
-        # Template structure:
-        # Master 0 (Index 0): Title, TOC, Section, Content, Back
-        self.layout_map = {
-            SlideType.COVER: 0,
-            SlideType.TOC: 1,
-            SlideType.SECTION: 2,
-            SlideType.CONTENT: 3,
-            SlideType.BACK_COVER: 4
-        }
+        # Layout / placeholder lookup table compiled once from layout_mapping.json
+        self.layout_index = LayoutIndex(self.prs, layout_mapping_path, template_key=os.path.abspath(template_path))
+        
+        # TextStyle / font settings compiled to <a:rPr> once per process
+        self.style_engine = DEFAULT_STYLE_ENGINE
+        self.image_pipeline = image_pipeline
 
     def _apply_text_style(self, shape, style_type: TextStyle, text: str):
         """
         Applies strict styling to a shape's text frame.
+        The style is compiled once into an <a:rPr> (see text_styles.py) and stamped onto the run.
         """
         if not shape.has_text_frame:
             return
@@ -42,27 +57,29 @@ class SlideBuilder:
         text_frame.clear() # Clear existing dummy text/formatting
         
         p = text_frame.paragraphs[0]
-        run = p.add_run()
-        run.text = text
-        
-        style = StyleConfig.get_font_style(style_type)
-        
-        font = run.font
-        font.name = style["name"]
-        font.size = Pt(style["size"]) if style["size"] else None
-        font.bold = style["bold"]
-        font.italic = style["italic"]
-        
-        if style["color"]:
-            font.color.rgb = style["color"]
+        self.style_engine.for_text_style(style_type).add_run(p, text)
             
         # Support CJK fonts explicitly if needed (some libraries need extra handling for Asian fonts)
         # python-pptx handles `font.name` reasonably well for installed fonts.
 
 
-    def build(self, deck: PresentationDeck, output_path: str):
+    def build(self, deck: Union[PresentationDeck, Iterable[SlideContent]], output: Union[str, IO[bytes]],
+              incremental_build: bool = False, compression: Union[str, CompressionPolicy] = "default") -> Dict:
         """
-        Generates the presentation and saves it to output_path.
+        Generates the presentation and saves it to output.
+        `deck` may be a PresentationDeck or any iterable of SlideContent
+        (e.g. MarkdownParser.parse_iter), which is consumed one slide at a time.
+        `output` may be a file path or any writable binary stream (including non-seekable
+        pipes/sockets); the package is written straight to it without a temp file.
+
+        incremental_build: 各スライドの fingerprint をサイドカー (<output>.manifest.json) に記録し、
+            前回の出力から内容が変わっていないスライドは XML・チャート・画像をそのまま移植する。
+            変更されたスライドだけを再生成する。output がファイルパスの場合のみ。
+        compression: COMPRESSION_POLICIES のキー ("default", "fast", "small", "legacy")
+            または CompressionPolicy。既定では画像などの圧縮済みパートは無圧縮で格納する。
+
+        Returns: {"slides", "reused_slides", "build_seconds", "save_seconds",
+                  "bytes_written", "uncompressed_bytes", "parts", "stored_parts"}
         """
         # Clear existing slides (optional, but usually we want a fresh start from template masters)
         # Note: python-pptx doesn't easily allow deleting all slides while keeping masters unless we start with a clean template.
@@ -70,81 +87,137 @@ class SlideBuilder:
         # For this logic, we append. If the template has dummy slides, they will remain at the beginning.
         # TODO: Implement slide removal if needed.
 
-        for slide_content in deck.slides:
-            self._create_slide(slide_content)
+        is_path = isinstance(output, (str, os.PathLike))
+        if incremental_build and not is_path:
+            raise ValueError("incremental_build requires output to be a file path")
+        policy = COMPRESSION_POLICIES[compression] if isinstance(compression, str) else compression
+        
+        t0 = time.perf_counter()
+        streaming = not isinstance(deck, PresentationDeck)
+        if streaming:
+            slides = deck
+        else:
+            slides = deck.slides
+            # Downsample all pictures on the pipeline's thread pool while the slides are assembled
+            self._prefetch_images(slides)
+        
+        if incremental_build:
+            # Downsampling settings change the embedded pictures, so they are part of the key
+            settings = self.image_pipeline.settings_key() if self.image_pipeline else "image-pipeline:off"
+            key = incremental.build_key(self.template_path, self.layout_mapping_path, settings=settings)
+            previous = incremental.PreviousBuild.load(output, key)
+        else:
+            previous = None
+        slide_offset = len(self.prs.slides)
+        fingerprints = []
+        n_slides = 0
+        reused = 0
+        
+        try:
+            for slide_content in slides:
+                n_slides += 1
+                if not incremental_build:
+                    self._create_slide(slide_content, prefetch=streaming)
+                    continue
+            
+                fingerprint = incremental.slide_fingerprint(slide_content)
+                fingerprints.append(fingerprint)
+                
+                src_slide = previous.find(fingerprint) if previous else None
+                if src_slide is not None:
+                    try:
+                        incremental.transplant_slide(src_slide, self.prs, self.layout_index.layout_for(slide_content.type))
+                        reused += 1
+                        continue
+                    except incremental.UnsupportedSlide as e:
+                        print(f"Warning: Regenerating slide {n_slides - 1}: {e}")
+                
+                self._create_slide(slide_content, prefetch=streaming)
+        finally:
+            # Downsampled pictures are embedded by now (or the build failed): drop what this builder prefetched
+            # but did not use. Other builders sharing the pipeline keep theirs; the disk cache keeps everything.
+            if self.image_pipeline is not None:
+                self.image_pipeline.release(owner=self)
+        
+        stats = {"slides": n_slides, "reused_slides": reused, "build_seconds": time.perf_counter() - t0}
+        if incremental_build:
+            incremental.discard_manifest(output)
+        stats.update(save_presentation(self.prs, output, policy))
         
-        self.prs.save(output_path)
-        print(f"Presentation saved to {output_path}")
+        if incremental_build:
+            incremental.write_manifest(output, key, slide_offset, fingerprints)
+        
+        destination = output if is_path else "stream"
+        message = f"Presentation saved to {destination} ({stats['bytes_written']:,} bytes, " \
+                  f"build {stats['build_seconds']:.2f}s, save {stats['save_seconds']:.2f}s)"
+        if incremental_build:
+            message += f" (reused {reused}, regenerated {n_slides - reused} slides)"
+        print(message)
+        return stats
+
+    def _element_box(self, rect):
+        """Normalized rect -> (x, y, w, h) in EMU"""
+        slide_width = self.prs.slide_width
+        slide_height = self.prs.slide_height
+        return (int(rect[0] * slide_width), int(rect[1] * slide_height),
+                int(rect[2] * slide_width), int(rect[3] * slide_height))
 
-    def _create_slide(self, content: SlideContent):
-        layout_index = self.layout_map.get(content.type, 3) # Default to content
-        layout = self.prs.slide_layouts[layout_index]
+    def _prefetch_images(self, slides):
+        if self.image_pipeline is None:
+            return
+        requests = []
+        for content in slides:
+            for elem_type, path, rect, _, _, _ in content.elements.rows():
+                if elem_type == "image" and rect and os.path.exists(path):
+                    _, _, w, h = self._element_box(rect)
+                    requests.append((path, w, h))
+        self.image_pipeline.prefetch(requests, owner=self)
+
+    def _create_slide(self, content: SlideContent, prefetch: bool = False):
+        layout = self.layout_index.layout_for(content.type)
         slide = self.prs.slides.add_slide(layout)
         
-        # Map content to placeholders
-        # This mapping is specific to the JMDC template structure we analyzed
+        # Map content to placeholders by role (see config/layout_mapping.json)
+        placeholders = {ph.placeholder_format.idx: ph for ph in slide.placeholders}
         
-        # Data Mapping
+        def placeholder_for(*roles):
+            slot = self.layout_index.slot(content.type, *roles)
+            return (slot, placeholders.get(slot.idx)) if slot else (None, None)
+        
+        def fill(roles, style, text):
+            slot, ph = placeholder_for(*roles)
+            if ph is None:
+                return
+            # One broken placeholder should not lose the rest of the slide
+            try:
+                self._apply_text_style(ph, style, text)
+            except Exception as e:
+                print(f"Warning: Failed to fill placeholder idx {slot.idx} ({'/'.join(roles)}): {e}")
         
         # Title mapping
         if content.title:
-            if slide.shapes.title:
-                # Determine title style based on slide type
-                t_style = TextStyle.TITLE_MAIN if content.type == SlideType.COVER else TextStyle.TITLE_SLIDE
-                self._apply_text_style(slide.shapes.title, t_style, content.title)
+            # Determine title style based on slide type
+            t_style = TextStyle.TITLE_MAIN if content.type == SlideType.COVER else TextStyle.TITLE_SLIDE
+            fill(("title",), t_style, content.title)
         
         # Subtitle / Body mapping
+        if content.subtitle:
+            fill(("subtitle",), TextStyle.SUBTITLE, content.subtitle)
         
-        if content.type == SlideType.COVER:
-            if content.subtitle:
-                try:
-                    self._apply_text_style(slide.placeholders[1], TextStyle.SUBTITLE, content.subtitle)
-                except:
-                    pass
-        
-        elif content.type == SlideType.SECTION:
-            if content.subtitle:
-                try:
-                    self._apply_text_style(slide.placeholders[1], TextStyle.SUBTITLE, content.subtitle)
-                except:
-                    pass
-
-        elif content.type == SlideType.CONTENT:
-            if content.body:
-                try:
-                    # Prefer the object placeholder for general content
-                    if 1 in [p.placeholder_format.idx for p in slide.placeholders]:
-                        self._apply_text_style(slide.placeholders[1], TextStyle.BODY, content.body)
-                except:
-                    pass
-            
-            if content.subtitle:
-                try:
-                    # Use the top text placeholder for subtitle
-                    if 13 in [p.placeholder_format.idx for p in slide.placeholders]:
-                        self._apply_text_style(slide.placeholders[13], TextStyle.SUBTITLE, content.subtitle)
-                except:
-                    pass
-
-
+        if content.body:
+            # Prefer the dedicated body placeholder, otherwise the general content (object) placeholder
+            fill(("body", "content"), TextStyle.BODY, content.body)
 
         # Chart Handling
         if content.chart:
             try:
-                # Find a suitable location for the chart.
-                # Default to the center "Object" placeholder (idx 1 usually) if available,
+                # Place the chart over the content placeholder if the layout has one,
                 # otherwise use a calculated center position.
+                slot, _ = placeholder_for("content")
                 
-                # Check for Content Placeholder (idx 1)
-                target_ph = None
-                for ph in slide.placeholders:
-                    if ph.placeholder_format.idx == 1:
-                        target_ph = ph
-                        break
-                
-                if target_ph:
-                    x, y = target_ph.left, target_ph.top
-                    cx, cy = target_ph.width, target_ph.height
+                if slot:
+                    x, y = slot.left, slot.top
+                    cx, cy = slot.width, slot.height
                 else:
                     # Fallback to roughly center
                     x, y = Inches(1), Inches(2)
@@ -157,47 +230,34 @@ class SlideBuilder:
 
         # Advanced Elements Handling (PDF Reconstruction)
         if content.elements:
-            slide_width = self.prs.slide_width
-            slide_height = self.prs.slide_height
+            if prefetch:
+                # Streaming input (not prefetched by build): convert this slide's images concurrently
+                self._prefetch_images([content])
             
-            for elem in content.elements:
-                if not elem.rect:
+            # Read column-wise from the ElementStore (no SlideElement per element)
+            for elem_type, elem_content, rect, font_size, _, attributes in content.elements.rows():
+                if not rect:
                     continue
                     
-                # Convert normalized rect to EMU/Inches
-                x = int(elem.rect[0] * slide_width)
-                y = int(elem.rect[1] * slide_height)
-                w = int(elem.rect[2] * slide_width)
-                h = int(elem.rect[3] * slide_height)
+                # Convert normalized rect to EMU
+                x, y, w, h = self._element_box(rect)
                 
-                if elem.type == "text":
+                if elem_type == "text":
                     # Create Text Box
                     textbox = slide.shapes.add_textbox(x, y, w, h)
                     tf = textbox.text_frame
                     tf.word_wrap = True
                     p = tf.paragraphs[0]
-                    run = p.add_run()
-                    run.text = elem.content
                     
-                    # Apply Styles
-                    run.font.name = JMDCFont.REGULAR
-                    
-                    # Heuristic font size mapping or direct use
-                    if elem.font_size:
-                        # Map PDF point size roughly to PPTX point size
-                        # Often PDF points are similar.
-                        # Enforce minimum size for readability?
-                        run.font.size = Pt(elem.font_size)
-                    else:
-                        run.font.size = Pt(12) 
-                        
-                    # Color? Default to Black or Dark Grey
-                    run.font.color.rgb = JMDCColor.TEXT_MAIN
-
-                elif elem.type == "image":
+                    # Apply Styles: JMDCFont.REGULAR / JMDCColor.TEXT_MAIN, PDF point size as-is (default 12pt), bold as in the PDF.
+                    # Compiled once per distinct size and stamped onto the run.
+                    self.style_engine.for_font(font_size or 12, bold=bool(attributes.get("bold"))).add_run(p, elem_content)
+
+                elif elem_type == "image":
                     # Add Picture
-                    if os.path.exists(elem.content):
+                    if os.path.exists(elem_content):
                         try:
-                            slide.shapes.add_picture(elem.content, x, y, w, h)
+                            image = self.image_pipeline.prepare(elem_content, w, h, owner=self) if self.image_pipeline else elem_content
+                            slide.shapes.add_picture(image, x, y, w, h)
                         except Exception as e:
-                            print(f"Warning: Failed to add image {elem.content}: {e}")
+                            print(f"Warning: Failed to add image {elem_content}: {e}")
@@ -0,0 +1,75 @@
+import copy
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from pptx import Presentation
+
+
+class TemplateCache:
+    """
+    パース済みテンプレート (.pptx) のキャッシュ。
+
+    - キー: パス + mtime/サイズ (stat のみで判定) -> 内容の SHA-256
+      (touch されただけで内容が同じなら、再パースせずに同じエントリを使う)
+    - 値: テンプレートの生バイト列と、それをパースしたマスター Presentation
+    load() は毎回マスターの私有コピーを返すので、呼び出し側はスライド追加などを自由に行える。
+    """
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stat_index: Dict[str, Tuple[int, int, str]] = {} # path -> (mtime_ns, size, digest)
+        self._templates: "OrderedDict[str, Tuple[bytes, object]]" = OrderedDict() # digest -> (data, master)
+
+    def load(self, template_path: str):
+        """template_path の私有コピー (pptx.Presentation) を返す"""
+        path = os.path.abspath(template_path)
+        st = os.stat(path)
+
+        with self._lock:
+            digest = self._lookup_digest(path, st)
+            data, master = self._templates.get(digest, (None, None))
+
+            if master is None:
+                with open(path, "rb") as f:
+                    data = f.read()
+                digest = hashlib.sha256(data).hexdigest()
+                self._stat_index[path] = (st.st_mtime_ns, st.st_size, digest)
+                if digest not in self._templates:
+                    self._templates[digest] = (data, Presentation(io.BytesIO(data)))
+                data, master = self._templates[digest]
+
+            self._templates.move_to_end(digest)
+            while len(self._templates) > self.max_entries:
+                self._templates.popitem(last=False)
+
+            return self._private_copy(data, master)
+
+    def clear(self):
+        with self._lock:
+            self._stat_index.clear()
+            self._templates.clear()
+
+    def _lookup_digest(self, path: str, st: os.stat_result) -> Optional[str]:
+        entry = self._stat_index.get(path)
+        if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            return entry[2]
+        return None
+
+    @staticmethod
+    def _private_copy(data: bytes, master):
+        # パース済みツリーの deepcopy は zip 展開 + XML 再パースより速い。
+        # 失敗した場合はメモリ上のバイト列から開き直す (ディスクは読まない)
+        try:
+            return copy.deepcopy(master)
+        except Exception as e:
+            print(f"Warning: Template deepcopy failed, reopening from memory: {e}")
+            return Presentation(io.BytesIO(data))
+
+
+# プロセス内で共有されるデフォルトキャッシュ
+DEFAULT_TEMPLATE_CACHE = TemplateCache()
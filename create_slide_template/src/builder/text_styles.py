@@ -0,0 +1,72 @@
+import copy
+from typing import Dict, Optional, Tuple
+
+from pptx.dml.color import RGBColor
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls
+from pptx.text.text import _Run
+from pptx.util import Pt
+
+from src.config.style_config import StyleConfig, TextStyle, JMDCFont, JMDCColor
+
+
+class CompiledTextStyle:
+    """
+    フォント設定を一度だけ <a:rPr> 要素にコンパイルしたもの。
+    run ごとに python-pptx のプロキシで name / size / bold / italic / color を個別に設定する代わりに、
+    コンパイル済みの rPr をコピーして差し込む。
+    """
+
+    def __init__(self, name: str, size: Optional[float], bold: bool, italic: bool, color: Optional[RGBColor]):
+        # コンパイル時だけ python-pptx のプロキシを使う (出力 XML は従来の設定方法と同一になる)
+        scratch = parse_xml(f'<a:r {nsdecls("a")}><a:t/></a:r>')
+        font = _Run(scratch, None).font
+        font.name = name
+        font.size = Pt(size) if size else None
+        font.bold = bold
+        font.italic = italic
+        if color:
+            font.color.rgb = color
+        self._rPr = scratch.rPr
+
+    def stamp(self, r):
+        """<a:r> 要素に rPr を設定する (既存の rPr は置き換える)"""
+        if r.rPr is not None:
+            r.remove(r.rPr)
+        r.insert(0, copy.deepcopy(self._rPr))
+
+    def add_run(self, paragraph, text: str):
+        """段落 (_Paragraph) の末尾にスタイル済みの run を追加する"""
+        r = paragraph._p.add_r()
+        self.stamp(r)
+        r.text = text
+        return r
+
+
+class StyleEngine:
+    """CompiledTextStyle のキャッシュ。TextStyle ごと、および直接指定のフォント設定ごとに1回だけコンパイルする"""
+
+    def __init__(self):
+        self._by_text_style: Dict[TextStyle, CompiledTextStyle] = {}
+        self._by_font: Dict[Tuple, CompiledTextStyle] = {}
+
+    def for_text_style(self, style_type: TextStyle) -> CompiledTextStyle:
+        compiled = self._by_text_style.get(style_type)
+        if compiled is None:
+            style = StyleConfig.get_font_style(style_type)
+            compiled = CompiledTextStyle(style["name"], style["size"], style["bold"], style["italic"], style["color"])
+            self._by_text_style[style_type] = compiled
+        return compiled
+
+    def for_font(self, size: float, name: str = JMDCFont.REGULAR, color: RGBColor = JMDCColor.TEXT_MAIN,
+                 bold: Optional[bool] = None, italic: Optional[bool] = None) -> CompiledTextStyle:
+        key = (size, name, str(color), bold, italic)
+        compiled = self._by_font.get(key)
+        if compiled is None:
+            compiled = CompiledTextStyle(name, size, bold, italic, color)
+            self._by_font[key] = compiled
+        return compiled
+
+
+# プロセス内で共有 (コンパイル済みスタイルは読み取り専用)
+DEFAULT_STYLE_ENGINE = StyleEngine()
@@ -1,58 +1,74 @@
+import json
+from typing import Iterable, Iterator, List
 from src.schema.slide_schema import PresentationDeck, SlideContent, SlideType
 
 class DeckToMarkdownConverter:
     def convert(self, deck: PresentationDeck) -> str:
-        md_lines = []
-        
         # Deck Title Metadata? 
         # md_lines.append(f"<!-- deck: {deck.title} -->")
+        return "".join(self.iter_chunks(deck.slides))
+
+    def iter_chunks(self, slides: Iterable[SlideContent]) -> Iterator[str]:
+        """
+        スライドごとの Markdown 文字列を yield する (連結すると convert() の結果と同じ)。
+        ストリーミング変換で、1ページずつファイルに書き出すために使う。
+        """
+        for i, slide in enumerate(slides):
+            yield self.slide_chunk(slide, i)
+
+    def slide_chunk(self, slide: SlideContent, index: int) -> str:
+        """index 番目のスライドの Markdown (2枚目以降は区切り線を含む)"""
+        if index == 0:
+            return "\n".join(self._slide_lines(slide))
+        return "\n" + "\n".join(["\n---\n"] + self._slide_lines(slide))
+
+    def _slide_lines(self, slide: SlideContent) -> List[str]:
+        md_lines = []
+        # Layout Comment
+        layout_name = self._map_type_to_layout_name(slide.type)
+        md_lines.append(f"<!-- layout: {layout_name} -->")
         
-        for i, slide in enumerate(deck.slides):
-            if i > 0:
-                md_lines.append("\n---\n")
-            
-            # Layout Comment
-            layout_name = self._map_type_to_layout_name(slide.type)
-            md_lines.append(f"<!-- layout: {layout_name} -->")
-            
-            # Title
-            if slide.title:
-                md_lines.append(f"# {slide.title}")
-            
-            # Subtitle
-            if slide.subtitle:
-                md_lines.append(f"## {slide.subtitle}")
-            
+        # Title
+        if slide.title:
+            md_lines.append(f"# {slide.title}")
+        
+        # Subtitle
+        if slide.subtitle:
+            md_lines.append(f"## {slide.subtitle}")
+        
+        md_lines.append("")
+        
+        # Body (if exists)
+        if slide.body:
+            md_lines.append(slide.body)
             md_lines.append("")
-            
-            # Body (if exists)
-            if slide.body:
-                md_lines.append(slide.body)
-                md_lines.append("")
 
-            # Advanced Elements (Absolute Positioning)
-            # Syntax: <!-- element: type=text, rect=[x,y,w,h], size=12, color=[r,g,b] -->
-            if slide.elements:
-                for elem in slide.elements:
-                    rect_str = f"[{elem.rect[0]:.4f}, {elem.rect[1]:.4f}, {elem.rect[2]:.4f}, {elem.rect[3]:.4f}]" if elem.rect else "[]"
-                    
-                    params = [f"type={elem.type}", f"rect={rect_str}"]
-                    if elem.font_size:
-                        params.append(f"size={elem.font_size:.1f}")
-                    if elem.color:
-                        params.append(f"color={elem.color}")
-                    
-                    param_str = ", ".join(params)
-                    md_lines.append(f"<!-- element: {param_str} -->")
-                    
-                    if elem.type == "text":
-                        md_lines.append(elem.content if elem.content else "")
-                    elif elem.type == "image":
-                        md_lines.append(f"![]({elem.content})")
-                    
-                    md_lines.append("")
+        # Advanced Elements (Absolute Positioning)
+        # Syntax: <!-- element: type=text, rect=[x,y,w,h], size=12, color=[r,g,b] -->
+        # Read column-wise from the ElementStore (no SlideElement per element)
+        if slide.elements:
+            for elem_type, content, rect, font_size, color, attributes in slide.elements.rows():
+                rect_str = f"[{rect[0]:.4f}, {rect[1]:.4f}, {rect[2]:.4f}, {rect[3]:.4f}]" if rect else "[]"
+                
+                params = [f"type={elem_type}", f"rect={rect_str}"]
+                if font_size:
+                    params.append(f"size={font_size:.1f}")
+                if color:
+                    params.append(f"color={color}")
+                for key, value in attributes.items():
+                    params.append(f"{key}={json.dumps(value, ensure_ascii=False)}")
+                
+                param_str = ", ".join(params)
+                md_lines.append(f"<!-- element: {param_str} -->")
+                
+                if elem_type == "text":
+                    md_lines.append(content if content else "")
+                elif elem_type == "image":
+                    md_lines.append(f"![]({content})")
+                
+                md_lines.append("")
         
-        return "\n".join(md_lines)
+        return md_lines
 
     def _map_type_to_layout_name(self, slide_type: SlideType) -> str:
         # Inverse mapping of MD Parser
@@ -0,0 +1,174 @@
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+from src.schema.slide_schema import ElementStore, SlideContent, SlideType
+
+# 見出しとみなす本文サイズとの差 (比率と pt の両方を満たすこと)
+HEADING_RATIO = 1.15
+HEADING_MIN_DIFF = 1.0
+# 同じ見出しレベルとみなすサイズの幅 (そのレベルの最大サイズに対する比率)
+LEVEL_RATIO = 0.9
+MAX_HEADING_LEVELS = 3
+# 本文サイズに対してこれ以下はキャプション (注記・出典・ページ番号など)
+CAPTION_RATIO = 0.85
+
+# タイトル・サブタイトルを探すページ上部の範囲 (ページ高さに対する比率)
+TITLE_ZONE = 0.35
+# 見出しサイズの段落が無いページで、タイトルの代わりに使う段落の範囲
+FALLBACK_TITLE_ZONE = 0.2
+# サブタイトルを探す、タイトルの下端からの範囲
+SUBTITLE_ZONE = 0.2
+
+Role = Tuple[str, Optional[int]] # ("heading", level) / ("body", None) / ("caption", None)
+
+
+class FontStatistics:
+    """
+    文書全体のフォントサイズ・太字のヒストグラム (文字数で重み付け)。
+    最も多く使われているサイズを本文とし、それより大きいサイズを見出しレベル 1..N にまとめる。
+    各ページの段落を1回ずつ見るだけで、タイトル・サブタイトル・本文・キャプションとスライドの種類を決める。
+    """
+
+    def __init__(self):
+        self.histogram: Counter = Counter() # (size, bold) -> 文字数
+        self.body_size = 0.0
+        self.level_sizes: List[float] = [] # 見出しレベルごとの下限サイズ (レベル1から)
+
+    @classmethod
+    def from_slides(cls, slides: Iterable[SlideContent]) -> "FontStatistics":
+        stats = cls()
+        for slide in slides:
+            for elem_type, content, _, font_size, _, attributes in slide.elements.rows():
+                if elem_type == "text" and font_size:
+                    stats.add(font_size, bool(attributes.get("bold")), len(content.strip()))
+        stats.finalize()
+        return stats
+
+    def add(self, size: float, bold: bool, chars: int):
+        self.histogram[(round(size * 2) / 2, bold)] += chars
+
+    def finalize(self):
+        by_size: Counter = Counter()
+        for (size, _), chars in self.histogram.items():
+            by_size[size] += chars
+        if not by_size:
+            return
+
+        # 同数なら小さい方を本文とする
+        self.body_size = max(by_size.items(), key=lambda item: (item[1], -item[0]))[0]
+
+        heading_sizes = sorted((size for size in by_size if self._is_heading_size(size)), reverse=True)
+        self.level_sizes = []
+        level_max = None
+        for size in heading_sizes:
+            if level_max is not None and size >= level_max * LEVEL_RATIO:
+                self.level_sizes[-1] = size
+                continue
+            if len(self.level_sizes) == MAX_HEADING_LEVELS:
+                # 残りの小さい見出しは最下位レベルにまとめる
+                self.level_sizes[-1] = size
+                continue
+            self.level_sizes.append(size)
+            level_max = size
+
+    def _is_heading_size(self, size: float) -> bool:
+        return size >= self.body_size * HEADING_RATIO and size - self.body_size >= HEADING_MIN_DIFF
+
+    def role(self, size: float, bold: bool) -> Role:
+        if size and self.level_sizes and self._is_heading_size(size):
+            for level, min_size in enumerate(self.level_sizes, start=1):
+                if size >= min_size - 0.25:
+                    return "heading", level
+            return "heading", len(self.level_sizes)
+        if size and size <= self.body_size * CAPTION_RATIO:
+            return "caption", None
+        if bold:
+            # 本文サイズの太字 (小見出し) は一番下の見出しレベルの次
+            return "heading", len(self.level_sizes) + 1
+        return "body", None
+
+    def classify(self, page_num: int, raw: SlideContent) -> SlideContent:
+        """
+        IntelligentPdfParser のページ解析結果 (テキストは全て要素のまま) から、
+        タイトル・サブタイトルを取り出し、残りの要素に role を付け、スライドの種類を決める。
+        """
+        rows = list(raw.elements.rows())
+        roles = {}
+        headings = []
+        fallback = None
+        for i, (elem_type, _, rect, font_size, _, attributes) in enumerate(rows):
+            if elem_type != "text":
+                continue
+            role, level = self.role(font_size or 0, bool(attributes.get("bold")))
+            roles[i] = (role, level)
+            y, x = rect[1], rect[0]
+            if role == "heading":
+                headings.append(((level, y, x), i))
+            elif y < FALLBACK_TITLE_ZONE and (font_size or 0) > self.body_size:
+                key = (-(font_size or 0), y, x)
+                if fallback is None or key < fallback[0]:
+                    fallback = (key, i)
+
+        # タイトル: ページ上部で最上位レベルの見出し。表紙と本文の無いページ (中見出し) は
+        # タイトルが中央に置かれるので、ページ全体から探す
+        candidates = [h for h in headings if h[0][1] < TITLE_ZONE]
+        if not candidates and (page_num == 0 or all(role != "body" for role, _ in roles.values())):
+            candidates = headings
+        title = min(candidates) if candidates else None
+
+        title_index = subtitle_index = title_level = None
+        if title is not None:
+            title_index = title[1]
+            title_level = title[0][0]
+            title_rect = rows[title_index][2]
+            title_y, title_bottom = title_rect[1], title_rect[1] + title_rect[3]
+            # サブタイトル: タイトルのすぐ下にある、タイトルと同じか下位レベルの見出し
+            subtitle = None
+            for (level, y, x), i in headings:
+                if i == title_index or level < title_level:
+                    continue
+                if title_y < y < title_bottom + SUBTITLE_ZONE and (subtitle is None or (y, x) < subtitle[0]):
+                    subtitle = ((y, x), i)
+            if subtitle is not None:
+                subtitle_index = subtitle[1]
+        elif fallback is not None:
+            title_index = fallback[1]
+
+        elements = ElementStore()
+        has_body = has_images = False
+        for i, (elem_type, content, rect, font_size, color, attributes) in enumerate(rows):
+            if i in (title_index, subtitle_index):
+                continue
+            if elem_type == "text":
+                role, level = roles[i]
+                attributes = dict(attributes)
+                if role == "heading":
+                    attributes["role"] = "heading"
+                    attributes["level"] = level
+                elif role == "caption":
+                    attributes["role"] = "caption"
+                has_body = has_body or role != "caption"
+            has_images = has_images or elem_type == "image"
+            elements.append(elem_type, content, rect, font_size, color, attributes)
+
+        slide_type = SlideType.CONTENT
+        if page_num == 0:
+            slide_type = SlideType.COVER
+        elif title_index is not None and title_level == 1 and not has_body and \
+                (len(self.level_sizes) >= 2 or not has_images):
+            # 最上位の見出しだけのページ (キャプションやロゴは可) は中見出し (セクション区切り)
+            slide_type = SlideType.SECTION
+
+        return SlideContent(
+            type=slide_type,
+            title=rows[title_index][1] if title_index is not None else None,
+            subtitle=rows[subtitle_index][1] if subtitle_index is not None else None,
+            elements=elements
+        )
+
+
+def sample_pages(page_count: int, max_pages: int) -> List[int]:
+    """統計用に、文書全体から均等に max_pages ページを選ぶ"""
+    if page_count <= max_pages:
+        return list(range(page_count))
+    return sorted({round(i * (page_count - 1) / (max_pages - 1)) for i in range(max_pages)})
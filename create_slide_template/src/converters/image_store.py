@@ -0,0 +1,63 @@
+import hashlib
+import os
+import tempfile
+from typing import Dict
+
+
+class PdfImageStore:
+    """
+    PDF から抽出した画像の保存先 (内容アドレス方式)。
+    ファイル名は画像バイト列の SHA-256 から作るので、同じ画像は何ページに出てきても1回だけ書き込まれ、
+    全ての SlideElement が同じパスを指す (python-pptx も1つのメディアパートとして埋め込む)。
+
+    - 同じ xref は extract_image を呼ばずにパスを返す
+    - xref が違っても中身が同じ画像 (同じロゴが別オブジェクトとして埋め込まれている場合など) は同じファイルにまとめる
+    - 既に同じ名前のファイルがあれば書き込まない (前回の抽出結果をそのまま使う)
+    """
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self._by_xref: Dict[int, str] = {}
+        self._by_digest: Dict[str, str] = {}
+        self.stats = {"extracted": 0, "written": 0, "xref_hits": 0, "digest_hits": 0}
+
+    def path_for(self, doc, xref: int) -> str:
+        """doc の画像 xref を保存し、そのパスを返す"""
+        path = self._by_xref.get(xref)
+        if path is not None:
+            self.stats["xref_hits"] += 1
+            return path
+
+        base_image = doc.extract_image(xref)
+        self.stats["extracted"] += 1
+        path = self.put(base_image["image"], base_image["ext"])
+        self._by_xref[xref] = path
+        return path
+
+    def put(self, image_bytes: bytes, ext: str) -> str:
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        path = self._by_digest.get(digest)
+        if path is not None:
+            self.stats["digest_hits"] += 1
+            return path
+
+        path = os.path.join(self.output_dir, f"im_{digest[:32]}.{ext}")
+        if not (os.path.exists(path) and os.path.getsize(path) == len(image_bytes)):
+            _write_atomic(path, image_bytes)
+            self.stats["written"] += 1
+        self._by_digest[digest] = path
+        return path
+
+
+def _write_atomic(path: str, data: bytes):
+    # 複数プロセスが同じ画像を同時に書いても、中途半端なファイルが見えないようにする
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
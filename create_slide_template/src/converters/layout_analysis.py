@@ -0,0 +1,224 @@
+import math
+from collections import defaultdict
+from statistics import median
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# 同じ段落とみなすフォントサイズの差 (pt)
+SIZE_TOLERANCE = 0.5
+# 同じ段落とみなす行間の隙間 (フォントサイズに対する比率)
+MAX_LINE_GAP = 0.6
+# 左端のずれの許容量 (フォントサイズに対する比率)。これを超えても横方向の重なりが大きければ (中央揃え) 同じ段落
+MAX_INDENT = 1.5
+MIN_OVERLAP = 0.5
+# ページ幅に対してこれより広い段落は段組みをまたぐもの (見出し・全幅の本文) として扱う
+SPANNING_WIDTH = 0.5
+# 行内の span の間がこれ (フォントサイズに対する比率) 以上空いている、または空白が連続している行は
+# 表の行とみなして段落にまとめない (折り返して表示されると列が崩れるため)
+TABULAR_GAP = 1.0
+TABULAR_SPACES = "   "
+
+
+class TextLine(NamedTuple):
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+    text: str
+    size: float
+    tabular: bool = False
+    bold: bool = False
+
+
+class TextParagraph(NamedTuple):
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+    text: str
+    size: float
+    line_count: int
+    bold: bool = False
+
+
+def extract_lines(page_dict: Dict) -> List[TextLine]:
+    """get_text("dict") の結果から、空でない行を (bbox, テキスト, 最大フォントサイズ) として取り出す"""
+    lines = []
+    for block in page_dict["blocks"]:
+        if block["type"] != 0: # Text only
+            continue
+        for line in block["lines"]:
+            text = ""
+            size = 0
+            max_gap = 0
+            prev_x1 = None
+            bold_chars = 0
+            for span in line["spans"]:
+                if span["text"].strip():
+                    text += span["text"]
+                    if _is_bold(span):
+                        bold_chars += len(span["text"].strip())
+                    if span["size"] > size:
+                        size = span["size"]
+                    if prev_x1 is not None:
+                        max_gap = max(max_gap, span["bbox"][0] - prev_x1)
+                    prev_x1 = span["bbox"][2]
+            if text.strip():
+                x0, y0, x1, y1 = line["bbox"]
+                tabular = max_gap >= TABULAR_GAP * size or TABULAR_SPACES in text.strip()
+                bold = bold_chars * 2 > len(text.strip().replace(" ", ""))
+                lines.append(TextLine(x0, y0, x1, y1, text, size, tabular, bold))
+    return lines
+
+
+def _is_bold(span: Dict) -> bool:
+    # flags bit 4 = bold。フラグが立たないフォントもあるので名前も見る
+    return bool(span["flags"] & 16) or "bold" in span["font"].lower()
+
+
+def analyze_text_layout(page_dict: Dict, page_width: float) -> List[TextParagraph]:
+    """ページのテキストを段落単位にまとめ、読み順 (段組みを考慮) に並べて返す"""
+    lines = extract_lines(page_dict)
+    return reading_order(merge_lines(lines), page_width)
+
+
+def merge_lines(lines: List[TextLine]) -> List[TextParagraph]:
+    """
+    縦に隣接し、フォントサイズが同じで左端が揃っている (または横方向に大きく重なる) 行を段落にまとめる。
+    行の bbox をグリッド (空間インデックス) に登録し、各行の直下の候補だけを調べるので、
+    ソートを含めて O(n log n)。
+    """
+    if not lines:
+        return []
+
+    order = sorted(range(len(lines)), key=lambda i: (lines[i].y0, lines[i].x0))
+    cell = max(1.0, median(line.y1 - line.y0 for line in lines))
+    grid: Dict[int, List[int]] = defaultdict(list) # row of y0 -> line indices (in y0, x0 order)
+    for i in order:
+        grid[math.floor(lines[i].y0 / cell)].append(i)
+
+    successor: Dict[int, int] = {}
+    has_predecessor = set()
+    for i in order:
+        j = _find_next_line(lines, i, grid, cell, has_predecessor)
+        if j is not None:
+            successor[i] = j
+            has_predecessor.add(j)
+
+    paragraphs = []
+    for i in order:
+        if i in has_predecessor:
+            continue
+        chain = [lines[i]]
+        while i in successor:
+            i = successor[i]
+            chain.append(lines[i])
+        paragraphs.append(_make_paragraph(chain))
+    return paragraphs
+
+
+def _find_next_line(lines: List[TextLine], i: int, grid: Dict[int, List[int]], cell: float,
+                    taken: set) -> Optional[int]:
+    line = lines[i]
+    if line.tabular:
+        return None
+    max_gap = MAX_LINE_GAP * line.size
+    # 次の行の上端は line の下端の少し上 (行の bbox は重なることがある) から max_gap 下までの範囲
+    low = line.y1 - 0.5 * (line.y1 - line.y0)
+    high = line.y1 + max_gap
+
+    best = None
+    best_key = None
+    for row in range(math.floor(low / cell), math.floor(high / cell) + 1):
+        for j in grid.get(row, ()):
+            if j == i or j in taken:
+                continue
+            other = lines[j]
+            if other.tabular:
+                continue
+            if not (low <= other.y0 <= high) or other.y0 <= line.y0:
+                continue
+            if abs(other.size - line.size) > SIZE_TOLERANCE:
+                continue
+            if not _aligned(line, other):
+                continue
+            key = (other.y0, abs(other.x0 - line.x0))
+            if best_key is None or key < best_key:
+                best, best_key = j, key
+    return best
+
+
+def _aligned(a: TextLine, b: TextLine) -> bool:
+    if abs(a.x0 - b.x0) <= MAX_INDENT * a.size:
+        return True
+    overlap = min(a.x1, b.x1) - max(a.x0, b.x0)
+    narrower = min(a.x1 - a.x0, b.x1 - b.x0)
+    return narrower > 0 and overlap >= MIN_OVERLAP * narrower
+
+
+def _make_paragraph(chain: List[TextLine]) -> TextParagraph:
+    text = chain[0].text
+    for line in chain[1:]:
+        text = join_lines(text, line.text)
+    return TextParagraph(
+        min(line.x0 for line in chain), min(line.y0 for line in chain),
+        max(line.x1 for line in chain), max(line.y1 for line in chain),
+        text, max(line.size for line in chain), len(chain),
+        all(line.bold for line in chain)
+    )
+
+
+def join_lines(a: str, b: str) -> str:
+    """
+    折り返された行をつなぐ。欧文の単語どうしの間にだけ空白を入れる
+    (日本語は行末で単語が切れていても空白を入れない)。
+    """
+    a = a.rstrip()
+    b = b.lstrip()
+    if a and b and _is_latin(a[-1]) and _is_latin(b[0]):
+        return f"{a} {b}"
+    return a + b
+
+
+def _is_latin(ch: str) -> bool:
+    return ch.isascii() and (ch.isalnum() or ch in ",.;:!?)]}%\"'")
+
+
+def reading_order(paragraphs: List[TextParagraph], page_width: float) -> List[TextParagraph]:
+    """
+    段組みを考慮した読み順に並べる。
+    ページ幅の半分より広い段落 (見出し・全幅の本文) で上下の帯に区切り、
+    帯の中では横方向に重なる段落を1つの段 (column) にまとめて、左の段から順に上から下へ読む。
+    """
+    spanning = sorted((p for p in paragraphs if p.x1 - p.x0 > SPANNING_WIDTH * page_width),
+                      key=lambda p: (p.y0, p.x0))
+    narrow = sorted((p for p in paragraphs if p.x1 - p.x0 <= SPANNING_WIDTH * page_width),
+                    key=lambda p: (p.y0, p.x0))
+
+    ordered = []
+    n = 0
+    for separator in spanning + [None]:
+        band_end = separator.y0 if separator else math.inf
+        band = []
+        while n < len(narrow) and narrow[n].y0 < band_end:
+            band.append(narrow[n])
+            n += 1
+        ordered.extend(_order_columns(band))
+        if separator:
+            ordered.append(separator)
+    return ordered
+
+
+def _order_columns(band: List[TextParagraph]) -> List[TextParagraph]:
+    """横方向の区間が重なる段落を同じ段とし、段を左から、段の中を上から並べる"""
+    columns: List[Tuple[float, List[TextParagraph]]] = []
+    for p in sorted(band, key=lambda p: p.x0):
+        if columns and p.x0 < columns[-1][0]:
+            right, members = columns[-1]
+            members.append(p)
+            columns[-1] = (max(right, p.x1), members)
+        else:
+            columns.append((p.x1, [p]))
+    ordered = []
+    for _, members in columns:
+        ordered.extend(sorted(members, key=lambda p: (p.y0, p.x0)))
+    return ordered
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, Optional
+
+from src.schema.slide_schema import SlideContent
+
+
+class PageCache:
+    """
+    IntelligentPdfParser のページ単位の解析結果キャッシュ (長い PDF 変換の再開用チェックポイント)。
+
+    cache_dir/
+      pages/<page key>.json   ページの SlideContent (画像はファイル名のみ保存し、読み込み時に画像ディレクトリと結合)
+      docs/<PDF SHA-256>.json  チェックポイント: {"parser_version", "pages": {ページ番号: page key}}
+
+    page key はパーサーバージョン + ページの内容 (コンテンツストリーム、参照しているフォント・画像・フォーム)
+    のハッシュ。同じ PDF の再実行ではチェックポイントからページ番号で引くので、途中で失敗した変換は
+    解析済みのページを飛ばして再開できる。少し修正された PDF でも、内容が変わっていないページは再利用される。
+    """
+
+    def __init__(self, cache_dir: str, parser_version: str):
+        self.cache_dir = cache_dir
+        self.parser_version = parser_version
+        os.makedirs(os.path.join(cache_dir, "pages"), exist_ok=True)
+        os.makedirs(os.path.join(cache_dir, "docs"), exist_ok=True)
+
+    def open_document(self, pdf_path: str) -> "DocumentCheckpoint":
+        return DocumentCheckpoint(self, _file_sha256(pdf_path))
+
+    def page_key(self, doc, page_num: int) -> str:
+        """ページの解析結果を決める内容のハッシュ"""
+        page = doc[page_num]
+        h = hashlib.sha256(self.parser_version.encode("utf-8"))
+        h.update(repr(tuple(page.rect)).encode("utf-8"))
+        h.update(page.read_contents())
+
+        xrefs = {img[0] for img in page.get_images(full=True)}
+        xrefs.update(font[0] for font in page.get_fonts(full=True))
+        xrefs.update(xobj[0] for xobj in page.get_xobjects())
+        for xref in sorted(xrefs):
+            if xref <= 0:
+                continue
+            h.update(doc.xref_object(xref, compressed=True).encode("utf-8"))
+            if doc.xref_is_stream(xref):
+                h.update(hashlib.sha256(doc.xref_stream_raw(xref)).digest())
+        return h.hexdigest()
+
+    def load(self, key: str, image_dir: str) -> Optional[SlideContent]:
+        path = self._page_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                slide = SlideContent.model_validate_json(f.read())
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable page cache entry {path}: {e}")
+            return None
+
+        for i, (elem_type, content, *_) in enumerate(slide.elements.rows()):
+            if elem_type == "image":
+                image_path = os.path.join(image_dir, content)
+                # 画像ディレクトリが消されていたらページを解析し直す
+                if not os.path.exists(image_path):
+                    return None
+                slide.elements.set_content(i, image_path)
+        return slide
+
+    def store(self, key: str, slide: SlideContent):
+        # 画像はファイル名だけを保存する (PdfImageStore のファイル名は内容ハッシュなので出力先に依存しない)
+        entry = slide.model_copy(deep=True)
+        for i, (elem_type, content, *_) in enumerate(entry.elements.rows()):
+            if elem_type == "image":
+                entry.elements.set_content(i, os.path.basename(content))
+        _write_atomic(self._page_path(key), entry.model_dump_json())
+
+    def _page_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, "pages", f"{key}.json")
+
+    def _doc_path(self, pdf_digest: str) -> str:
+        return os.path.join(self.cache_dir, "docs", f"{pdf_digest}.json")
+
+
+class DocumentCheckpoint:
+    """1つの PDF (SHA-256) について、解析済みページ番号 -> page key を記録する"""
+
+    def __init__(self, cache: PageCache, pdf_digest: str):
+        self.cache = cache
+        self.pdf_digest = pdf_digest
+        self.page_keys: Dict[int, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+        path = cache._doc_path(pdf_digest)
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("parser_version") == cache.parser_version:
+                    self.page_keys = {int(k): v for k, v in data["pages"].items()}
+            except Exception as e:
+                print(f"Warning: Ignoring unreadable checkpoint {path}: {e}")
+
+    def lookup(self, doc, page_num: int, image_dir: str):
+        """(キャッシュ済みの SlideContent または None, page key) を返す"""
+        key = self.page_keys.get(page_num)
+        if key is None:
+            key = self.cache.page_key(doc, page_num)
+        slide = self.cache.load(key, image_dir)
+        if slide is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.page_keys[page_num] = key
+        return slide, key
+
+    def store(self, page_num: int, key: str, slide: SlideContent):
+        self.cache.store(key, slide)
+        self.page_keys[page_num] = key
+
+    def flush(self):
+        data = {"parser_version": self.cache.parser_version,
+                "pages": {str(k): v for k, v in sorted(self.page_keys.items())}}
+        _write_atomic(self.cache._doc_path(self.pdf_digest), json.dumps(data, indent=1))
+
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_atomic(path: str, text: str):
+    # 一時ファイルに書いてから置き換える (中断や並行実行で壊れたファイルを残さない)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
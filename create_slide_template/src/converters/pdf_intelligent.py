@@ -1,121 +1,265 @@
 import fitz  # PyMuPDF
 import os
-from typing import List, Dict, Tuple
-from src.schema.slide_schema import PresentationDeck, SlideContent, SlideType, SlideElement
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, FrozenSet, Iterator, Optional, Tuple
+from src.schema.slide_schema import PresentationDeck, SlideContent, SlideType, ElementStore
+from src.converters.image_store import PdfImageStore
+from src.converters.page_cache import PageCache, DocumentCheckpoint
+from src.converters.layout_analysis import analyze_text_layout
+from src.converters.font_stats import FontStatistics, sample_pages
+
+# ページの解析結果が変わる変更をしたら上げる (ページキャッシュの古い結果を使わないようにするため)
+PARSER_VERSION = "4"
+
+# フォント統計 (本文サイズ・見出しレベル) を取るために先に解析するページ数の上限
+STATS_SAMPLE_PAGES = 64
+
+# ページキャッシュのチェックポイントを書き出す間隔 (ページ数)
+CHECKPOINT_INTERVAL = 16
+
+# get_text("dict") flags: default set minus embedded image data
+TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# Per-process state of the parallel workers (set by _init_worker)
+_worker_state = {}
+
 
 class IntelligentPdfParser:
+    def __init__(self, workers: int = 1, pages_per_task: int = 16, page_cache_dir: Optional[str] = None):
+        """
+        workers: ページ解析のプロセス数。2以上で各ワーカーが PDF を開き、ページ範囲ごとに並列に解析する
+                 (結果はページ順に並べ直す)。
+        pages_per_task: ワーカーに渡すページ範囲の大きさ
+        page_cache_dir: ページ単位の解析結果キャッシュ (PageCache)。途中で失敗した変換の再開や、
+                        修正版 PDF で変わっていないページの再利用に使う。
+        """
+        self.workers = workers
+        self.pages_per_task = pages_per_task
+        self.page_cache = PageCache(page_cache_dir, PARSER_VERSION) if page_cache_dir else None
+
     def parse(self, pdf_path: str, output_image_dir: str = "output/images") -> PresentationDeck:
+        slides = list(self.iter_pages(pdf_path, output_image_dir))
+        return PresentationDeck(title=os.path.basename(pdf_path), slides=slides)
+
+    def iter_pages(self, pdf_path: str, output_image_dir: str = "output/images",
+                   max_in_flight: Optional[int] = None) -> Iterator[SlideContent]:
+        """
+        ページごとの SlideContent をページ順に yield する。
+        max_in_flight: 並列モードで、ワーカーに先行して解析させるページ数の上限 (None は全ページ)。
+                       消費側 (スライド生成など) が遅くても、解析済みのページが溜まり続けないようにする。
+                       全ワーカーが同時に動けるように、ページ範囲は max_in_flight // workers ページ以下に分ける。
+        """
         if not os.path.exists(pdf_path):
              raise FileNotFoundError(f"PDF not found: {pdf_path}")
         
         doc = fitz.open(pdf_path)
-        slides = []
+        page_count = len(doc)
+
+        print(f"Intelligent Parsing of {pdf_path} ({page_count} pages)...")
         
-        if not os.path.exists(output_image_dir):
-            os.makedirs(output_image_dir)
+        checkpoint = None
+        stats = {}
+        try:
+            checkpoint = self.page_cache.open_document(pdf_path) if self.page_cache else None
+            # Each unique image is written once (deduplicated by xref and content hash)
+            image_store = PdfImageStore(output_image_dir)
+
+            # 1st pass: 文書全体 (長い文書は均等に選んだページ) のフォントサイズの分布から本文サイズと見出しレベルを決める。
+            # 解析結果は2回目でそのまま使う (ページキャッシュにも入る)
+            sampled = {page_num: _analyze_page_cached(doc, page_num, image_store, checkpoint)
+                       for page_num in sample_pages(page_count, STATS_SAMPLE_PAGES)}
+            font_stats = FontStatistics.from_slides(sampled.values())
+            print(f"Font statistics: body {font_stats.body_size:g}pt, heading levels "
+                  f"{[f'{size:g}pt' for size in font_stats.level_sizes]} ({len(sampled)} pages sampled)")
+
+            # 2nd pass: 各ページのタイトル・サブタイトル・本文・キャプションとスライドの種類を決める
+            if self.workers > 1 and page_count > self._range_size(max_in_flight):
+                doc.close()
+                if checkpoint:
+                    checkpoint.flush()
+                # サンプルとして解析済みのページはワーカーでは解析しない (None が返る)
+                raw_pages = self._iter_parallel(pdf_path, page_count, output_image_dir, max_in_flight, checkpoint, stats,
+                                                skip_pages=frozenset(sampled))
+                for page_num, raw in enumerate(raw_pages):
+                    yield font_stats.classify(page_num, sampled.pop(page_num) if raw is None else raw)
+            else:
+                for page_num in range(page_count):
+                    raw = sampled.pop(page_num, None) or _analyze_page_cached(doc, page_num, image_store, checkpoint)
+                    yield font_stats.classify(page_num, raw)
+                    if checkpoint and (page_num + 1) % CHECKPOINT_INTERVAL == 0:
+                        checkpoint.flush()
+            for key, value in image_store.stats.items():
+                stats[key] = stats.get(key, 0) + value
+        finally:
+            # 失敗・中断した場合も PDF を閉じ、そこまでに解析したページを記録しておく (次回はその続きから)
+            if not doc.is_closed:
+                doc.close()
+            if checkpoint:
+                checkpoint.flush()
+
+        print(f"Images: {stats['extracted']} extracted, {stats['written']} written "
+              f"({stats['xref_hits']} reused by xref, {stats['digest_hits']} by content)")
+        if checkpoint:
+            print(f"Page cache: {checkpoint.hits} pages reused, {checkpoint.misses} analyzed")
 
-        print(f"Intelligent Parsing of {pdf_path} ({len(doc)} pages)...")
+    def _iter_parallel(self, pdf_path: str, page_count: int, output_image_dir: str, max_in_flight: Optional[int],
+                       checkpoint: Optional[DocumentCheckpoint], stats: Dict,
+                       skip_pages: FrozenSet[int] = frozenset()) -> Iterator[Optional[SlideContent]]:
+        """
+        ページ範囲をプロセスプールで解析し、ページ順に yield する (skip_pages のページは解析せずに None)。
+        ワーカーに渡した (解析中・解析済み) ページと、yield して消費側が処理中のページは合わせて max_in_flight ページまで。
+        """
+        range_size = self._range_size(max_in_flight)
+        ranges = deque((start, min(start + range_size, page_count)) for start in range(0, page_count, range_size))
+        max_pages = max_in_flight or page_count
         
-        for page_num, page in enumerate(doc):
-            # 1. Analyze Layout (Text Blocks)
-            # blocks = page.get_text("dict")["blocks"]
-            text_blocks = page.get_text("blocks") # (x0, y0, x1, y1, "text", block_no, block_type)
-            
-            # Filter valid text blocks
-            # block_type=0 is text, 1 is image
-            
-            # Identify Title (Topmost, largest font? - tough with "blocks", better with "dict")
-            # Let's switch to "dict" for font size details
-            page_dict = page.get_text("dict")
-            
-            elements = []
-            title_candidate = None
-            max_font_size = 0
+        cache_args = (self.page_cache.cache_dir, checkpoint.pdf_digest) if checkpoint else None
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                   initargs=(pdf_path, output_image_dir, cache_args, skip_pages))
+        pending = deque()
+        in_flight = 0 # ワーカーに渡してまだ yield していないページ数
+
+        def fill():
+            nonlocal in_flight
+            while ranges and (in_flight == 0 or in_flight + ranges[0][1] - ranges[0][0] <= max_pages):
+                start, end = ranges.popleft()
+                pending.append(pool.submit(_analyze_range, (start, end)))
+                in_flight += end - start
+
+        try:
+            fill()
+            while pending:
+                chunk_slides, chunk_stats, chunk_keys = pending.popleft().result()
+                for key, value in chunk_stats.items():
+                    stats[key] = stats.get(key, 0) + value
+                if checkpoint:
+                    checkpoint.page_keys.update(chunk_keys)
+                    checkpoint.hits += chunk_stats["page_hits"]
+                    checkpoint.misses += chunk_stats["page_misses"]
+                    checkpoint.flush()
+                # Results are consumed in submission (= page) order. A page frees room for more once the
+                # consumer comes back for the next one (so the page being consumed still counts as in flight)
+                for slide in chunk_slides:
+                    yield slide
+                    in_flight -= 1
+                    fill()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _range_size(self, max_in_flight: Optional[int]) -> int:
+        """ワーカーに渡すページ範囲の大きさ (max_in_flight がある場合は workers 個の範囲が収まる大きさ)"""
+        if not max_in_flight:
+            return self.pages_per_task
+        return max(1, min(self.pages_per_task, max_in_flight // max(1, self.workers)))
+
+    @staticmethod
+    def _analyze_page(doc, page_num: int, image_store: PdfImageStore) -> SlideContent:
+        """
+        1ページの解析結果。テキストは全て段落の要素のままで、タイトル・スライドの種類は
+        文書全体のフォント統計を使って FontStatistics.classify で決める。
+        """
+        page = doc[page_num]
+        
+        # 1. Analyze Layout (Text Blocks)
+        # "dict" gives font size details. Image blocks are excluded (TEXT_PRESERVE_IMAGES off):
+        # images are located via get_image_rects below, so their pixel data is not needed here.
+        page_dict = page.get_text("dict", flags=TEXT_FLAGS)
+        
+        # Elements go straight into the columnar store (no per-element model / validation)
+        elements = ElementStore()
+        
+        page_width = page.rect.width
+        page_height = page.rect.height
+        
+        # --- Text Processing ---
+        # Lines are merged into paragraphs (same font size, adjacent, aligned) and put in reading order,
+        # so a dense page becomes a few textboxes instead of one per PyMuPDF block
+        for para in analyze_text_layout(page_dict, page_width):
+            # Normalize bbox
+            norm_rect = [
+                para.x0 / page_width,
+                para.y0 / page_height,
+                (para.x1 - para.x0) / page_width,
+                (para.y1 - para.y0) / page_height
+            ]
             
-            page_width = page.rect.width
-            page_height = page.rect.height
+            elements.append(
+                "text",
+                para.text,
+                rect=norm_rect,
+                font_size=para.size,
+                attributes={"bold": True} if para.bold else None
+            )
+
+        # --- Image Extraction ---
+        image_list = page.get_images(full=True)
+        seen_xrefs = set()
+        for img in image_list:
+            xref = img[0]
+            # get_images may list the same xref more than once; get_image_rects already returns every placement
+            if xref in seen_xrefs:
+                continue
+            seen_xrefs.add(xref)
+            image_path = image_store.path_for(doc, xref)
             
-            # --- Text Processing ---
-            for block in page_dict["blocks"]:
-                if block["type"] == 0: # Text
-                    # Check lines/spans for font size
-                    block_text = ""
-                    block_font_size = 0
-                    
-                    for line in block["lines"]:
-                        for span in line["spans"]:
-                            if span["text"].strip():
-                                block_text += span["text"]
-                                # Initial font size of the block
-                                if span["size"] > block_font_size:
-                                    block_font_size = span["size"]
-                    
-                    if not block_text.strip():
-                        continue
-                        
-                    # Normalize bbox
-                    bbox = block["bbox"]
-                    norm_rect = [
-                        bbox[0] / page_width,
-                        bbox[1] / page_height,
-                        (bbox[2] - bbox[0]) / page_width,
-                        (bbox[3] - bbox[1]) / page_height
-                    ]
-                    
-                    # Heuristic for Title: Top 20% of page, large font
-                    is_title = False
-                    if norm_rect[1] < 0.2 and block_font_size > max_font_size:
-                        max_font_size = block_font_size
-                        title_candidate = block_text
-                        is_title = True
-                    
-                    if not is_title:
-                        elements.append(SlideElement(
-                            type="text",
-                            content=block_text,
-                            rect=norm_rect,
-                            font_size=block_font_size
-                        ))
-
-            # --- Image Extraction ---
-            image_list = page.get_images(full=True)
-            for img_idx, img in enumerate(image_list):
-                xref = img[0]
-                base_image = doc.extract_image(xref)
-                image_bytes = base_image["image"]
-                image_ext = base_image["ext"]
-                image_filename = f"im_p{page_num}_{img_idx}.{image_ext}"
-                image_path = os.path.join(output_image_dir, image_filename)
-                
-                with open(image_path, "wb") as f:
-                    f.write(image_bytes)
-                
-                # Try to find image location
-                # get_images doesn't give location directly. 
-                # We need to search for the image in the page's "image type" blocks or use get_image_rects
-                image_rects = page.get_image_rects(xref)
-                for rect in image_rects:
-                    norm_rect = [
-                        rect.x0 / page_width,
-                        rect.y0 / page_height,
-                        rect.width / page_width,
-                        rect.height / page_height
-                    ]
-                    elements.append(SlideElement(
-                        type="image",
-                        content=image_path,
-                        rect=norm_rect
-                    ))
-
-            # Construct Slide
-            slide_type = SlideType.CONTENT
-            if page_num == 0:
-                slide_type = SlideType.COVER
-                
-            slides.append(SlideContent(
-                type=slide_type,
-                title=title_candidate if title_candidate else "No Title",
-                elements=elements
-            ))
+            # Try to find image location
+            # get_images doesn't give location directly. 
+            # We need to search for the image in the page's "image type" blocks or use get_image_rects
+            image_rects = page.get_image_rects(xref)
+            for rect in image_rects:
+                norm_rect = [
+                    rect.x0 / page_width,
+                    rect.y0 / page_height,
+                    rect.width / page_width,
+                    rect.height / page_height
+                ]
+                elements.append("image", image_path, rect=norm_rect)
 
-        return PresentationDeck(title=os.path.basename(pdf_path), slides=slides)
+        return SlideContent(type=SlideType.CONTENT, elements=elements)
+
+
+
+def _analyze_page_cached(doc, page_num: int, image_store: PdfImageStore,
+                         checkpoint: Optional[DocumentCheckpoint]) -> SlideContent:
+    if checkpoint is None:
+        return IntelligentPdfParser._analyze_page(doc, page_num, image_store)
+    slide, key = checkpoint.lookup(doc, page_num, image_store.output_dir)
+    if slide is None:
+        slide = IntelligentPdfParser._analyze_page(doc, page_num, image_store)
+        checkpoint.store(page_num, key, slide)
+    return slide
+
+
+def _init_worker(pdf_path: str, output_image_dir: str, cache_args: Optional[Tuple[str, str]],
+                 skip_pages: FrozenSet[int] = frozenset()):
+    # 各ワーカーで1回だけ PDF を開く。画像ストアはワーカーごとだが、
+    # ファイル名が内容ハッシュなので同じ画像は同じパスになる
+    _worker_state["doc"] = fitz.open(pdf_path)
+    _worker_state["skip_pages"] = skip_pages
+    _worker_state["image_store"] = PdfImageStore(output_image_dir)
+    _worker_state["checkpoint"] = None
+    if cache_args:
+        cache_dir, pdf_digest = cache_args
+        _worker_state["checkpoint"] = DocumentCheckpoint(PageCache(cache_dir, PARSER_VERSION), pdf_digest)
+
+
+def _analyze_range(page_range: Tuple[int, int]) -> Tuple[List[Optional[SlideContent]], Dict, Dict[int, str]]:
+    doc = _worker_state["doc"]
+    image_store = _worker_state["image_store"]
+    checkpoint = _worker_state["checkpoint"]
+    skip_pages = _worker_state["skip_pages"]
+    before = dict(image_store.stats)
+    hits, misses = (checkpoint.hits, checkpoint.misses) if checkpoint else (0, 0)
+    
+    analyzed = [page_num for page_num in range(*page_range) if page_num not in skip_pages]
+    results = {page_num: _analyze_page_cached(doc, page_num, image_store, checkpoint) for page_num in analyzed}
+    slides = [results.get(page_num) for page_num in range(*page_range)]
+    
+    stats = {key: image_store.stats[key] - before[key] for key in before}
+    keys = {}
+    if checkpoint:
+        stats["page_hits"] = checkpoint.hits - hits
+        stats["page_misses"] = checkpoint.misses - misses
+        keys = {page_num: checkpoint.page_keys[page_num] for page_num in analyzed}
+    return slides, stats, keys
@@ -0,0 +1,183 @@
+import hashlib
+import os
+import queue
+import tempfile
+import threading
+from typing import Iterable, Iterator, List, Optional, TypeVar
+
+from src.converters.deck_to_md import DeckToMarkdownConverter
+from src.schema.slide_schema import SlideContent
+
+T = TypeVar("T")
+
+
+class _EndOfStream:
+    def __init__(self, error: Optional[BaseException] = None):
+        self.error = error
+
+
+def bounded_stage(iterable: Iterable[T], maxsize: int, name: str = "stage") -> Iterator[T]:
+    """
+    iterable を別スレッドで先読みし、最大 maxsize 件をキューに溜めながら yield する。
+    生産側 (PDF 解析など) と消費側 (スライド生成など) を並行に動かしつつ、
+    消費が遅いときは生産側がキューの空きを待つのでメモリ使用量は増え続けない。
+    生産側の例外は消費側で再送出する。消費側が途中でやめた場合は生産スレッドも止める。
+    """
+    q: "queue.Queue" = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(_EndOfStream())
+        except BaseException as e:
+            put(_EndOfStream(e))
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, name=f"pipeline-{name}", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if isinstance(item, _EndOfStream):
+                if item.error is not None:
+                    raise item.error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def tee_markdown(slides: Iterable[SlideContent], md_path: str, source_path: Optional[str] = None) -> Iterator[SlideContent]:
+    """
+    スライドを素通ししながら、中間 Markdown を1スライドずつ md_path に書き出す。
+    一時ファイルに書いて最後まで進んだら置き換えるので、失敗・中断した場合は前回の md_path とマーカーがそのまま残る
+    (途中までの Markdown が「編集された中間 Markdown」と見なされない)。
+    """
+    md_dir = os.path.dirname(md_path)
+    if md_dir:
+        os.makedirs(md_dir, exist_ok=True)
+
+    serializer = DeckToMarkdownConverter()
+    fd, tmp_path = tempfile.mkstemp(dir=md_dir or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for i, slide in enumerate(slides):
+                f.write(serializer.slide_chunk(slide, i))
+                yield slide
+        os.replace(tmp_path, md_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    record_intermediate(md_path, source_path)
+
+
+def write_intermediate(md_path: str, md_text: str, source_path: Optional[str] = None):
+    """中間 Markdown を一時ファイル経由で書き出し、マーカーを記録する"""
+    md_dir = os.path.dirname(md_path)
+    if md_dir:
+        os.makedirs(md_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=md_dir or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(md_text)
+        os.replace(tmp_path, md_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    record_intermediate(md_path, source_path)
+
+
+def intermediate_marker_path(md_path: str) -> str:
+    return f"{md_path}.sha256"
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def record_intermediate(md_path: str, source_path: Optional[str] = None) -> str:
+    """
+    書き出した中間 Markdown のハッシュをサイドカー (<md>.sha256) に記録する。
+    2行目には元の PDF (source_path) のハッシュを記録する (どの PDF から抽出したか)。
+    """
+    digest = file_sha256(md_path)
+    lines = [digest]
+    if source_path:
+        lines.append(file_sha256(source_path))
+    with open(intermediate_marker_path(md_path), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return digest
+
+
+def _read_marker(md_path: str) -> Optional[List[str]]:
+    marker = intermediate_marker_path(md_path)
+    if not (os.path.exists(md_path) and os.path.exists(marker)):
+        return None
+    with open(marker, "r", encoding="utf-8") as f:
+        return f.read().split()
+
+
+def intermediate_unchanged(md_path: str) -> bool:
+    """
+    中間 Markdown が書き出した時のまま (ユーザーが編集していない) なら True。
+    この場合は読み直さずにメモリ上のデッキをそのまま使える
+    (Markdown は rect を小数4桁で書くので、読み直すと精度も落ちる)。
+    """
+    recorded = _read_marker(md_path)
+    return bool(recorded) and recorded[0] == file_sha256(md_path)
+
+
+def stream_pdf_pages(pdf_parser, pdf_path: str, output_image_dir: str, max_in_flight: int = 8,
+                     intermediate_path: Optional[str] = None) -> Iterator[SlideContent]:
+    """
+    PDF 解析 -> (中間 Markdown 書き出し) -> 消費側 (SlideBuilder.build など) をつなぐジェネレーター。
+    解析は別スレッドで進む。解析済みで消費されていないページは、パーサーが先行して解析するページ
+    (キューに入れる待ちのページを含む) と段の間のキュー (max_in_flight の 1/4) を合わせて max_in_flight ページまで
+    (max_in_flight が 1 の場合は 2)。
+    """
+    queue_size = max(1, max_in_flight // 4)
+    parser_pages = max(1, max_in_flight - queue_size)
+    pages = pdf_parser.iter_pages(pdf_path, output_image_dir, max_in_flight=parser_pages)
+    pages = bounded_stage(pages, queue_size, name="extract")
+    if intermediate_path:
+        pages = tee_markdown(pages, intermediate_path, pdf_path)
+    return pages
+
+
+def intermediate_edited(md_path: str, source_path: str) -> bool:
+    """
+    前回 source_path (PDF) から書き出した中間 Markdown が、その後ユーザーによって編集されていれば True。
+    PDF が変わった (または記録が無い) 場合は False (編集は古い PDF に対するものなので、抽出し直す)。
+    """
+    recorded = _read_marker(md_path)
+    if not recorded or recorded[0] == file_sha256(md_path):
+        return False
+    return len(recorded) > 1 and os.path.exists(source_path) and recorded[1] == file_sha256(source_path)
+
+
+def intermediate_stale(md_path: str, source_path: str) -> bool:
+    """中間 Markdown は編集されているが、別の (変更された) PDF から抽出したものなら True"""
+    recorded = _read_marker(md_path)
+    return bool(recorded) and recorded[0] != file_sha256(md_path) and not intermediate_edited(md_path, source_path)
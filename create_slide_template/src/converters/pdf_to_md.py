@@ -1,79 +1,217 @@
 import os
-from pypdf import PdfReader
-from typing import List
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterator, List, Tuple, Union
+
+
+class PypdfTextBackend:
+    """pypdf の page.extract_text() (純 Python。遅いが依存が軽い)"""
+    name = "pypdf"
+
+    def open(self, pdf_path: str):
+        from pypdf import PdfReader
+        return PdfReader(pdf_path)
+
+    def page_count(self, doc) -> int:
+        return len(doc.pages)
+
+    def page_text(self, doc, page_num: int) -> str:
+        return doc.pages[page_num].extract_text()
+
+    def close(self, doc):
+        pass
+
+
+class PymupdfTextBackend:
+    """PyMuPDF の page.get_text("text") (pdf_intelligent.py と同じライブラリ。pypdf より数倍速い)"""
+    name = "pymupdf"
+
+    def open(self, pdf_path: str):
+        import fitz  # PyMuPDF (pdf_intelligent.py と同じ import 名)
+        return fitz.open(pdf_path)
+
+    def page_count(self, doc) -> int:
+        return len(doc)
+
+    def page_text(self, doc, page_num: int) -> str:
+        return doc[page_num].get_text("text")
+
+    def close(self, doc):
+        doc.close()
+
+
+# テキスト抽出バックエンド。open / page_count / page_text / close を持つクラスを登録すれば追加できる
+TEXT_BACKENDS = {
+    PypdfTextBackend.name: PypdfTextBackend,
+    PymupdfTextBackend.name: PymupdfTextBackend,
+}
+
+# Per-process state of the parallel workers (set by _init_worker)
+_worker_state = {}
+
 
 class PdfToMarkdownConverter:
-    def convert(self, pdf_path: str) -> str:
+    def __init__(self, backend: str = "pypdf", workers: int = 1, pages_per_task: int = 16):
+        """
+        backend: テキスト抽出バックエンド (TEXT_BACKENDS の名前、またはバックエンドのインスタンス)。
+                 convert / iter_chunks / convert_to_file の呼び出しごとに変えることもできる。
+        workers: ページ抽出のプロセス数。2以上で各ワーカーが PDF を開き、ページ範囲ごとに並列に抽出する
+                 (結果はページ順に並べ直す)。
+        pages_per_task: ワーカーに渡すページ範囲の大きさ
+        """
+        self.backend = backend
+        self.workers = workers
+        self.pages_per_task = pages_per_task
+
+    def convert(self, pdf_path: str, backend=None) -> str:
         """
         Converts a PDF file to a Markdown string compatible with the slide parser.
-        
+
         Strategy:
         - Each page becomes a slide.
         - First non-empty line is treated as Title.
         - Second non-empty line (if short) is treated as Subtitle.
         - Remaining text is Body.
         """
+        return "".join(self.iter_chunks(pdf_path, backend))
+
+    def convert_to_file(self, pdf_path: str, md_path: str, backend=None) -> int:
+        """
+        Markdown を1ページずつ md_path に書き出す (文書全体の文字列を作らない)。
+        一時ファイルに書いてから置き換えるので、途中で失敗しても前回の md_path は壊れない。
+        書き出したスライド数を返す。
+        """
+        md_dir = os.path.dirname(md_path)
+        if md_dir:
+            os.makedirs(md_dir, exist_ok=True)
+
+        slide_count = 0
+        fd, tmp_path = tempfile.mkstemp(dir=md_dir or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for chunk in self.iter_chunks(pdf_path, backend):
+                    f.write(chunk)
+                    slide_count += 1
+            os.replace(tmp_path, md_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return slide_count
+
+    def iter_chunks(self, pdf_path: str, backend=None) -> Iterator[str]:
+        """スライドごとの Markdown 文字列を yield する (連結すると convert() の結果と同じ)"""
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF not found: {pdf_path}")
 
-        reader = PdfReader(pdf_path)
+        backend = _resolve_backend(backend if backend is not None else self.backend)
+        first = True
+        for page_num, text in self._iter_page_texts(pdf_path, backend):
+            md_lines = self._page_lines(page_num, text)
+            if not md_lines:
+                continue
+            chunk = "\n".join(md_lines)
+            yield chunk if first else "\n" + chunk
+            first = False
+
+    def _iter_page_texts(self, pdf_path: str, backend) -> Iterator[Tuple[int, str]]:
+        doc = backend.open(pdf_path)
+        try:
+            page_count = backend.page_count(doc)
+            if self.workers <= 1 or page_count <= self.pages_per_task:
+                for page_num in range(page_count):
+                    yield page_num, backend.page_text(doc, page_num)
+                return
+        finally:
+            backend.close(doc)
+
+        # ページ範囲をプロセスプールで抽出し、ページ順に yield する。
+        # 先行して抽出させる範囲はワーカー数の2倍までにして、書き出しが遅くてもテキストが溜まらないようにする
+        ranges = iter([(start, min(start + self.pages_per_task, page_count))
+                       for start in range(0, page_count, self.pages_per_task)])
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                   initargs=(pdf_path, backend))
+        try:
+            pending = deque(pool.submit(_extract_range, r) for r in islice(ranges, self.workers * 2))
+            while pending:
+                texts = pending.popleft().result()
+                for r in islice(ranges, 1):
+                    pending.append(pool.submit(_extract_range, r))
+                yield from texts
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _page_lines(self, i: int, text: str) -> List[str]:
         md_output = []
+        if not text.strip():
+            return md_output
 
-        # Add initial layout comment for the first slide (usually Cover is better manually set, but logic here helps)
-        # md_output.append("<!-- layout: 表紙 -->")
-        # We'll default everything to Content layout for now, or let the parser default take over.
+        lines = [l.strip() for l in text.split('\n') if l.strip()]
 
-        for i, page in enumerate(reader.pages):
-            text = page.extract_text()
-            if not text.strip():
-                continue
-            
-            lines = [l.strip() for l in text.split('\n') if l.strip()]
-            
-            if not lines:
-                continue
+        if not lines:
+            return md_output
+
+        # Slide delimiter
+        if i > 0:
+            md_output.append("\n---\n")
+
+        # Simple Heuristic
+        # Line 1: Title
+        title = lines[0]
+
+        # Line 2: Subtitle? (If short and verified not to be a long sentence)
+        subtitle = None
+        body_start_idx = 1
 
-            # Slide delimiter
-            if i > 0:
-                md_output.append("\n---\n")
-            
-            # Simple Heuristic
-            # Line 1: Title
-            title = lines[0]
-            
-            # Line 2: Subtitle? (If short and verified not to be a long sentence)
-            subtitle = None
-            body_start_idx = 1
-            
-            if len(lines) > 1:
-                potential_subtitle = lines[1]
-                if len(potential_subtitle) < 50: # Arbitrary threshold
-                    subtitle = potential_subtitle
-                    body_start_idx = 2
-            
-            # Layout determination (Naive)
-            # If it's the first page, assume Cover
-            layout = "コンテンツ"
-            if i == 0:
-                layout = "表紙"
-                md_output.append(f"<!-- layout: {layout} -->")
+        if len(lines) > 1:
+            potential_subtitle = lines[1]
+            if len(potential_subtitle) < 50: # Arbitrary threshold
+                subtitle = potential_subtitle
+                body_start_idx = 2
+
+        # Layout determination (Naive)
+        # If it's the first page, assume Cover
+        layout = "コンテンツ"
+        if i == 0:
+            layout = "表紙"
+        md_output.append(f"<!-- layout: {layout} -->")
+
+        # Construct MD
+        md_output.append(f"# {title}")
+        if subtitle:
+            md_output.append(f"## {subtitle}")
+
+        md_output.append("") # Spacer
+
+        # Body
+        for line in lines[body_start_idx:]:
+            # Check for list-like items (starts with -, *, number)
+            # If not, just append as text
+            if line.startswith(('-', '*', '•')):
+                 md_output.append(f"- {line.lstrip('-*• ')}")
             else:
-                md_output.append(f"<!-- layout: {layout} -->")
-            
-            # Construct MD
-            md_output.append(f"# {title}")
-            if subtitle:
-                md_output.append(f"## {subtitle}")
-            
-            md_output.append("") # Spacer
-            
-            # Body
-            for line in lines[body_start_idx:]:
-                # Check for list-like items (starts with -, *, number)
-                # If not, just append as text
-                if line.startswith(('-', '*', '•')):
-                     md_output.append(f"- {line.lstrip('-*• ')}")
-                else:
-                     md_output.append(line)
-        
-        return "\n".join(md_output)
+                 md_output.append(line)
+
+        return md_output
+
+
+def _resolve_backend(backend: Union[str, object]):
+    if not isinstance(backend, str):
+        return backend
+    if backend not in TEXT_BACKENDS:
+        raise ValueError(f"Unknown PDF text backend: {backend} (available: {', '.join(TEXT_BACKENDS)})")
+    return TEXT_BACKENDS[backend]()
+
+
+def _init_worker(pdf_path: str, backend):
+    # 各ワーカーで1回だけ PDF を開く
+    _worker_state["backend"] = backend
+    _worker_state["doc"] = backend.open(pdf_path)
+
+
+def _extract_range(page_range: Tuple[int, int]) -> List[Tuple[int, str]]:
+    backend = _worker_state["backend"]
+    doc = _worker_state["doc"]
+    return [(page_num, backend.page_text(doc, page_num)) for page_num in range(*page_range)]
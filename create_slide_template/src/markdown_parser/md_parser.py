@@ -1,29 +1,46 @@
+import io
 import re
 import sys
 import os
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, TextIO
 
 # Adjust path to include src if running from root
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
 
-from src.schema.slide_schema import PresentationDeck, SlideContent, SlideType, ChartData, ChartType, SlideElement
+from src.schema.slide_schema import PresentationDeck, SlideContent, SlideType, ChartData, ChartType, ElementStore, LAYOUT_MAP
+from src.markdown_parser.slide_cache import SlideCache
+from src.utils.columnar import parse_csv_columns
+from src.markdown_parser.tokenizer import tokenize_line, parse_params, canonical_element, FENCE, LAYOUT, ELEMENT, COMMENT, H1, H2
+
+IMAGE_LINK = re.compile(r'!\[.*?\]\((.*?)\)')
 
 class MarkdownParser:
+    # スライド区切り行 (---)
+    SLIDE_DELIMITER = re.compile(r'^---+\s*$')
+
+    def __init__(self, cache: Optional[SlideCache] = None, track_hashes: bool = False):
+        """
+        cache: 指定すると、内容が変わっていないスライドブロックはパースせずキャッシュから再利用する。
+        track_hashes: キャッシュが無くても slide_hashes を記録する
+        直近のパース結果について以下を記録する:
+          slide_hashes   -- スライド順の各ブロックの内容ハッシュ (cache か track_hashes を指定した場合のみ)
+          changed_slides -- キャッシュに無かった (=新規・編集された) スライドのインデックス
+        """
+        self.cache = cache
+        self.track_hashes = track_hashes
+        self.slide_hashes: List[str] = []
+        self.changed_slides: List[int] = []
+        self._slide_count = 0
+
     def parse(self, md_text: str) -> PresentationDeck:
         """MarkdownテキストをパースしてPresentationDeckを返す"""
-        
-        # スライド区切り (---) で分割
-        slide_blocks = re.split(r'^---+\s*$', md_text, flags=re.MULTILINE)
-        
         slides: List[SlideContent] = []
         deck_title = "Untitled Presentation"
+        self._reset_tracking()
         
-        for i, block in enumerate(slide_blocks):
-            if not block.strip():
-                continue
-                
-            slide = self._parse_slide_block(block)
+        for i, block in self._iter_slide_blocks(io.StringIO(md_text)):
+            slide = self._parse_block_cached(block)
             slides.append(slide)
             
             # Use the title of the first slide (usually Cover) as the deck title
@@ -32,9 +49,62 @@ class MarkdownParser:
         
         return PresentationDeck(title=deck_title, slides=slides)
 
-    def _parse_slide_block(self, block: str) -> SlideContent:
-        lines = block.strip().split('\n')
+    def parse_iter(self, fp: TextIO) -> Iterator[SlideContent]:
+        """
+        ファイルハンドル（または任意の行イテラブル）を1行ずつ読み、
+        スライドが完成するたびに SlideContent を yield する。
+        全文・全ブロックを保持しないため、巨大なデッキでもメモリ使用量は一定。
+        """
+        self._reset_tracking()
+        for _, block in self._iter_slide_blocks(fp):
+            yield self._parse_block_cached(block)
+
+    def _reset_tracking(self):
+        self.slide_hashes = []
+        self.changed_slides = []
+        self._slide_count = 0
+
+    def _parse_block_cached(self, block: str) -> SlideContent:
+        slide_index = self._slide_count
+        self._slide_count += 1
+        if self.cache is None and not self.track_hashes:
+            # キャッシュを使わない場合はハッシュを計算しない
+            self.changed_slides.append(slide_index)
+            return self._parse_slide_block(block)
         
+        key = SlideCache.block_hash(block)
+        self.slide_hashes.append(key)
+        slide = self.cache.get(key) if self.cache else None
+        if slide is None:
+            slide = self._parse_slide_block(block)
+            self.changed_slides.append(slide_index)
+            if self.cache:
+                self.cache.put(key, slide)
+        return slide
+
+    def _iter_slide_blocks(self, fp: TextIO) -> Iterator[tuple]:
+        """
+        区切り (---) ごとに (ブロック番号, ブロック文字列) を yield する。
+        空のブロックはスキップするが、番号は re.split 時と同じく数える。
+        """
+        block_index = 0
+        buffer: List[str] = []
+        
+        for line in fp:
+            if line.startswith('---') and self.SLIDE_DELIMITER.match(line.rstrip('\r\n')):
+                block = "".join(buffer)
+                if block.strip():
+                    yield block_index, block
+                block_index += 1
+                buffer = []
+                continue
+            buffer.append(line)
+        
+        block = "".join(buffer)
+        if block.strip():
+            yield block_index, block
+
+    def _parse_slide_block(self, block: str) -> SlideContent:
         # Default values
         slide_type = SlideType.CONTENT
         title = None
@@ -46,33 +116,30 @@ class MarkdownParser:
         code_block_content = []
         code_block_lang = ""
         
-        elements = []
-        current_element_params = None
-
-        layout_map = {
-            "表紙": SlideType.COVER,
-            "目次": SlideType.TOC,
-            "中見出し": SlideType.SECTION,
-            "コンテンツ": SlideType.CONTENT,
-            "裏表紙": SlideType.BACK_COVER
-        }
+        # Element rows; stored column-wise at the end (no SlideElement model per element)
+        element_rows = []
+        current_element = None
 
-        for line in lines:
-            line = line.strip()
+        for raw_line in block.strip().split('\n'):
+            line = raw_line.strip()
             
-            # 1. レイアウト解析 (<!-- layout: XXX -->)
-            layout_match = re.match(r'<!--\s*layout:\s*(.+?)\s*-->', line)
-            if layout_match:
-                layout_name = layout_match.group(1).strip()
-                slide_type = layout_map.get(layout_name, SlideType.CONTENT)
+            # Element content: the line right after an element directive belongs to it
+            if current_element is not None:
+                elem_type, rect, font_size, color, attributes = current_element
+                content_val = line
+                if elem_type == "image":
+                    # Strip markdown image syntax if present
+                    img_m = IMAGE_LINK.match(line)
+                    if img_m:
+                        content_val = img_m.group(1)
+                element_rows.append((elem_type, content_val, rect, font_size, color, attributes))
+                current_element = None
                 continue
             
-            # Skip other comments
-            if line.startswith('<!--'):
-                continue
-
+            kind, value = tokenize_line(line)
+            
             # Code Block Handling (Charts)
-            if line.startswith('```'):
+            if kind == FENCE:
                 if in_code_block:
                     # End of block
                     in_code_block = False
@@ -84,76 +151,41 @@ class MarkdownParser:
                 else:
                     # Start of block
                     in_code_block = True
-                    code_block_lang = line.replace('```', '').strip()
+                    code_block_lang = value
                 continue
             
             if in_code_block:
                 code_block_content.append(line)
                 continue
-
-            # Title Parsing (# )
-            if not title and line.startswith('# '):
-                title = line.replace('# ', '').strip()
-                continue
             
-            # Subtitle Parsing (## )
-            if not subtitle and line.startswith('## '):
-                subtitle = line.replace('## ', '').strip()
-                continue
+            # レイアウト解析 (<!-- layout: XXX -->)
+            if kind == LAYOUT:
+                slide_type = LAYOUT_MAP.get(value, SlideType.CONTENT)
             
             # Custom Element Parsing
             # Syntax: <!-- element: type=text, rect=[0.1, 0.2, 0.3, 0.4], size=12, color=[0,0,0] -->
-            element_match = re.match(r'<!--\s*element:\s*(.+?)\s*-->', line)
-            if element_match:
-                param_str = element_match.group(1).strip()
-                # Parse params (naive split by comma, careful with lists)
-                # Let's simple regex for rect
-                params = {}
-                
-                type_match = re.search(r'type=(\w+)', param_str)
-                if type_match: params['type'] = type_match.group(1)
-                
-                rect_match = re.search(r'rect=\[([\d\.\s,]+)\]', param_str)
-                if rect_match:
-                   rect_vals = [float(x) for x in rect_match.group(1).split(',')]
-                   params['rect'] = rect_vals
-                   
-                size_match = re.search(r'size=([\d\.]+)', param_str)
-                if size_match: params['size'] = float(size_match.group(1))
-                
-                color_match = re.search(r'color=\[([\d\.\s,]+)\]', param_str)
-                if color_match:
-                   color_vals = [int(x) for x in color_match.group(1).split(',')]
-                   params['color'] = color_vals
-                   
-                # Mark upcoming lines as content for this element until empty line
-                current_element_params = params
-                continue
+            elif kind == ELEMENT:
+                try:
+                    # deck_to_md の出力そのままの形は1回のマッチで読む
+                    fields = canonical_element(value)
+                    current_element = (*fields, {}) if fields else self._element_fields(parse_params(value))
+                except ValueError as e:
+                    print(f"Warning: Skipping malformed element directive: {e}")
             
-            # If we are inside an element context (capturing multiline content?)
-            # Simplifying assumption: Element content is the next non-empty line(s)
-            # Actually, let's treat the *next* line as content if type=text/image
+            # Skip other comments
+            elif kind == COMMENT:
+                pass
+            
+            # Title Parsing (# )
+            elif kind == H1 and not title:
+                title = value
+            
+            # Subtitle Parsing (## )
+            elif kind == H2 and not subtitle:
+                subtitle = value
             
-            if current_element_params:
-                content_val = line
-                if current_element_params.get("type") == "image":
-                     # Strip markdown image syntax if present
-                     img_m = re.match(r'!\[.*?\]\((.*?)\)', line)
-                     if img_m:
-                         content_val = img_m.group(1)
-
-                elements.append(SlideElement(
-                    type=current_element_params.get("type", "text"),
-                    content=content_val,
-                    rect=current_element_params.get("rect"),
-                    font_size=current_element_params.get("size"),
-                    color=current_element_params.get("color")
-                ))
-                current_element_params = None # Reset
-                continue
-
             # Regular Body Text
-            if line:
+            elif line:
                 body_lines.append(line)
 
         # Assemble SlideContent
@@ -163,9 +195,30 @@ class MarkdownParser:
             subtitle=subtitle,
             body="\n".join(body_lines) if body_lines else None,
             chart=chart_data,
-            elements=elements
+            elements=ElementStore.from_rows(element_rows)
         )
 
+    def _element_fields(self, params: Dict[str, Any]) -> tuple:
+        """
+        element ディレクティブのパラメーターを (type, rect, font_size, color, attributes) に変換する。
+        SlideElement と同じ型に揃え、合わない値 (size=big, color=[0.5, 1, 2] など) は ValueError。
+        """
+        params = dict(params)
+        elem_type = str(params.pop("type", "text"))
+        try:
+            rect = params.pop("rect", None) or None
+            if rect is not None:
+                rect = [float(v) for v in rect]
+            font_size = params.pop("size", None)
+            if font_size is not None:
+                font_size = float(font_size)
+            color = params.pop("color", None)
+            if color is not None:
+                color = [_as_int(v) for v in color]
+        except TypeError as e:
+            raise ValueError(f"Invalid element value: {e}")
+        return elem_type, rect, font_size, color, params
+
     def _parse_chart_block(self, lang_tag: str, content_lines: List[str]) -> ChartData:
         """
         Parses a chart block. 
@@ -197,24 +250,8 @@ class MarkdownParser:
         if len(content_lines) < 3:
             return ChartData(type=chart_type, title=title, categories=[], series={})
 
-        header = [x.strip() for x in content_lines[1].split(',')]
-        # series_names = header[1:] 
-        
-        categories = []
-        series_data = {name: [] for name in header[1:]}
-        
-        for row_str in content_lines[2:]:
-            row = [x.strip() for x in row_str.split(',')]
-            if len(row) < len(header):
-                continue
-            
-            categories.append(row[0])
-            for i, val in enumerate(row[1:]):
-                series_name = header[i+1]
-                try:
-                    series_data[series_name].append(float(val))
-                except ValueError:
-                     series_data[series_name].append(0.0)
+        # Columnar parse: series values stay as float64 arrays (missing cells -> NaN)
+        _, categories, series_data = parse_csv_columns(content_lines[1:])
 
         return ChartData(
             title=title,
@@ -222,3 +259,10 @@ class MarkdownParser:
             categories=categories,
             series=series_data
         )
+
+
+def _as_int(value: Any) -> int:
+    # pydantic の int と同じく、小数部のある数は受け付けない
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"Expected an integer, got {value}")
+    return int(value)
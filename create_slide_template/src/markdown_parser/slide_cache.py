@@ -0,0 +1,93 @@
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Optional
+
+from src.schema.slide_schema import SlideContent
+
+# パーサーの出力形式が変わったら上げる (古いキャッシュを無効化するため)
+PARSER_VERSION = "4"
+
+
+class SlideCache:
+    """
+    スライドブロックの内容ハッシュ -> パース済み SlideContent のキャッシュ。
+
+    - メモリ: 最大 max_entries 件の LRU
+    - ディスク: cache_dir/<hash>.json (cache_dir 指定時のみ。実行をまたいで再利用される)
+    返される SlideContent はキャッシュと共有されるため、読み取り専用として扱うこと。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: int = 4096):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, SlideContent]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+    @staticmethod
+    def block_hash(block: str) -> str:
+        """ブロック本文 (前後の空白は無視) とパーサーバージョンから SHA-256 を計算する"""
+        h = hashlib.sha256(PARSER_VERSION.encode("utf-8"))
+        h.update(block.strip().encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[SlideContent]:
+        slide = self._memory.get(key)
+        if slide is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return slide
+
+        slide = self._load(key)
+        if slide is not None:
+            self._remember(key, slide)
+            self.hits += 1
+            return slide
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, slide: SlideContent):
+        self._remember(key, slide)
+        self._store(key, slide)
+
+    def _remember(self, key: str, slide: SlideContent):
+        self._memory[key] = slide
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load(self, key: str) -> Optional[SlideContent]:
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return SlideContent.model_validate_json(f.read())
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable slide cache entry {path}: {e}")
+            return None
+
+    def _store(self, key: str, slide: SlideContent):
+        if not self.cache_dir:
+            return
+        # 一時ファイルに書いてから置き換える (並行実行や中断で壊れたエントリを残さない)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(slide.model_dump_json())
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
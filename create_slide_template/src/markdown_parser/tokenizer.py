@@ -0,0 +1,196 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# 行の種類
+FENCE = "FENCE"      # ```lang
+LAYOUT = "LAYOUT"    # <!-- layout: XXX -->
+ELEMENT = "ELEMENT"  # <!-- element: key=value, ... -->
+COMMENT = "COMMENT"  # <!-- ... -->
+H2 = "H2"            # ## Subtitle
+H1 = "H1"            # # Title
+TEXT = "TEXT"        # その他
+
+# 1行を1回のマッチで分類する文法。
+# 各選択肢を外側の名前付きグループで囲んでいるので、m.lastgroup がそのまま行の種類になる。
+_LINE_GRAMMAR = re.compile(r'''
+    (?P<FENCE>```\s*(?P<lang>.*))
+  | (?P<LAYOUT><!--\s*layout:\s*(?P<layout>.+?)\s*-->)
+  | (?P<ELEMENT><!--\s*element:\s*(?P<params>.*?)\s*-->)
+  | (?P<COMMENT><!--.*)
+  | (?P<H2>\#\#\s(?P<h2>.*))
+  | (?P<H1>\#\s(?P<h1>.*))
+''', re.VERBOSE)
+
+# 文法のいずれかの行頭になり得る文字
+_MARKER_CHARS = frozenset("`<#")
+
+_VALUE_GROUP = {
+    FENCE: "lang",
+    LAYOUT: "layout",
+    ELEMENT: "params",
+    H2: "h2",
+    H1: "h1",
+}
+
+# element パラメータの字句: 引用文字列 / 記号 / 裸の値 / それ以外 (エラー)
+_PARAM_TOKEN = re.compile(r'''
+    \s*(?:
+        ("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | ([\[\],=])
+      | ([^\s\[\],="']+(?:[ \t]+[^\s\[\],="']+)*)
+      | (\S)
+    )
+''', re.VERBOSE)
+
+_ESCAPE = re.compile(r'\\(.)')
+
+# deck_to_md が書き出す形 (type=..., rect=[...], size=..., color=[...], 残りは任意) は1回のマッチで読む。
+# 数値の形が合わないもの (空要素・空白区切りなど) は一般の字句解析に任せる (同じエラー・同じ結果にするため)
+_NUM = r'[-+]?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?'
+_CANONICAL_PARAMS = re.compile(rf'''
+    type=(?P<type>\w+),\s*rect=\[(?P<rect>(?:{_NUM}(?:,\s*{_NUM})*)?)\]
+    (?:,\s*size=(?P<size>{_NUM})(?=,|$))?
+    (?:,\s*color=\[(?P<color>(?:\d+(?:,\s*\d+)*)?)\])?
+    (?:,\s*(?P<rest>.+))?$
+''', re.VERBOSE)
+
+
+def tokenize_line(line: str) -> Tuple[str, Optional[str]]:
+    """
+    (strip済みの) 1行を分類し、(種類, 値) を返す。
+    値は見出しテキスト、レイアウト名、コードブロックの言語、element パラメータ文字列など。
+    """
+    # 本文行 (大多数) は先頭文字だけで判定し、正規表現を通さない
+    if not line or line[0] not in _MARKER_CHARS:
+        return TEXT, line
+    # deck_to_md が書く element 行 (PDF 由来のデッキでは大半の行) は文法を通さずに切り出す。
+    # 行末の --> が最初の --> である場合だけなので、文法でマッチした場合と同じ値になる
+    if line.startswith("<!-- element:") and line.find("-->") == len(line) - 3:
+        return ELEMENT, line[13:-3].strip()
+    m = _LINE_GRAMMAR.match(line)
+    if not m:
+        return TEXT, line
+    kind = m.lastgroup
+    group = _VALUE_GROUP.get(kind)
+    return kind, (m.group(group).strip() if group else None)
+
+
+def parse_params(param_str: str) -> Dict[str, Any]:
+    """
+    element ディレクティブの key=value 列をパースする。
+    Syntax: type=text, rect=[0.1, 0.2, 0.3, 0.4], size=12, color=[0,0,0], label="a, b"
+
+    - 値はリスト ([...], 入れ子可)、引用文字列 ("..." / '...')、裸の値のいずれか
+    - 裸の値は int -> float -> str の順に変換する
+    - 未知のキーもそのまま返す (呼び出し側で扱いを決める)
+    不正な構文の場合は ValueError を送出する。
+    """
+    m = _CANONICAL_PARAMS.match(param_str)
+    if m:
+        return _canonical_params(m)
+    return _parse_tokens(param_str)
+
+
+def _parse_tokens(param_str: str) -> Dict[str, Any]:
+    # 字句解析は findall 1回 (C 側で完結) で済ませる
+    tokens = _PARAM_TOKEN.findall(param_str)
+    params: Dict[str, Any] = {}
+    pos = 0
+    n = len(tokens)
+
+    while pos < n:
+        _, punct, key, error = tokens[pos]
+        if not key:
+            raise ValueError(f"Expected key, got '{punct or error}' in '{param_str}'")
+        if pos + 1 >= n or tokens[pos + 1][1] != "=":
+            raise ValueError(f"Expected '=' after '{key}' in '{param_str}'")
+        value, pos = _parse_value(tokens, pos + 2, param_str)
+        params[key] = value
+
+        if pos < n:
+            if tokens[pos][1] != ",":
+                raise ValueError(f"Expected ',' after '{key}' in '{param_str}'")
+            pos += 1
+
+    return params
+
+
+def canonical_element(param_str: str) -> Optional[Tuple[str, Optional[List[float]], Optional[float], Optional[List[int]]]]:
+    """
+    deck_to_md が書き出した形そのもの (type, rect, size, color だけ) なら (type, rect, size, color) を返す。
+    rect は float のリスト (空なら None)、size は float、color は int のリスト。
+    それ以外 (属性付き・手で書いた形) は None を返すので、parse_params で読む。
+    """
+    m = _CANONICAL_PARAMS.match(param_str)
+    if m is None or m.group("rest"):
+        return None
+    rect, size, color = m.group("rect", "size", "color")
+    return (m.group("type"),
+            [float(v) for v in rect.split(",")] if rect else None,
+            None if size is None else float(size),
+            None if color is None else [int(v) for v in color.split(",")] if color else [])
+
+
+def _canonical_params(m: "re.Match") -> Dict[str, Any]:
+    rect, size, color, rest = m.group("rect", "size", "color", "rest")
+    params: Dict[str, Any] = {"type": m.group("type")}
+    # rect・size は float (SlideElement の型。float() は前後の空白を無視する)
+    params["rect"] = [float(v) for v in rect.split(",")] if rect else []
+    if size is not None:
+        params["size"] = float(size)
+    if color is not None:
+        params["color"] = [int(v) for v in color.split(",")] if color else []
+    if rest:
+        try:
+            params.update(_parse_tokens(rest))
+        except ValueError:
+            # エラーメッセージにはディレクティブ全体を出す
+            _parse_tokens(m.string)
+            raise
+    return params
+
+
+def _parse_value(tokens: List[Tuple[str, str, str, str]], pos: int, param_str: str) -> Tuple[Any, int]:
+    if pos >= len(tokens):
+        raise ValueError(f"Missing value in '{param_str}'")
+
+    string, punct, bare, error = tokens[pos]
+    if string:
+        return _ESCAPE.sub(r'\1', string[1:-1]), pos + 1
+    if bare:
+        return _coerce_scalar(bare), pos + 1
+    if punct != "[":
+        raise ValueError(f"Unexpected '{punct or error}' in '{param_str}'")
+
+    items = []
+    pos += 1
+    n = len(tokens)
+    while pos < n:
+        string, punct, bare, error = tokens[pos]
+        if punct == "]":
+            return items, pos + 1
+        # 数値リスト (rect, color) が大半なので、スカラーは再帰せずその場で処理する
+        if bare:
+            items.append(_coerce_scalar(bare))
+            pos += 1
+        else:
+            item, pos = _parse_value(tokens, pos, param_str)
+            items.append(item)
+        if pos < n and tokens[pos][1] == ",":
+            pos += 1
+    raise ValueError(f"Unterminated list in '{param_str}'")
+
+
+# 属性は deck_to_md が json.dumps で書くので、JSON のリテラルは Python の値に戻す
+_LITERALS = {"true": True, "false": False, "null": None}
+
+
+def _coerce_scalar(text: str) -> Any:
+    if text in _LITERALS:
+        return _LITERALS[text]
+    if text.lstrip("+-").isdigit():
+        return int(text)
+    try:
+        return float(text)
+    except ValueError:
+        return text
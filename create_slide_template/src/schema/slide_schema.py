@@ -1,6 +1,8 @@
 from enum import Enum
-from typing import List, Optional, Union, Dict, Any
-from pydantic import BaseModel, Field
+from types import MappingProxyType
+from typing import Annotated, List, Optional, Union, Dict, Any, Iterable, Iterator, Mapping, Tuple
+import numpy as np
+from pydantic import BaseModel, Field, PlainSerializer, PlainValidator
 
 class SlideType(str, Enum):
     COVER = "cover"
@@ -9,17 +11,53 @@ class SlideType(str, Enum):
     CONTENT = "content"
     BACK_COVER = "back_cover"
 
+# Template layout name -> SlideType (shared by the Markdown parser and the builder)
+LAYOUT_MAP = {
+    "表紙": SlideType.COVER,
+    "目次": SlideType.TOC,
+    "中見出し": SlideType.SECTION,
+    "コンテンツ": SlideType.CONTENT,
+    "裏表紙": SlideType.BACK_COVER
+}
+
 class ChartType(str, Enum):
     BAR_CLUSTERED = "bar_clustered"
     COLUMN_CLUSTERED = "column_clustered"
     LINE = "line"
     PIE = "pie"
 
+def _to_float_array(values) -> np.ndarray:
+    # float64 arrays are held as-is (no copy); lists are converted once. None -> NaN (missing)
+    if isinstance(values, np.ndarray) and values.dtype == np.float64:
+        return values
+    if isinstance(values, np.ndarray):
+        return values.astype(np.float64)
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+def _from_float_array(values: np.ndarray) -> List[Optional[float]]:
+    return [None if v != v else v for v in values.tolist()]
+
+# Columnar series values (float64, NaN = missing). Serialized to JSON as a list with null for NaN.
+FloatArray = Annotated[
+    np.ndarray,
+    PlainValidator(_to_float_array),
+    PlainSerializer(_from_float_array, when_used='json'),
+]
+
 class ChartData(BaseModel):
     title: Optional[str] = None
     type: ChartType
     categories: List[str] # X-axis labels (e.g., ["Q1", "Q2", "Q3", "Q4"])
-    series: Dict[str, List[float]] # Series Name -> Data Points (e.g., {"Revenue": [10, 20, 30, 40]})
+    series: Dict[str, FloatArray] # Series Name -> Data Points (e.g., {"Revenue": [10, 20, 30, 40]})
+
+    def __eq__(self, other) -> bool:
+        # series は ndarray なので、BaseModel の比較 (dict の ==) では真偽値が決まらない。要素ごとに比較する (NaN 同士は等しい)
+        if not isinstance(other, ChartData):
+            return NotImplemented
+        return ((self.title, self.type, self.categories) == (other.title, other.type, other.categories)
+                and self.series.keys() == other.series.keys()
+                and all(np.array_equal(values, other.series[name], equal_nan=True)
+                        for name, values in self.series.items()))
 
 class SlideElement(BaseModel):
     type: str # 'text', 'image'
@@ -27,6 +65,263 @@ class SlideElement(BaseModel):
     rect: Optional[List[float]] = None # [x, y, w, h] normalized (0.0-1.0)
     font_size: Optional[float] = None
     color: Optional[List[int]] = None
+    attributes: Dict[str, Any] = {} # Unknown directive keys, kept for round-tripping
+
+# (type, content, rect, font_size, color, attributes)
+ElementRow = Tuple[str, str, Optional[List[float]], Optional[float], Optional[List[int]], Dict[str, Any]]
+
+_NO_ATTRIBUTES = MappingProxyType({})
+
+class ElementView:
+    """
+    ElementStore の1要素への参照。SlideElement と同じ属性名で読める (モデルは作らない)。
+    読み取り専用 (SlideCache の SlideContent は共有されるため)。書き換えは ElementStore.set_content で明示的に行う。
+    """
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store: "ElementStore", index: int):
+        self._store = store
+        self._index = index
+
+    @property
+    def type(self) -> str:
+        return self._store._names[self._store._type_codes[self._index]]
+
+    @property
+    def content(self) -> str:
+        return self._store._contents[self._index]
+
+    @property
+    def rect(self) -> Optional[List[float]]:
+        return self._store._rect(self._index)
+
+    @property
+    def font_size(self) -> Optional[float]:
+        return self._store._font_size(self._index)
+
+    @property
+    def color(self) -> Optional[List[int]]:
+        return self._store._colors.get(self._index)
+
+    @property
+    def attributes(self) -> Mapping[str, Any]:
+        attributes = self._store._attributes.get(self._index)
+        return _NO_ATTRIBUTES if attributes is None else MappingProxyType(attributes)
+
+    def to_element(self) -> SlideElement:
+        return SlideElement(type=self.type, content=self.content, rect=self.rect, font_size=self.font_size,
+                            color=self.color, attributes=dict(self.attributes))
+
+class ElementStore:
+    """
+    スライドの要素 (SlideElement) を列ごとにまとめて持つコンテナ (struct-of-arrays)。
+    PDF から再構成したスライドは1ページに数十〜数百の要素があり、要素ごとの pydantic モデルは
+    検証とオブジェクトのオーバーヘッドが大きいので、rect・font_size は float64 の NumPy 配列、
+    type は文字列テーブルへのコード、color・attributes は持っている要素だけの辞書で保持する。
+
+    要素を取り出すと ElementView (読み取り用のビュー) になり、SlideElement へは to_element() で必要な時だけ変換する。
+    大量に読む側 (Markdown 書き出し・スライド生成) は rows() でタプルとして読む。
+    SlideContent.elements の型で、JSON には従来どおり SlideElement のリストとして読み書きされる。
+    """
+
+    def __init__(self, capacity: int = 8):
+        self._names: List[str] = [] # 要素の type (インターン済み。コード -> 文字列)
+        self._name_codes: Dict[str, int] = {}
+        self._type_codes = np.empty(capacity, dtype=np.uint16)
+        self._contents: List[str] = []
+        self._rects = np.empty((capacity, 4), dtype=np.float64) # [x, y, w, h]
+        self._font_sizes = np.empty(capacity, dtype=np.float64) # NaN = None
+        self._odd_rects: Dict[int, Optional[List[float]]] = {} # rect が None / 4要素でない要素 (rects の行は NaN)
+        self._colors: Dict[int, List[int]] = {}
+        self._attributes: Dict[int, Dict[str, Any]] = {}
+        self._size = 0
+
+    @classmethod
+    def from_elements(cls, elements: Iterable[Union[SlideElement, ElementView, Dict[str, Any]]]) -> "ElementStore":
+        store = cls()
+        for elem in elements:
+            if isinstance(elem, dict):
+                elem = SlideElement.model_validate(elem)
+            store.append(elem.type, elem.content, elem.rect, elem.font_size, elem.color, elem.attributes)
+        return store
+
+    @classmethod
+    def from_rows(cls, rows: List[ElementRow]) -> "ElementStore":
+        """
+        (type, content, rect, font_size, color, attributes) のタプルのリストから作る。
+        列ごとにまとめて NumPy 配列にするので、append を繰り返すより速い (パーサーが1スライド分をまとめて渡す)。
+        """
+        n = len(rows)
+        store = cls(capacity=0)
+        if not n:
+            return store
+        types, contents, rects, font_sizes, colors, attributes = zip(*rows)
+
+        codes = []
+        for type in types:
+            code = store._name_codes.get(type)
+            if code is None:
+                code = store._name_codes[type] = len(store._names)
+                store._names.append(type)
+            codes.append(code)
+        store._type_codes = np.array(codes, dtype=np.uint16)
+        store._contents = list(contents)
+        if all(rect is not None and len(rect) == 4 for rect in rects):
+            store._rects = np.array(rects, dtype=np.float64)
+        else:
+            store._rects = np.empty((n, 4), dtype=np.float64)
+            for i, rect in enumerate(rects):
+                if rect is not None and len(rect) == 4:
+                    store._rects[i] = rect
+                else:
+                    store._rects[i] = np.nan
+                    store._odd_rects[i] = None if rect is None else [float(v) for v in rect]
+        store._font_sizes = np.array([np.nan if size is None else size for size in font_sizes], dtype=np.float64)
+        store._colors = {i: list(color) for i, color in enumerate(colors) if color is not None}
+        store._attributes = {i: dict(attrs) for i, attrs in enumerate(attributes) if attrs}
+        store._size = n
+        return store
+
+    def append(self, type: str, content: str, rect: Optional[List[float]] = None, font_size: Optional[float] = None,
+               color: Optional[List[int]] = None, attributes: Optional[Dict[str, Any]] = None):
+        i = self._size
+        if i == len(self._type_codes):
+            self._grow()
+
+        code = self._name_codes.get(type)
+        if code is None:
+            code = self._name_codes[type] = len(self._names)
+            self._names.append(type)
+        self._type_codes[i] = code
+        self._contents.append(content)
+        if rect is not None and len(rect) == 4:
+            self._rects[i] = rect
+        else:
+            self._rects[i] = np.nan
+            self._odd_rects[i] = None if rect is None else [float(v) for v in rect]
+        self._font_sizes[i] = np.nan if font_size is None else font_size
+        if color is not None:
+            self._colors[i] = list(color)
+        if attributes:
+            self._attributes[i] = dict(attributes)
+        self._size = i + 1
+
+    def set_content(self, index: int, content: str):
+        """要素の content を置き換える (画像パスの付け替え用)"""
+        self._contents[self[index]._index] = content
+
+    def _grow(self):
+        capacity = max(8, 2 * len(self._type_codes))
+        n = self._size
+        type_codes = np.empty(capacity, dtype=np.uint16)
+        type_codes[:n] = self._type_codes[:n]
+        rects = np.empty((capacity, 4), dtype=np.float64)
+        rects[:n] = self._rects[:n]
+        font_sizes = np.empty(capacity, dtype=np.float64)
+        font_sizes[:n] = self._font_sizes[:n]
+        self._type_codes, self._rects, self._font_sizes = type_codes, rects, font_sizes
+
+    # --- Columns (read-only views) ---
+    @property
+    def rects(self) -> np.ndarray:
+        """(n, 4) の [x, y, w, h]。rect の無い要素の行は NaN"""
+        return self._rects[:self._size]
+
+    @property
+    def font_sizes(self) -> np.ndarray:
+        return self._font_sizes[:self._size]
+
+    @property
+    def types(self) -> List[str]:
+        return [self._names[code] for code in self._type_codes[:self._size].tolist()]
+
+    def _rect(self, i: int) -> Optional[List[float]]:
+        if i in self._odd_rects:
+            rect = self._odd_rects[i]
+            return None if rect is None else list(rect)
+        return self._rects[i].tolist()
+
+    def _font_size(self, i: int) -> Optional[float]:
+        size = float(self._font_sizes[i])
+        return None if size != size else size
+
+    # --- Iteration ---
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[ElementView]:
+        for i in range(self._size):
+            yield ElementView(self, i)
+
+    def __getitem__(self, index: int) -> ElementView:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("element index out of range")
+        return ElementView(self, index)
+
+    def rows(self) -> Iterator[ElementRow]:
+        """
+        要素を (type, content, rect, font_size, color, attributes) のタプルで順に返す。
+        列をまとめて Python の値に変換するので、要素ごとのビューやモデルを作るより速い。
+        attributes は読み取り専用。
+        """
+        n = self._size
+        types = self.types
+        rects = self._rects[:n].tolist()
+        font_sizes = self._font_sizes[:n].tolist()
+        odd_rects, colors, attributes = self._odd_rects, self._colors, self._attributes
+        for i in range(n):
+            rect = rects[i]
+            if i in odd_rects:
+                rect = odd_rects[i]
+            size = font_sizes[i]
+            yield (types[i], self._contents[i], rect, None if size != size else size,
+                   colors.get(i), attributes.get(i, _NO_ATTRIBUTES))
+
+    def element(self, index: int) -> SlideElement:
+        return self[index].to_element()
+
+    def to_elements(self) -> List[SlideElement]:
+        return [view.to_element() for view in self]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """SlideElement.model_dump() と同じ形の辞書のリスト (JSON 書き出し用)"""
+        return [{"type": t, "content": c, "rect": r, "font_size": s, "color": col, "attributes": dict(a)}
+                for t, c, r, s, col, a in self.rows()]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ElementStore):
+            return NotImplemented
+        return self.to_dicts() == other.to_dicts()
+
+    def __repr__(self) -> str:
+        return f"ElementStore({self._size} elements)"
+
+    def __getstate__(self):
+        # pickle (並列解析のワーカーからの受け渡し) では確保済みで未使用の領域を送らない
+        state = dict(self.__dict__)
+        n = self._size
+        state["_type_codes"] = self._type_codes[:n].copy()
+        state["_rects"] = self._rects[:n].copy()
+        state["_font_sizes"] = self._font_sizes[:n].copy()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+def _to_element_store(values) -> ElementStore:
+    # ElementStore はそのまま (コピーしない)。SlideElement / 辞書のリストは1回だけ変換する
+    if isinstance(values, ElementStore):
+        return values
+    return ElementStore.from_elements(values)
+
+# SlideContent.elements: 列指向の ElementStore として保持し、JSON / model_dump では SlideElement のリストとして出力する
+ElementList = Annotated[
+    ElementStore,
+    PlainValidator(_to_element_store),
+    PlainSerializer(lambda store: store.to_dicts()),
+]
 
 class SlideContent(BaseModel):
     """
@@ -40,7 +335,7 @@ class SlideContent(BaseModel):
     bullets: Optional[List[str]] = None
     image_path: Optional[str] = None
     chart: Optional[ChartData] = None
-    elements: List[SlideElement] = [] # For custom/advanced layouts
+    elements: ElementList = Field(default_factory=ElementStore) # For custom/advanced layouts
     footer: Optional[str] = None
     
     # Metadata for specific template mapping if needed
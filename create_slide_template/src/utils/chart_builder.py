@@ -2,6 +2,7 @@ from pptx.chart.data import CategoryChartData, ChartData as PptxChartData
 from pptx.enum.chart import XL_CHART_TYPE
 from pptx.util import Inches, Pt
 from src.schema.slide_schema import ChartData, ChartType
+from src.utils.columnar import to_chart_values
 
 class ChartBuilder:
     @staticmethod
@@ -14,7 +15,7 @@ class ChartBuilder:
 
         # Add series
         for name, values in chart_def.series.items():
-            chart_data.add_series(name, values)
+            chart_data.add_series(name, to_chart_values(values))
 
         # Determine Chart Type
         xl_type = XL_CHART_TYPE.COLUMN_CLUSTERED # Default
@@ -1,9 +1,12 @@
+import numpy as np
 import pandas as pd
 from pptx.chart.data import CategoryChartData
 from pptx.enum.chart import XL_CHART_TYPE
 from pptx.util import Inches, Pt
 from pptx.dml.color import RGBColor
 
+from src.utils.columnar import parse_csv_columns, to_chart_values
+
 # チャートタイプのマッピング
 CHART_TYPES = {
     "COLUMN_CLUSTERED": XL_CHART_TYPE.COLUMN_CLUSTERED,
@@ -42,6 +45,11 @@ def create_chart_data(data_config):
         name = series.get("name", "")
         values = series.get("values", [])
         
+        # 列データ (ndarray) はそのまま渡す (NaN は欠損値)
+        if isinstance(values, np.ndarray):
+            chart_data.add_series(name, to_chart_values(values))
+            continue
+        
         # 値の検証と変換
         float_values = []
         for v in values:
@@ -68,14 +76,12 @@ def parse_chart_data_from_csv(csv_text: str) -> dict:
     {
         "categories": ["Label1", "Label2"],
         "series": [
-            {"name": "Header2", "values": [Val1, Val3]},
-            {"name": "Header3", "values": [Val2, Val4]}
+            {"name": "Header2", "values": ndarray([Val1, Val3])},
+            {"name": "Header3", "values": ndarray([Val2, Val4])}
         ]
     }
+    値は列ごとに一括で float64 配列へ変換する。空セル・数値でないセルは NaN (欠損値)。
     """
-    import csv
-    import io
-    
     lines = csv_text.strip().split('\n')
     if not lines:
         return {}
@@ -84,49 +90,16 @@ def parse_chart_data_from_csv(csv_text: str) -> dict:
     # ここでは純粋なCSVパートのみを受け取る前提とするが、
     # もし1行だけ列数が違うなどが検知できればタイトルとして扱うロジックも追加可能
     
-    reader = csv.reader(lines)
-    header = next(reader, None)
+    # 列が足りない行は空セル (NaN) で埋めて使う
+    header, categories, series = parse_csv_columns(lines, pad_short_rows=True)
     
-    if not header:
-        return {}
-        
     # Header: [CategoryKey, SeriesName1, SeriesName2, ...]
     if len(header) < 2:
         return {}
         
-    series_names = header[1:]
-    categories = []
-    series_values = [[] for _ in series_names]
-    
-    for row in reader:
-        if not row: continue
-        # 行の長さが足りない場合は空文字で埋める
-        if len(row) < len(header):
-            row += [''] * (len(header) - len(row))
-            
-        categories.append(row[0])
-        
-        for i, val_str in enumerate(row[1:]):
-            if i < len(series_values):
-                try:
-                    # 数値変換（カンマ除去など）
-                    clean_val = val_str.replace(',', '').strip()
-                    val = float(clean_val)
-                except ValueError:
-                    val = 0.0
-                series_values[i].append(val)
-                
-    # 構築
-    series_list = []
-    for i, name in enumerate(series_names):
-        series_list.append({
-            "name": name.strip(),
-            "values": series_values[i]
-        })
-        
     return {
         "categories": categories,
-        "series": series_list
+        "series": [{"name": name, "values": values} for name, values in series.items()]
     }
 
 
@@ -0,0 +1,73 @@
+import csv
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+
+def parse_csv_columns(lines: Iterable[str], pad_short_rows: bool = False) -> Tuple[List[str], List[str], Dict[str, np.ndarray]]:
+    """
+    チャート用CSV (1行目ヘッダー、1列目カテゴリ) を列単位でまとめてパースする。
+
+    Returns: (header, categories, series)
+      series は 系列名 -> float64 の ndarray (系列ごとに連続したメモリ)
+    - 行の分割は csv モジュールで行う ("1,234" のような引用付きの値も可)
+    - 数値変換は列ブロック全体を一括で行う (coerce_float)
+    - 空のセル・数値にできないセルは 0.0 ではなく NaN になる
+    - ヘッダーより列が少ない行は警告を出して読み飛ばす (pad_short_rows=True なら足りないセルを NaN にして使う)
+    - ヘッダーより列が多い行は警告を出して余分なセルを捨てる
+    """
+    reader = csv.reader(lines, skipinitialspace=True)
+    header = [h.strip() for h in next(reader, None) or []]
+    if len(header) < 2:
+        return header, [], {}
+
+    width = len(header)
+    rows = []
+    for row in reader:
+        if len(row) == width:
+            rows.append(row)
+        elif len(row) > width:
+            print(f"Warning: Chart row has {len(row)} cells but the header has {width}; "
+                  f"ignoring the extra cells: {row[width:]}")
+            rows.append(row[:width])
+        elif row and pad_short_rows:
+            rows.append(row + [''] * (width - len(row)))
+        elif row:
+            print(f"Warning: Skipping chart row with {len(row)} cells (header has {width}): {row}")
+    if not rows:
+        return header, [], {name: np.empty(0) for name in header[1:]}
+
+    cells = np.array(rows, dtype=str)
+    categories = np.char.strip(cells[:, 0]).tolist()
+    # 転置してから変換すると、各系列 (行) が C 連続の配列になる
+    values = coerce_float(cells[:, 1:].T)
+
+    return header, categories, {name: values[i] for i, name in enumerate(header[1:])}
+
+
+def coerce_float(cells: np.ndarray) -> np.ndarray:
+    """
+    文字列配列を float64 配列に一括変換する。
+    桁区切りのカンマと前後の空白は除去し、空セルや数値でないセルは NaN にする。
+    """
+    cleaned = np.char.replace(np.char.strip(cells), ',', '')
+    cleaned[cleaned == ''] = 'nan'
+    try:
+        return cleaned.astype(np.float64, order='C')
+    except ValueError:
+        # 数値でないセルが混ざっている場合のみ、セル単位で変換する
+        out = np.empty(cleaned.shape, dtype=np.float64)
+        flat = out.reshape(-1)
+        for i, text in enumerate(cleaned.reshape(-1).tolist()):
+            try:
+                flat[i] = float(text)
+            except ValueError:
+                flat[i] = np.nan
+        return out
+
+
+def to_chart_values(values) -> List:
+    """python-pptx に渡す値リストに変換する (NaN は欠損値として None にする)"""
+    if isinstance(values, np.ndarray):
+        values = values.tolist()
+    return [None if v is None or v != v else v for v in values]
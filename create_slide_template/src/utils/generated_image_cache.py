@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# キーの作り方・保存形式を変えたら上げる (古いエントリを使わないようにするため)
+CACHE_VERSION = "1"
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "GENERATED_IMAGE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "generated_images"))
+DEFAULT_MAX_BYTES = 1 << 30 # 1 GiB
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL,
+    model TEXT,
+    prompt TEXT
+)
+"""
+
+
+def generation_key(prompt: str, model: str, params: Dict[str, Any]) -> str:
+    """プロンプト・モデル・生成パラメーター (アスペクト比など) の SHA-256。プロセスや実行をまたいで同じ値になる"""
+    payload = json.dumps({"version": CACHE_VERSION, "prompt": prompt, "model": model, "params": params},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GeneratedImageCache:
+    """
+    AI で生成した画像のディスクキャッシュ (process_slides.py と image_utils で共有)。
+
+    cache_dir/
+      images/<key>.<ext>   生成した画像 (一時ファイルに書いてから置き換える)
+      manifest.sqlite3     key -> ファイル名, サイズ, 作成時刻, 最終アクセス時刻
+
+    合計サイズが max_bytes を超えたら、最終アクセスが古いものから削除する (LRU)。
+    マニフェストは SQLite (WAL) なので、複数のスレッド・プロセスから同時に読み書きしてよい。
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.image_dir = os.path.join(cache_dir, "images")
+        os.makedirs(self.image_dir, exist_ok=True)
+        self._manifest_path = os.path.join(cache_dir, "manifest.sqlite3")
+        self._local = threading.local() # SQLite の接続はスレッドごと
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._key_locks_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0}
+        with self._connect() as db:
+            db.execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self._manifest_path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def get(self, key: str) -> Optional[str]:
+        """キャッシュ済みの画像のパス (無ければ None)。最終アクセス時刻を更新する"""
+        db = self._connect()
+        with db:
+            row = db.execute("SELECT filename FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            path = os.path.join(self.image_dir, row[0])
+            if not os.path.exists(path):
+                # 手で消された・他のプロセスが削除した
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        return path
+
+    def put(self, key: str, data: bytes, ext: str = "png", model: Optional[str] = None,
+            prompt: Optional[str] = None) -> str:
+        """画像を保存してパスを返す。その後、予算を超えていれば古いエントリを削除する"""
+        return self._store(key, lambda path: _write_bytes(path, data), ext, model, prompt)
+
+    def get_or_create(self, key: str, generate: Callable[[], bytes], model: Optional[str] = None,
+                      prompt: Optional[str] = None) -> str:
+        """
+        キャッシュにあればそのパス、無ければ generate() で画像を作って保存したパスを返す。
+        同じプロセス内で同じキーを並行に要求した場合、生成は1回だけ行う。
+        """
+        return self.get_or_write(key, lambda path: _write_bytes(path, generate()), model=model, prompt=prompt)
+
+    def get_or_write(self, key: str, write: Callable[[str], Any], model: Optional[str] = None,
+                     prompt: Optional[str] = None) -> str:
+        """
+        get_or_create と同じだが、画像は write(path) がキャッシュ内の一時ファイルに直接書く
+        (大きな画像をバイト列としてメモリに載せない)。拡張子はファイルの先頭から判定する。
+        """
+        with self._key_lock(key):
+            path = self.get(key)
+            if path is not None:
+                self._count("hits")
+                return path
+            self._count("misses")
+            return self._store(key, write, None, model, prompt)
+
+    def _store(self, key: str, write: Callable[[str], Any], ext: Optional[str], model: Optional[str],
+               prompt: Optional[str]) -> str:
+        fd, tmp_path = tempfile.mkstemp(dir=self.image_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            write(tmp_path)
+            if ext is None:
+                with open(tmp_path, "rb") as f:
+                    ext = _image_ext(f.read(4))
+            filename = f"{key}.{ext}"
+            path = os.path.join(self.image_dir, filename)
+            size = os.path.getsize(tmp_path)
+            # ファイルの置き換えとマニフェストの更新は書き込みロックを取ってから行う
+            # (他のプロセスの evict が、置き換えた直後のファイルを消さないように)
+            now = time.time()
+            db = self._connect()
+            with db:
+                db.execute("BEGIN IMMEDIATE")
+                os.replace(tmp_path, path)
+                db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           (key, filename, size, now, now, model, prompt))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict(keep=key)
+        return path
+
+    def evict(self, keep: Optional[str] = None):
+        """合計サイズが max_bytes 以下になるまで、最終アクセスが古いエントリから削除する (keep は残す)"""
+        db = self._connect()
+        removed = 0
+        with db:
+            # BEGIN IMMEDIATE: 書き込みロックを取ってから数え、ファイルもロック中に消す
+            # (他のプロセスの put・evict と重ならない)
+            db.execute("BEGIN IMMEDIATE")
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for key, filename, size in db.execute(
+                    "SELECT key, filename, size FROM entries ORDER BY last_access").fetchall():
+                if total <= self.max_bytes:
+                    break
+                if key == keep:
+                    continue
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                try:
+                    os.remove(os.path.join(self.image_dir, filename))
+                except FileNotFoundError:
+                    pass
+                removed += 1
+                total -= size
+        self._count("evicted", removed)
+
+    def total_bytes(self) -> int:
+        return self._connect().execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _count(self, key: str, n: int = 1):
+        with self._key_locks_lock:
+            self.stats[key] += n
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._key_locks_lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+
+def _write_bytes(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _image_ext(data: bytes) -> str:
+    if data.startswith(b"\xff\xd8"):
+        return "jpg"
+    return "png"
+
+
+def materialize(cache_path: str, dest_path: str) -> str:
+    """
+    キャッシュの画像を dest_path に置く (スライドから相対パスで参照するため)。
+    同じファイルシステムならハードリンク、できなければコピー。既にあれば何もしない。
+    """
+    if os.path.exists(dest_path):
+        return dest_path
+    dest_dir = os.path.dirname(dest_path)
+    if dest_dir:
+        os.makedirs(dest_dir, exist_ok=True)
+    try:
+        os.link(cache_path, dest_path)
+    except FileExistsError:
+        pass
+    except OSError:
+        shutil.copyfile(cache_path, dest_path)
+    return dest_path
@@ -0,0 +1,410 @@
+import binascii
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional, Sequence
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import DecodeError, ProtocolError, ReadTimeoutError, SSLError
+
+from src.utils.generated_image_cache import GeneratedImageCache, generation_key, materialize
+
+# Imagen on Google AI Studio (REST :predict)
+DEFAULT_MODEL = "imagen-3.0-generate-001"
+API_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+# 環境変数で接続先を変えられる (benchmarks/fake_imagen_server.py などのローカルのサーバーで試す場合)
+DEFAULT_BASE_URL = os.environ.get("IMAGE_API_BASE_URL", API_BASE_URL)
+
+# リトライする HTTP ステータス (レート制限とサーバー側のエラー)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# レスポンスを読む単位。画像は base64 のままメモリに溜めず、この単位でデコードしてファイルに書く
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class ImageGenerationError(Exception):
+    """画像生成に失敗した (リトライしても成功しなかった、またはレスポンスに画像が無い)"""
+
+
+class RateLimiter:
+    """
+    リクエストの開始間隔を 1 / rate 秒以上空ける (スレッドセーフ)。
+    並行に呼ばれても、各スレッドは自分の順番の時刻まで待ってから送信する。
+    """
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_time)
+            self._next_time = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class ImageGenerationClient:
+    """
+    Imagen (:predict) の画像生成クライアント。1つのインスタンスをプロセス内で使い回す
+    (スレッドから並行に呼んでよい)。
+
+    - requests.Session の keep-alive で接続 (TLS ハンドシェイク) を使い回す。並行数分の接続をプールする
+    - 429 / 5xx と接続エラー・タイムアウトは、指数バックオフ + ジッター (full jitter) でリトライする。
+      Retry-After ヘッダーがあればその秒数以上待つ
+    - 1回のリクエストは、少しずつでもデータが届き続ける場合も含めて全体で timeout 秒までで打ち切る (リトライの対象)
+    - requests_per_minute を指定すると、クライアント側でリクエストの開始間隔を制限する
+    """
+
+    def __init__(self, api_key: Optional[str] = None, model: str = DEFAULT_MODEL, aspect_ratio: str = "16:9",
+                 timeout: float = 120, max_retries: int = 5, backoff_base: float = 1.0, backoff_max: float = 30.0,
+                 requests_per_minute: Optional[float] = None, pool_size: int = 8,
+                 base_url: str = DEFAULT_BASE_URL):
+        """
+        api_key: 省略時は環境変数 GEMINI_API_KEY (キャッシュ済みの画像を読むだけなら無くてよい)
+        timeout: 1回の HTTP リクエスト全体 (接続〜レスポンスを読み終えるまで) のタイムアウト (秒)。
+                 リトライの待ち時間は含まない。読み込み中のチャンク間の待ちもこの秒数までなので、
+                 最悪の場合 1回のリクエストは timeout の約2倍かかる
+        max_retries: 最初のリクエストの後にリトライする最大回数
+        backoff_base / backoff_max: n 回目のリトライ前の待ち時間は 0〜min(backoff_max, backoff_base * 2^n) 秒の乱数
+        requests_per_minute: クライアント側のレート制限 (None は制限なし)
+        pool_size: プールする接続数 (並行にリクエストするスレッド数以上にする)
+        base_url: API の接続先 (<base_url>/<model>:predict)。デフォルトは環境変数 IMAGE_API_BASE_URL、無ければ Google AI Studio
+        """
+        self.api_key = api_key or os.environ.get("GEMINI_API_KEY")
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.aspect_ratio = aspect_ratio
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = RateLimiter(requests_per_minute) if requests_per_minute else None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # キーは URL (?key=) ではなくヘッダーで送る (ログやエラーメッセージに残さない)
+        self.session.headers.update({"Content-Type": "application/json"})
+        if self.api_key:
+            self.session.headers["x-goog-api-key"] = self.api_key
+
+        self.stats = {"requests": 0, "retries": 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def endpoint(self) -> str:
+        return f"{self.base_url}/{self.model}:predict"
+
+    @property
+    def parameters(self) -> Dict:
+        """リクエストの生成パラメーター (生成画像キャッシュのキーにも使う)"""
+        return {
+            "sampleCount": 1,
+            "aspectRatio": self.aspect_ratio # Useful for slides
+        }
+
+    def generate(self, prompt: str) -> bytes:
+        """プロンプトから画像を1枚生成し、画像のバイト列を返す"""
+        return self.generate_samples(prompt, 1)[0]
+
+    def generate_samples(self, prompt: str, sample_count: int = 1) -> List[bytes]:
+        """sampleCount = sample_count で生成し、返ってきた画像のバイト列のリストを返す"""
+        images = {}
+
+        @contextlib.contextmanager
+        def open_output(index):
+            buf = io.BytesIO()
+            yield buf
+            images[index] = buf.getvalue()
+
+        count = self._post(self._request(prompt, sample_count),
+                           lambda response, deadline: _stream_predictions(response, open_output, deadline))
+        return [images[i] for i in range(count)]
+
+    def generate_to_file(self, prompt: str, output_path: str) -> str:
+        """画像を生成して output_path に保存し、そのパスを返す"""
+        return self.generate_to_files(prompt, [output_path])[0]
+
+    def generate_to_files(self, prompt: str, output_paths: Sequence[str]) -> List[str]:
+        """
+        sampleCount = len(output_paths) で生成し、i 枚目の画像を output_paths[i] に保存する。
+        レスポンスは少しずつ読み、base64 をデコードしながら書くので、画像のサイズ・枚数が増えてもメモリは増えない。
+        保存したパスのリストを返す (フィルターなどで要求より少ない枚数が返ることがある)。
+        """
+        part_paths = [f"{path}.part" for path in output_paths]
+        for path in output_paths:
+            output_dir = os.path.dirname(path)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+
+        def open_output(index):
+            if index >= len(part_paths):
+                raise ImageGenerationError(f"More predictions than requested ({len(part_paths)})")
+            return open(part_paths[index], "wb")
+
+        try:
+            count = self._post(self._request(prompt, len(output_paths)),
+                               lambda response, deadline: _stream_predictions(response, open_output, deadline))
+            for part_path, path in zip(part_paths[:count], output_paths):
+                os.replace(part_path, path)
+        finally:
+            for part_path in part_paths:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+        return list(output_paths[:count])
+
+    def cache_key(self, prompt: str) -> str:
+        """プロンプト + モデル + 生成パラメーターの SHA-256 (GeneratedImageCache のキー)"""
+        params = self.parameters
+        if self.base_url != API_BASE_URL:
+            # ローカルのテスト用サーバーなどの画像を、本物の API の画像として再利用しない
+            params["endpoint"] = self.base_url
+        return generation_key(prompt, self.model, params)
+
+    def generate_cached(self, prompt: str, cache: GeneratedImageCache) -> str:
+        """cache にあればそのパス、無ければ生成してキャッシュに保存したパスを返す"""
+        return cache.get_or_write(self.cache_key(prompt), lambda path: self.generate_to_file(prompt, path),
+                                  model=self.model, prompt=prompt)
+
+    def generate_cached_to(self, prompt: str, cache: GeneratedImageCache, output_path: str) -> str:
+        """
+        generate_cached の画像を output_path に置き (materialize)、そのパスを返す。
+        キャッシュ・ファイルのエラー (OSError, sqlite3.Error) も ImageGenerationError として送出する。
+        キャッシュから取り出した直後に他のプロセスの evict で消された場合は、1回だけ取り直す。
+        """
+        try:
+            try:
+                return materialize(self.generate_cached(prompt, cache), output_path)
+            except FileNotFoundError:
+                return materialize(self.generate_cached(prompt, cache), output_path)
+        except (OSError, sqlite3.Error) as e:
+            raise ImageGenerationError(f"Error storing generated image: {type(e).__name__}: {e}") from e
+
+    def _request(self, prompt: str, sample_count: int) -> Dict:
+        return {
+            "instances": [
+                {"prompt": prompt}
+            ],
+            "parameters": dict(self.parameters, sampleCount=sample_count)
+        }
+
+    def _post(self, data: Dict, handle: Callable[[requests.Response, float], int]) -> int:
+        """
+        data を POST し、成功 (200) したレスポンスを handle(response, deadline) に渡してその戻り値を返す。
+        レスポンスはストリーミングで受け取る (handle が本文を読む)。本文の途中で接続が切れた場合もリトライする。
+        deadline (time.monotonic() の値) を過ぎたら handle は requests.Timeout を送出する (これもリトライする)。
+        """
+        if not self.api_key:
+            raise ImageGenerationError("GEMINI_API_KEY が設定されていません")
+        attempt = 0
+        while True:
+            if self.rate_limiter:
+                self.rate_limiter.wait()
+            self._count("requests")
+
+            retry_after = None
+            # requests の timeout は接続・1回の読み込みごとの制限なので、リクエスト全体の期限は別に持つ
+            deadline = time.monotonic() + self.timeout
+            try:
+                with self.session.post(self.endpoint, json=data, timeout=self.timeout, stream=True) as response:
+                    if response.status_code == 200:
+                        return handle(response, deadline)
+                    error = f"{response.status_code} - {response.text[:200]}"
+                    if response.status_code not in RETRY_STATUS:
+                        raise ImageGenerationError(f"Error calling API: {error}")
+                    retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                error = f"{type(e).__name__}: {e}"
+
+            if attempt >= self.max_retries:
+                raise ImageGenerationError(f"Error calling API after {attempt + 1} attempts: {error}")
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            attempt += 1
+            self._count("retries")
+            print(f"Image API: {error}; retrying in {delay:.1f}s ({attempt}/{self.max_retries})")
+            time.sleep(delay)
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    # 秒数の形式だけ扱う (HTTP-date の形式は無視してバックオフに任せる)
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class _PredictionDecoder:
+    """
+    :predict のレスポンス本文 ({"predictions": [{"bytesBase64Encoded": "...", ...}, ...]}) をチャンクごとに受け取り、
+    i 番目の bytesBase64Encoded の値を base64 デコードしながら open_output(i) のファイルに書く。
+    JSON 全体も base64 の文字列全体もメモリに載せない (保持するのはチャンク1つ分程度)。
+
+    キーは文字列の外にある "bytesBase64Encoded" だけを探す (文字列の中の引用符はバックスラッシュでエスケープされるので一致しない)。
+    base64 には引用符もバックスラッシュも含まれないので、値は次の引用符までで、"/" のエスケープはバックスラッシュを除けばよい。
+    """
+
+    KEY = b'"bytesBase64Encoded"'
+
+    def __init__(self, open_output: Callable[[int], ContextManager]):
+        self.open_output = open_output
+        self.count = 0 # 書き終えた画像の数
+        self.head = b"" # エラーメッセージ用にレスポンスの先頭を残す
+        self._buf = b""
+        self._state = "key" # key: キーを探す -> value: ':' と '"' を待つ -> data: base64 の値 -> key
+        self._output = None
+        self._file = None
+        self._b64 = b""
+
+    @property
+    def in_value(self) -> bool:
+        return self._state != "key"
+
+    def feed(self, chunk: bytes):
+        if len(self.head) < 200:
+            self.head += chunk[:200 - len(self.head)]
+        buf = self._buf + chunk
+        pos = 0
+        while True:
+            if self._state == "key":
+                index = buf.find(self.KEY, pos)
+                if index < 0:
+                    # チャンクの境目で分かれたキーを次で見つけられるように末尾を残す
+                    buf = buf[max(pos, len(buf) - len(self.KEY) + 1):]
+                    break
+                pos = index + len(self.KEY)
+                self._state = "value"
+            elif self._state == "value":
+                while pos < len(buf) and buf[pos] in b" \t\r\n:":
+                    pos += 1
+                if pos == len(buf):
+                    buf = b""
+                    break
+                if buf[pos] != ord('"'):
+                    raise ImageGenerationError("bytesBase64Encoded is not a string")
+                pos += 1
+                self._begin()
+            else:
+                end = buf.find(b'"', pos)
+                self._write(buf[pos:] if end < 0 else buf[pos:end])
+                if end < 0:
+                    buf = b""
+                    break
+                pos = end + 1
+                self._end()
+        self._buf = buf
+
+    def close(self, exc: Optional[BaseException] = None):
+        """途中で終わった場合に開いているファイルを閉じる"""
+        if self._output is not None:
+            output, self._output = self._output, None
+            output.__exit__(type(exc), exc, exc.__traceback__ if exc else None)
+
+    def _begin(self):
+        self._output = self.open_output(self.count)
+        self._file = self._output.__enter__()
+        self._b64 = b""
+        self._state = "data"
+
+    def _write(self, data: bytes):
+        self._b64 += data.replace(b"\\", b"")
+        n = len(self._b64) // 4 * 4
+        if n:
+            self._file.write(_b64decode(self._b64[:n]))
+            self._b64 = self._b64[n:]
+
+    def _end(self):
+        if self._b64:
+            self._file.write(_b64decode(self._b64))
+        output, self._output = self._output, None
+        output.__exit__(None, None, None)
+        self.count += 1
+        self._state = "key"
+
+
+def _b64decode(data: bytes) -> bytes:
+    try:
+        return binascii.a2b_base64(data)
+    except binascii.Error as e:
+        raise ImageGenerationError(f"Invalid base64 image data: {e}")
+
+
+def _iter_body(response: requests.Response, deadline: Optional[float]) -> Iterator[bytes]:
+    """
+    response.iter_content と同じく本文を (デコードして) 少しずつ返すが、
+    STREAM_CHUNK_SIZE 分溜まるのを待たずに届いた分を返す (read1)。そのため少しずつしか届かない場合も
+    deadline を過ぎた時点で requests.Timeout を送出できる。urllib3 の例外は iter_content と同じ requests の例外にする。
+    """
+    raw = response.raw
+    if not hasattr(raw, "read1"):
+        # urllib3 < 2: チャンクの間でだけ期限を確認する
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            _check_deadline(deadline)
+            yield chunk
+        return
+    while True:
+        _check_deadline(deadline)
+        try:
+            chunk = raw.read1(STREAM_CHUNK_SIZE, decode_content=True)
+        except ProtocolError as e:
+            raise requests.exceptions.ChunkedEncodingError(e)
+        except ReadTimeoutError as e:
+            raise requests.ConnectionError(e)
+        except SSLError as e:
+            raise requests.exceptions.SSLError(e)
+        except DecodeError as e:
+            raise ImageGenerationError(f"Failed to decode response body: {e}")
+        if not chunk:
+            return
+        yield chunk
+
+
+def _check_deadline(deadline: Optional[float]):
+    if deadline is not None and time.monotonic() > deadline:
+        raise requests.Timeout("Response not finished within the request timeout")
+
+
+def _stream_predictions(response: requests.Response, open_output: Callable[[int], ContextManager],
+                        deadline: Optional[float] = None) -> int:
+    """
+    レスポンスの画像を順に open_output(i) に書き、書いた枚数を返す。
+    deadline (time.monotonic() の値) を過ぎても読み終わらなければ requests.Timeout を送出する。
+    """
+    decoder = _PredictionDecoder(open_output)
+    try:
+        for chunk in _iter_body(response, deadline):
+            decoder.feed(chunk)
+    except BaseException as e:
+        decoder.close(e)
+        raise
+    if decoder.in_value:
+        decoder.close()
+        raise ImageGenerationError("Response ended in the middle of image data")
+    if decoder.count == 0:
+        raise ImageGenerationError(f"No image data in response: {decoder.head.decode('utf-8', 'replace')}")
+    return decoder.count
@@ -0,0 +1,242 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Hashable, IO, Iterable, Optional, Tuple, Union
+
+from PIL import Image
+
+EMU_PER_INCH = 914400
+
+# 変換方法を変えたら上げる (ディスクキャッシュの古い結果を使わないようにするため)
+PIPELINE_VERSION = "1"
+
+# 写真以外 (図・スクリーンショット・ロゴ) とみなす色数の上限。これ以下なら PNG のまま
+PNG_MAX_COLORS = 256
+
+ImageSource = Union[str, IO[bytes]]
+PrepareRequest = Tuple[str, int, int] # (画像パス, 幅 EMU, 高さ EMU)
+
+
+class ImagePipeline:
+    """
+    スライドに貼る前に画像を表示サイズまで縮小・再エンコードするステージ。
+
+    - 目標ピクセル数 = 表示枠 (EMU) x dpi。縦横比は保ち、枠を覆う最小サイズまで縮小する (拡大はしない)
+    - 透過あり / 色数が少ない画像 (図・ロゴ) は PNG、それ以外 (写真) は JPEG で再エンコード
+    - 結果はソースの SHA-256 + 目標サイズをキーにキャッシュする
+      (cache_dir を指定するとディスクに保存し、次回以降の実行でも再利用する)
+    - prefetch() で複数の画像をスレッドプールで並列に変換しておける (Pillow は変換中 GIL を解放する)
+    - メモリ上の結果は prepare() で受け取った時点で手放す (prefetch した回数分受け取るまでは保持する)。
+      owner ごとに prefetch した分を数えるので、複数のビルドで共有しても release(owner) は自分の分だけを手放す
+
+    縮小の必要がない画像や、再エンコードしても小さくならない画像は元ファイルをそのまま返す。
+    """
+
+    def __init__(self, dpi: int = 150, jpeg_quality: int = 85, cache_dir: Optional[str] = None,
+                 max_workers: Optional[int] = None):
+        self.dpi = dpi
+        self.jpeg_quality = jpeg_quality
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._max_workers = max_workers
+
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._results: Dict[str, Future] = {} # cache key -> Future[ImageSource or None]
+        self._pending: Dict[str, int] = {} # cache key -> prefetch されてまだ prepare() されていない回数 (全 owner の合計)
+        self._owned: Dict[Optional[Hashable], Dict[str, int]] = {} # owner -> (cache key -> 上の回数のうちその owner の分)
+        self._digests: Dict[Tuple[str, int, int], str] = {} # (path, mtime_ns, size) -> sha256
+        # resized / kept: 変換した・元ファイルのままにした画像数, disk_hits: ディスクキャッシュから読んだ数
+        self.stats = {"resized": 0, "kept": 0, "disk_hits": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def prefetch(self, requests: Iterable[PrepareRequest], owner: Optional[Hashable] = None):
+        """
+        requests の画像をバックグラウンドで変換しておく (結果は同じ owner の prepare() で受け取る)。
+        受け取らなかった分は release(owner) で手放す。
+        """
+        for path, width_emu, height_emu in requests:
+            key, _ = self._submit(path, width_emu, height_emu)
+            with self._lock:
+                self._pending[key] = self._pending.get(key, 0) + 1
+                owned = self._owned.setdefault(owner, {})
+                owned[key] = owned.get(key, 0) + 1
+
+    def prepare(self, path: str, width_emu: int, height_emu: int, owner: Optional[Hashable] = None) -> ImageSource:
+        """
+        path の画像を width_emu x height_emu の枠に貼るための画像を返す (add_picture にそのまま渡せる)。
+        変換に失敗した場合は警告を出して元のパスを返す。
+        """
+        key, future = self._submit(path, width_emu, height_emu)
+        with self._lock:
+            owned = self._owned.get(owner, {})
+            consumed = 1 if owned.get(key, 0) > 0 else 0
+            if consumed:
+                owned[key] -= 1
+                if not owned[key]:
+                    del owned[key]
+            self._release(key, consumed)
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Warning: Image preprocessing failed for {path}: {e}")
+            return path
+        if isinstance(result, bytes):
+            return io.BytesIO(result)
+        return result
+
+    def release(self, owner: Optional[Hashable] = None):
+        """owner が prefetch して prepare() で受け取らなかった分を手放す (他の owner の分は残す)"""
+        with self._lock:
+            for key, count in self._owned.pop(owner, {}).items():
+                self._release(key, count)
+
+    def clear(self):
+        """メモリ上の変換結果を全て破棄する (ディスクキャッシュは残す)"""
+        with self._lock:
+            self._results.clear()
+            self._pending.clear()
+            self._owned.clear()
+            self._digests.clear()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def target_pixels(self, width_emu: int, height_emu: int) -> Tuple[int, int]:
+        return (max(1, round(width_emu / EMU_PER_INCH * self.dpi)),
+                max(1, round(height_emu / EMU_PER_INCH * self.dpi)))
+
+    def settings_key(self) -> str:
+        """出力に影響する設定 (インクリメンタルビルドの build_key に含める)"""
+        return f"image-pipeline:{PIPELINE_VERSION}:{self.dpi}dpi:q{self.jpeg_quality}"
+
+    # --- internals ---
+
+    def _submit(self, path: str, width_emu: int, height_emu: int) -> Tuple[str, Future]:
+        target = self.target_pixels(width_emu, height_emu)
+        key = self._cache_key(path, target)
+
+        with self._lock:
+            future = self._results.get(key)
+            if future is not None:
+                return key, future
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers,
+                                                    thread_name_prefix="image-pipeline")
+            future = self._executor.submit(self._process, path, target, key)
+            self._results[key] = future
+            return key, future
+
+    def _release(self, key: str, count: int):
+        """prefetch 分の受け取りを count 回減らし、もう受け取る予定が無ければ結果を手放す (self._lock を持って呼ぶ)"""
+        remaining = self._pending.get(key, 0) - count
+        if remaining > 0:
+            self._pending[key] = remaining
+        else:
+            self._pending.pop(key, None)
+            self._results.pop(key, None)
+
+    def _cache_key(self, path: str, target: Tuple[int, int]) -> str:
+        st = os.stat(path)
+        stat_key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+        with self._lock:
+            digest = self._digests.get(stat_key)
+        if digest is None:
+            h = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+            digest = h.hexdigest()
+            with self._lock:
+                self._digests[stat_key] = digest
+        params = f"{PIPELINE_VERSION}:{target[0]}x{target[1]}:q{self.jpeg_quality}"
+        return f"{digest}-{hashlib.sha256(params.encode('utf-8')).hexdigest()[:16]}"
+
+    def _cached_file(self, key: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        for ext in ("png", "jpg", "orig"):
+            candidate = os.path.join(self.cache_dir, f"{key}.{ext}")
+            if os.path.exists(candidate):
+                return candidate
+        return None
+
+    def _process(self, path: str, target: Tuple[int, int], key: str) -> ImageSource:
+        cached = self._cached_file(key)
+        if cached is not None:
+            self._count("disk_hits")
+            # ".orig" は「元ファイルのままでよい」という記録
+            return path if cached.endswith(".orig") else cached
+
+        source_size = os.path.getsize(path)
+        blob, ext = self._reencode(path, target)
+        if blob is None or len(blob) >= source_size:
+            self._count("kept", source_size, source_size)
+            self._store(key, "orig", b"")
+            return path
+
+        self._count("resized", source_size, len(blob))
+        stored = self._store(key, ext, blob)
+        return stored if stored else blob
+
+    def _reencode(self, path: str, target: Tuple[int, int]) -> Tuple[Optional[bytes], Optional[str]]:
+        with Image.open(path) as img:
+            # 表示枠を覆うのに必要なサイズ (縦横比は保つ)
+            scale = max(target[0] / img.width, target[1] / img.height)
+            if scale >= 1.0:
+                return None, None
+            size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+
+            # JPEG のまま縮小する場合はデコード時に間引いて読む (draft は JPEG 以外では何もしない)
+            img.draft("RGB", size)
+            img = img.convert("RGBA") if _has_alpha(img) else img.convert("RGB")
+            # 縮小すると中間色が増えるので、PNG / JPEG の判定は縮小前に行う
+            as_png = img.mode == "RGBA" or _is_graphic(img)
+            img = img.resize(size, Image.LANCZOS)
+
+            out = io.BytesIO()
+            if as_png:
+                img.save(out, format="PNG", optimize=True)
+                return out.getvalue(), "png"
+            img.save(out, format="JPEG", quality=self.jpeg_quality, optimize=True)
+            return out.getvalue(), "jpg"
+
+    def _store(self, key: str, ext: str, blob: bytes) -> Optional[str]:
+        """ディスクキャッシュに書き込む (atomic)。cache_dir が無い場合は None"""
+        if not self.cache_dir:
+            return None
+        dest = os.path.join(self.cache_dir, f"{key}.{ext}")
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, dest)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return dest
+
+    def _count(self, name: str, bytes_in: int = 0, bytes_out: int = 0):
+        with self._lock:
+            self.stats[name] += 1
+            self.stats["bytes_in"] += bytes_in
+            self.stats["bytes_out"] += bytes_out
+
+
+def _has_alpha(img: Image.Image) -> bool:
+    if img.mode in ("RGBA", "LA", "PA"):
+        return img.getchannel("A").getextrema()[0] < 255
+    return img.mode == "P" and "transparency" in img.info
+
+
+def _is_graphic(img: Image.Image) -> bool:
+    """色数が少ない (図・スクリーンショット・ロゴ) なら True。PNG の方が小さく、JPEG のにじみも出ない"""
+    return img.getcolors(maxcolors=PNG_MAX_COLORS) is not None
+
@@ -1,59 +1,55 @@
 import os
 import sys
+import threading
 from pathlib import Path
-import google.generativeai as genai
-from PIL import Image
-import io
+from typing import Optional
 
-def generate_image_from_prompt(prompt: str, output_path: str, api_key: str = None):
+from src.utils.image_pipeline import ImagePipeline
+from src.utils.image_client import ImageGenerationClient, ImageGenerationError
+from src.utils.generated_image_cache import GeneratedImageCache
+
+# プロセス内で共有するクライアント (API キーごと) と生成画像キャッシュ。接続やマニフェストを使い回すため、呼び出しごとに作らない
+_clients = {}
+_clients_lock = threading.Lock()
+_image_cache = None
+
+def get_image_client(api_key: Optional[str] = None) -> ImageGenerationClient:
+    api_key = api_key or os.environ.get("GEMINI_API_KEY")
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = ImageGenerationClient(api_key=api_key)
+            _clients[api_key] = client
+        return client
+
+def get_image_cache() -> GeneratedImageCache:
+    """共有の生成画像キャッシュ (GENERATED_IMAGE_CACHE_DIR、デフォルトは ~/.cache/generated_images)"""
+    global _image_cache
+    with _clients_lock:
+        if _image_cache is None:
+            _image_cache = GeneratedImageCache()
+        return _image_cache
+
+def generate_image_from_prompt(prompt: str, output_path: str, api_key: str = None,
+                               image_cache: Optional[GeneratedImageCache] = None):
     """
-    Gemini (NanoBanaNana) を使用して画像を生成し、保存する
+    Imagen を使用して画像を生成し、保存する (ImageGenerationClient をプロセス内で呼ぶ)。
+    同じプロンプト・モデル・パラメーターの画像は生成画像キャッシュから取り出し、API を呼ばない。
     """
-    if not api_key:
-        api_key = os.environ.get("GEMINI_API_KEY")
-    
-    if not api_key:
-        print("エラー: GEMINI_API_KEY が設定されていません。画像生成をスキップします。")
-        return False
-        
+    image_cache = image_cache or get_image_cache()
+    client = get_image_client(api_key)
     try:
-        genai.configure(api_key=api_key)
-        
-        # モデル名は利用可能な最新の画像生成モデルを指定
-        # 注意: 2024年現在、一般公開されているAPIでのモデル名は変動しやすいため
-        # 実際には 'gemini-pro' 等のテキストモデルではなく画像生成専用モデルが必要
-        # ここでは 'gemini-1.5-pro-latest' 等、マルチモーダル対応モデルでの生成を試みるか
-        # もしくは Imagen on Vertex AI の使用が一般的だが、
-        # 簡易的に google-generativeai SDK の画像生成メソッド(もしあれば)を使用する想定
-        
-        # ※実際のGemini Image Generation APIのリファレンスに基づくコード
-        # 現時点ではSDKの仕様が流動的なため、例外処理で囲みつつ実装
-        
-        # 仮の実装: 多くの場合はimagenモデルを指定する
-        model = genai.GenerativeModel('gemini-1.5-pro') 
-        
-        # 注: google-generativeai ライブラリでの画像生成はまだBeta等の可能性があるため
-        # エラー時はダミー画像を生成する等のフォールバック推奨
-        
         print(f"画像生成中... プロンプト: {prompt[:30]}...")
-        
-        # TODO: 正式な画像生成APIコールに変更が必要な可能性あり
-        # response = model.generate_content(prompt) # これはテキスト/マルチモーダル用
-        
-        # ダミー実装（APIキーがない場合やモデル未対応時のためのプレースホルダー）
-        # 実際にはここで img = response.images[0] のように取得したい
-        
-        # テスト用に単色画像を作成
-        img = Image.new('RGB', (800, 600), color = (73, 109, 137))
-        img.save(output_path)
-        print(f"画像保存完了（ダミー）: {output_path}")
+        # キャッシュ・ファイルのエラーも ImageGenerationError になる
+        client.generate_cached_to(prompt, image_cache, output_path)
+        print(f"画像保存完了: {output_path}")
         return True
 
-    except Exception as e:
+    except ImageGenerationError as e:
         print(f"画像生成エラー: {e}")
         return False
 
-def add_image_to_slide(slide, image_info, output_dir="output/images"):
+def add_image_to_slide(slide, image_info, output_dir="output/images", image_pipeline: Optional[ImagePipeline] = None):
     """
     スライドに画像を追加する
     image_info format:
@@ -63,6 +59,7 @@ def add_image_to_slide(slide, image_info, output_dir="output/images"):
         "path": "path/to/existing/image.png", # 既存画像の場合
         "position": {"left": 1.0, "top": 2.0, "width": 6.0, "height": 4.0}
     }
+    image_pipeline: 表示サイズまで縮小してから貼る (None の場合は元画像をそのまま貼る)
     """
     # 保存先ディレクトリ
     Path(output_dir).mkdir(parents=True, exist_ok=True)
@@ -72,10 +69,11 @@ def add_image_to_slide(slide, image_info, output_dir="output/images"):
     # 画像生成が必要な場合
     if image_info.get("generated") and image_info.get("prompt"):
         prompt = image_info["prompt"]
-        filename = f"gen_{hash(prompt)}.png"
+        # プロンプト・モデル・パラメーターの SHA-256 (実行をまたいで同じファイル名になる)
+        filename = f"gen_{get_image_client().cache_key(prompt)}.png"
         generated_path = str(Path(output_dir) / filename)
         
-        if generate_image_from_prompt(prompt, generated_path):
+        if os.path.exists(generated_path) or generate_image_from_prompt(prompt, generated_path):
             image_path = generated_path
     
     if not image_path or not os.path.exists(image_path):
@@ -90,5 +88,8 @@ def add_image_to_slide(slide, image_info, output_dir="output/images"):
     width = Inches(pos.get("width", 6.0))
     height = Inches(pos.get("height", 4.0))
     
+    # 表示サイズに合わせて縮小・再エンコード
+    image = image_pipeline.prepare(image_path, width, height) if image_pipeline else image_path
+    
     # 画像を追加
-    slide.shapes.add_picture(image_path, left, top, width, height)
+    slide.shapes.add_picture(image, left, top, width, height)
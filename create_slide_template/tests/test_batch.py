@@ -0,0 +1,54 @@
+"""
+Batch mode: output naming and recovery from a crashed worker.
+
+Run from create_slide_template/:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.builder import batch
+
+
+def test_expand_glob_keeps_subdirectories(tmp_path):
+    for rel in ["q1/summary.md", "q2/summary.md", "top.md"]:
+        path = tmp_path / "reports" / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("# x\n", encoding="utf-8")
+    out = str(tmp_path / "out")
+
+    jobs = batch.expand_glob(str(tmp_path / "reports" / "**" / "*.md"), out)
+    assert sorted(os.path.relpath(o, out) for _, o in jobs) == [
+        os.path.join("q1", "summary.pptx"), os.path.join("q2", "summary.pptx"), "top.pptx"]
+
+
+def test_colliding_outputs_are_rejected(tmp_path):
+    (tmp_path / "a.md").write_text("# a\n", encoding="utf-8")
+    (tmp_path / "a.markdown").write_text("# a\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="would both be written"):
+        batch.expand_glob(str(tmp_path / "a.*"), str(tmp_path / "out"))
+
+
+def fake_build_one(input_path, output_path, template_path, cache_dir=None, **options):
+    if input_path == "crash.md":
+        os._exit(1)
+    return {"input": input_path, "output": output_path, "ok": True, "seconds": 0.0, "error": None, "options": options}
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="relies on fork to run the patched build_one in workers")
+def test_crashed_worker_fails_only_its_own_job(monkeypatch):
+    monkeypatch.setattr(batch, "build_one", fake_build_one)
+    monkeypatch.setattr(batch, "_init_worker", lambda template_path: None)
+    jobs = [(f"deck{i}.md", f"deck{i}.pptx") for i in range(6)]
+    jobs.insert(2, ("crash.md", "crash.pptx"))
+
+    results = batch.run_batch(jobs, "template.pptx", workers=2, compression="fast")
+
+    assert [r["input"] for r in results] == [i for i, _ in jobs]
+    assert [r["ok"] for r in results] == [r["input"] != "crash.md" for r in results]
+    assert "BrokenProcessPool" in results[2]["error"]
+    assert all(r["options"] == {"compression": "fast"} for r in results if r["ok"])
@@ -0,0 +1,50 @@
+"""
+Columnar chart data: ragged CSV rows and comparing charts backed by arrays.
+
+Run from create_slide_template/:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.markdown_parser.md_parser import MarkdownParser
+from src.schema.slide_schema import ChartData, ChartType
+from src.utils.columnar import parse_csv_columns
+
+CSV = ["部門, 2023年, 2024年", "営業1課, 500, 650", "営業2課, 450", "営業3課, 1, 2, 3", "営業4課, , n/a"]
+
+
+def test_short_rows_are_skipped_and_extra_cells_dropped_with_warnings(capsys):
+    header, categories, series = parse_csv_columns(CSV)
+    out = capsys.readouterr().out
+    assert "Skipping chart row with 2 cells" in out
+    assert "ignoring the extra cells: ['3']" in out
+
+    assert categories == ["営業1課", "営業3課", "営業4課"]
+    np.testing.assert_array_equal(series["2023年"], [500.0, 1.0, np.nan])
+    np.testing.assert_array_equal(series["2024年"], [650.0, 2.0, np.nan])
+    assert all(values.flags["C_CONTIGUOUS"] and values.dtype == np.float64 for values in series.values())
+
+
+def test_pad_short_rows():
+    _, categories, series = parse_csv_columns(CSV[:3], pad_short_rows=True)
+    assert categories == ["営業1課", "営業2課"]
+    np.testing.assert_array_equal(series["2024年"], [650.0, np.nan])
+
+
+def test_charts_compare_by_value():
+    chart = ChartData(type=ChartType.LINE, title="t", categories=["a", "b"], series={"s": [1.0, None]})
+    assert chart == ChartData(type=ChartType.LINE, title="t", categories=["a", "b"], series={"s": np.array([1.0, np.nan])})
+    assert chart != ChartData(type=ChartType.LINE, title="t", categories=["a", "b"], series={"s": [1.0, 2.0]})
+    assert chart != ChartData(type=ChartType.LINE, title="t", categories=["a", "b"], series={"s": [1.0]})
+    assert chart != ChartData(type=ChartType.LINE, title="t", categories=["a", "b"], series={"x": [1.0, None]})
+
+
+def test_decks_with_charts_compare_equal():
+    md = "# Sales\n```chart:column\n売上\n" + "\n".join(CSV[:2]) + "\n```\n"
+    assert MarkdownParser().parse(md) == MarkdownParser().parse(md)
+    assert MarkdownParser().parse(md) != MarkdownParser().parse(md.replace("650", "651"))
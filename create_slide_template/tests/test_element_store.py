@@ -0,0 +1,93 @@
+"""
+ElementStore (struct-of-arrays slide elements): read-only views, JSON / pickle round trips.
+
+Run from create_slide_template/:
+    python -m pytest -q tests
+"""
+import os
+import pickle
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.schema.slide_schema import ElementStore, SlideContent, SlideType
+
+
+def make_store() -> ElementStore:
+    store = ElementStore()
+    store.append("text", "Heading", [0.1, 0.1, 0.5, 0.1], 24.0, [0, 0, 0], {"bold": True})
+    store.append("image", "photo.png", [0.1, 0.3, 0.4, 0.4])
+    return store
+
+
+def test_views_are_read_only():
+    store = make_store()
+    with pytest.raises(TypeError):
+        store[0].attributes["bold"] = False
+    with pytest.raises(TypeError):
+        store[1].attributes["alt"] = "x"
+    with pytest.raises(AttributeError):
+        store[1].content = "other.png"
+
+    # Reading attributes of an element without any does not add an entry to the store
+    assert dict(store[1].attributes) == {}
+    assert store._attributes == {0: {"bold": True}}
+    assert store == make_store()
+
+
+def test_set_content():
+    store = make_store()
+    store.set_content(-1, "images/photo.png")
+    assert [content for _, content, _, _, _, _ in store.rows()] == ["Heading", "images/photo.png"]
+    with pytest.raises(IndexError):
+        store.set_content(2, "missing.png")
+
+
+def make_mixed_store(n: int = 20) -> ElementStore:
+    # More than the initial capacity, with odd rects, missing sizes, colors and attributes
+    store = ElementStore()
+    for i in range(n):
+        rect = None if i % 5 == 0 else [0.1, 0.2, 0.3] if i % 7 == 0 else [i / 100, 0.2, 0.3, 0.04]
+        store.append("image" if i % 3 == 0 else "text", f"item {i}", rect, None if i % 2 else 10.0 + i,
+                     [i, 0, 0] if i % 4 == 0 else None, {"bold": True, "label": f"#{i}"} if i % 6 == 0 else None)
+    return store
+
+
+def test_json_round_trip():
+    slide = SlideContent(type=SlideType.CONTENT, title="t", elements=make_mixed_store())
+    restored = SlideContent.model_validate_json(slide.model_dump_json())
+
+    assert isinstance(restored.elements, ElementStore)
+    assert restored == slide
+    assert restored.elements.to_elements() == slide.elements.to_elements()
+    assert restored.elements[7].rect == [0.1, 0.2, 0.3]
+    assert restored.elements[5].rect is None and restored.elements[5].font_size is None
+    assert restored.elements[6].attributes == {"bold": True, "label": "#6"}
+    # SlideElement models, dicts and views are all accepted
+    assert ElementStore.from_elements(slide.elements.to_elements()) == slide.elements
+    assert ElementStore.from_elements(slide.elements.to_dicts()) == slide.elements
+    assert ElementStore.from_elements(slide.elements) == slide.elements
+
+
+def test_pickle_round_trip():
+    store = make_mixed_store()
+    restored = pickle.loads(pickle.dumps(store))
+
+    assert restored == store
+    assert len(restored._type_codes) == len(store) < len(store._type_codes)
+    # The restored store can keep growing
+    restored.append("text", "appended", [0.5, 0.5, 0.1, 0.1], 9.0)
+    assert restored[-1].content == "appended" and restored.rects.shape == (21, 4)
+
+    slide = SlideContent(type=SlideType.CONTENT, elements=store)
+    assert pickle.loads(pickle.dumps(slide)) == slide
+
+
+def test_deep_copy_is_independent():
+    slide = SlideContent(type=SlideType.CONTENT, elements=make_mixed_store())
+    copy = slide.model_copy(deep=True)
+    copy.elements.set_content(0, "changed")
+    copy.elements.append("text", "extra")
+    assert slide.elements[0].content == "item 0" and len(slide.elements) == 20
@@ -0,0 +1,124 @@
+"""
+GeneratedImageCache: deterministic keys, LRU eviction and concurrent writers.
+
+Run from create_slide_template/:
+    python -m pytest -q tests
+"""
+import itertools
+import multiprocessing
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.utils import generated_image_cache
+from src.utils.generated_image_cache import GeneratedImageCache, generation_key
+
+PNG = b"\x89PNG\r\n\x1a\n"
+
+
+def image(n: int, fill: bytes = b"x") -> bytes:
+    return PNG + fill * (n - len(PNG))
+
+
+def manifest(cache: GeneratedImageCache):
+    with sqlite3.connect(cache._manifest_path) as db:
+        return {key: (filename, size) for key, filename, size in db.execute("SELECT key, filename, size FROM entries")}
+
+
+def assert_consistent(cache: GeneratedImageCache):
+    """Every manifest row has its file with the recorded size, and there are no other files"""
+    entries = manifest(cache)
+    assert sorted(os.listdir(cache.image_dir)) == sorted(filename for filename, _ in entries.values())
+    for filename, size in entries.values():
+        assert os.path.getsize(os.path.join(cache.image_dir, filename)) == size
+    assert cache.total_bytes() == sum(size for _, size in entries.values())
+
+
+def test_generation_key_is_deterministic():
+    key = generation_key("夕焼けの富士山", "imagen-3.0", {"aspectRatio": "16:9", "sampleCount": 1})
+    assert key == generation_key("夕焼けの富士山", "imagen-3.0", {"sampleCount": 1, "aspectRatio": "16:9"})
+    assert key != generation_key("夕焼けの富士山", "imagen-3.0", {"aspectRatio": "4:3", "sampleCount": 1})
+    assert key != generation_key("夕焼けの富士山", "imagen-4.0", {"aspectRatio": "16:9", "sampleCount": 1})
+    assert len(key) == 64
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = itertools.count(1000.0)
+    monkeypatch.setattr(generated_image_cache.time, "time", lambda: next(clock))
+    cache = GeneratedImageCache(str(tmp_path), max_bytes=250)
+
+    cache.put("a", image(100))
+    cache.put("b", image(100))
+    assert cache.get("a") is not None # a is now more recent than b
+    cache.put("c", image(100))
+
+    assert sorted(manifest(cache)) == ["a", "c"]
+    assert cache.get("b") is None
+    assert cache.stats["evicted"] == 1
+    assert cache.total_bytes() == 200
+    assert_consistent(cache)
+
+    # An entry larger than the whole budget is still kept (everything else goes)
+    cache.put("big", image(300))
+    assert sorted(manifest(cache)) == ["big"]
+    assert_consistent(cache)
+
+
+def test_deleted_file_is_a_miss(tmp_path):
+    cache = GeneratedImageCache(str(tmp_path))
+    os.remove(cache.put("a", image(50)))
+    assert cache.get("a") is None
+    assert manifest(cache) == {}
+
+
+def test_concurrent_get_or_create_generates_once(tmp_path):
+    cache = GeneratedImageCache(str(tmp_path))
+    calls = []
+    barrier = threading.Barrier(8)
+
+    def generate():
+        calls.append(1)
+        time.sleep(0.05)
+        return image(64)
+
+    def request(_):
+        barrier.wait()
+        return cache.get_or_create("same", generate)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        paths = set(pool.map(request, range(8)))
+    assert len(calls) == 1 and len(paths) == 1
+    assert (cache.stats["hits"], cache.stats["misses"]) == (7, 1)
+
+
+def _put_many(cache_dir, worker, max_bytes):
+    cache = GeneratedImageCache(cache_dir, max_bytes=max_bytes)
+    for i in range(20):
+        # Some keys are shared between workers, so they also replace each other's files
+        key = f"shared-{i % 5}" if i % 2 else f"w{worker}-{i}"
+        cache.put(key, image(100 + i, fill=bytes([65 + worker])))
+        cache.get(f"shared-{(i + 1) % 5}")
+
+
+def test_concurrent_put_from_processes_keeps_manifest_and_files_consistent(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    max_bytes = 1500
+    GeneratedImageCache(cache_dir, max_bytes=max_bytes)
+
+    ctx = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+    workers = [ctx.Process(target=_put_many, args=(cache_dir, w, max_bytes)) for w in range(4)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join(60)
+        assert p.exitcode == 0
+
+    cache = GeneratedImageCache(cache_dir, max_bytes=max_bytes)
+    assert 0 < cache.total_bytes() <= max_bytes
+    assert_consistent(cache)
+    assert not [name for name in os.listdir(cache.image_dir) if name.endswith(".tmp")]
@@ -0,0 +1,103 @@
+"""
+ImageGenerationClient: streamed responses, the per-request deadline and cache/file errors.
+
+Run from create_slide_template/:
+    python -m pytest -q tests
+"""
+import base64
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+from fake_imagen_server import FakeImagenServer
+from src.utils.generated_image_cache import GeneratedImageCache
+from src.utils.image_client import ImageGenerationClient, ImageGenerationError
+
+
+@pytest.fixture
+def fake_server():
+    with FakeImagenServer(latency=0.0, image_size=(64, 48)) as server:
+        yield server
+
+
+@pytest.fixture
+def trickle_server():
+    """Sends a valid response one byte every 50 ms (each read is fast, the whole response is not)"""
+    body = b'{"predictions": [{"bytesBase64Encoded": "' + base64.b64encode(b"x" * 300) + b'"}]}'
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                for i in range(len(body)):
+                    self.wfile.write(body[i:i + 1])
+                    self.wfile.flush()
+                    time.sleep(0.05)
+            except OSError:
+                pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}/v1beta/models"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_streamed_samples_match_server_image(fake_server, tmp_path):
+    client = ImageGenerationClient(api_key="dummy", base_url=fake_server.base_url)
+    paths = [str(tmp_path / f"out_{i}.png") for i in range(3)]
+    assert client.generate_to_files("prompt", paths) == paths
+    expected = base64.b64decode(fake_server.image_b64)
+    for path in paths:
+        with open(path, "rb") as f:
+            assert f.read() == expected
+
+
+def test_timeout_covers_the_whole_response(trickle_server):
+    client = ImageGenerationClient(api_key="dummy", base_url=trickle_server, timeout=0.5, max_retries=0)
+    t0 = time.monotonic()
+    with pytest.raises(ImageGenerationError, match="within the request timeout"):
+        client.generate("prompt")
+    assert time.monotonic() - t0 < 3
+
+
+def test_cached_image_evicted_before_materialize_is_fetched_again(fake_server, tmp_path, monkeypatch):
+    client = ImageGenerationClient(api_key="dummy", base_url=fake_server.base_url)
+    cache = GeneratedImageCache(str(tmp_path / "cache"))
+    generate_cached = client.generate_cached
+    calls = []
+
+    def evicted_once(prompt, image_cache):
+        path = generate_cached(prompt, image_cache)
+        if not calls:
+            os.remove(path) # another process evicted it
+        calls.append(path)
+        return path
+
+    monkeypatch.setattr(client, "generate_cached", evicted_once)
+    output = str(tmp_path / "slides" / "image.png")
+    assert client.generate_cached_to("prompt", cache, output) == output
+    assert os.path.exists(output) and len(calls) == 2
+
+
+def test_file_errors_are_image_generation_errors(fake_server, tmp_path):
+    client = ImageGenerationClient(api_key="dummy", base_url=fake_server.base_url)
+    cache = GeneratedImageCache(str(tmp_path / "cache"))
+    not_a_dir = tmp_path / "file"
+    not_a_dir.write_text("x")
+    with pytest.raises(ImageGenerationError, match="NotADirectoryError|FileExistsError"):
+        client.generate_cached_to("prompt", cache, str(not_a_dir / "image.png"))
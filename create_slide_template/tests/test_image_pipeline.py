@@ -0,0 +1,63 @@
+"""
+ImagePipeline keeps converted pictures in memory only until prepare() hands them out.
+
+Run from create_slide_template/:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+from PIL import Image
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.builder import incremental
+from src.utils.image_pipeline import EMU_PER_INCH, ImagePipeline
+
+
+def test_results_released_after_prepare(tmp_path):
+    path = str(tmp_path / "photo.png")
+    Image.new("RGB", (800, 600), (10, 20, 30)).save(path)
+    pipeline = ImagePipeline(dpi=72)
+    box = (path, EMU_PER_INCH, EMU_PER_INCH)
+
+    # Same picture on two slides: the first prepare() must not drop the second one's result
+    pipeline.prefetch([box, box])
+    pipeline.prepare(*box)
+    assert len(pipeline._results) == 1
+    pipeline.prepare(*box)
+    assert pipeline._results == {}
+    assert pipeline.stats["resized"] + pipeline.stats["kept"] == 1
+
+    # Not prefetched: nothing is left behind either
+    pipeline.prepare(path, 2 * EMU_PER_INCH, EMU_PER_INCH)
+    assert pipeline._results == {}
+    pipeline.shutdown()
+
+
+def test_release_keeps_other_owners_prefetches(tmp_path):
+    path = str(tmp_path / "photo.png")
+    Image.new("RGB", (800, 600), (10, 20, 30)).save(path)
+    pipeline = ImagePipeline(dpi=72)
+    box = (path, EMU_PER_INCH, EMU_PER_INCH)
+    first, second = object(), object()
+
+    pipeline.prefetch([box], owner=first)
+    pipeline.prefetch([box], owner=second)
+    # A prepare() without a matching prefetch must not use up another owner's prefetch
+    pipeline.prepare(*box)
+    # The first build finishes without using its picture; the second build's prefetch survives
+    pipeline.release(owner=first)
+    assert len(pipeline._results) == 1
+    pipeline.prepare(*box, owner=second)
+    assert pipeline._results == {}
+    assert pipeline.stats["resized"] + pipeline.stats["kept"] == 1
+    pipeline.shutdown()
+
+
+def test_build_key_depends_on_image_settings(tmp_path):
+    template = tmp_path / "template.pptx"
+    template.write_bytes(b"template")
+    keys = {incremental.build_key(str(template), settings=ImagePipeline(dpi=dpi, jpeg_quality=q).settings_key())
+            for dpi, q in [(150, 85), (300, 85), (150, 60)]}
+    assert len(keys) == 3
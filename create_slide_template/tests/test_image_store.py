@@ -0,0 +1,79 @@
+"""
+PdfImageStore: extracted PDF images are deduplicated by xref and by content.
+
+Run from create_slide_template/:
+    python -m pytest -q tests
+"""
+import io
+import os
+import sys
+
+import fitz
+from PIL import Image
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.converters.image_store import PdfImageStore
+from src.converters.pdf_intelligent import IntelligentPdfParser
+
+
+def png_bytes(color) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (32, 24), color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class FakeDoc:
+    """extract_image() only, counting calls"""
+
+    def __init__(self, images):
+        self.images = images
+        self.calls = []
+
+    def extract_image(self, xref):
+        self.calls.append(xref)
+        return {"image": self.images[xref], "ext": "png"}
+
+
+def test_xref_and_digest_dedup(tmp_path):
+    logo, photo = png_bytes((255, 0, 0)), png_bytes((0, 0, 255))
+    # xrefs 1 and 2 are the same logo embedded twice
+    doc = FakeDoc({1: logo, 2: logo, 3: photo})
+    store = PdfImageStore(str(tmp_path))
+
+    paths = [store.path_for(doc, xref) for xref in (1, 1, 2, 3, 2)]
+    assert paths[0] == paths[1] == paths[2] == paths[4] != paths[3]
+    assert doc.calls == [1, 2, 3]
+    assert store.stats == {"extracted": 3, "written": 2, "xref_hits": 2, "digest_hits": 1}
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(p) for p in set(paths))
+    with open(paths[0], "rb") as f:
+        assert f.read() == logo
+
+
+def test_existing_files_are_not_rewritten(tmp_path):
+    doc = FakeDoc({1: png_bytes((0, 255, 0))})
+    path = PdfImageStore(str(tmp_path)).path_for(doc, 1)
+    mtime = os.stat(path).st_mtime_ns
+
+    store = PdfImageStore(str(tmp_path))
+    assert store.path_for(doc, 1) == path
+    assert store.stats["written"] == 0
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+def test_logo_on_every_page_is_written_once(tmp_path):
+    logo = png_bytes((200, 30, 30))
+    doc = fitz.open()
+    for i in range(4):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Heading {i}", fontsize=24)
+        page.insert_image(fitz.Rect(400, 20, 480, 80), stream=logo)
+    pdf = str(tmp_path / "logo.pdf")
+    doc.save(pdf)
+    doc.close()
+
+    image_dir = tmp_path / "images"
+    deck = IntelligentPdfParser().parse(pdf, str(image_dir))
+    paths = {content for slide in deck.slides for t, content, *_ in slide.elements.rows() if t == "image"}
+    assert len(paths) == 1
+    assert os.listdir(image_dir) == [os.path.basename(paths.pop())]
@@ -0,0 +1,79 @@
+"""
+Incremental builds: unchanged slides are transplanted from the previous output.
+
+Run from create_slide_template/:
+    python -m pytest -q tests
+"""
+import json
+import os
+import sys
+
+import pytest
+from PIL import Image
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.builder import incremental
+from src.builder.slide_builder import SlideBuilder
+from src.schema.slide_schema import ChartData, ChartType, PresentationDeck, SlideContent, SlideType
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', '..', 'original_templates', 'JMDC2022_16対9(標準)_v1.1.pptx')
+
+
+def make_deck(image_path: str, chart_title: str = "Sales") -> PresentationDeck:
+    chart = SlideContent(type=SlideType.CONTENT, title=chart_title,
+                         chart=ChartData(type=ChartType.COLUMN_CLUSTERED, title="売上",
+                                         categories=["2023", "2024"], series={"東京": [1.0, 2.0]}))
+    picture = SlideContent(type=SlideType.CONTENT, title="Picture")
+    picture.elements.append("image", image_path, [0.1, 0.2, 0.4, 0.4])
+    text = SlideContent(type=SlideType.CONTENT, title="Text", body="本文")
+    return PresentationDeck(title="Incremental", slides=[chart, picture, text])
+
+
+def build(deck, output):
+    return SlideBuilder(TEMPLATE).build(deck, output, incremental_build=True)
+
+
+@pytest.mark.skipif(not os.path.exists(TEMPLATE), reason="template not available")
+def test_unchanged_slides_are_reused_with_charts_and_pictures(tmp_path):
+    image_path = str(tmp_path / "photo.png")
+    Image.new("RGB", (64, 48), (200, 30, 30)).save(image_path)
+    output = str(tmp_path / "deck.pptx")
+
+    assert build(make_deck(image_path), output)["reused_slides"] == 0
+    assert build(make_deck(image_path), output)["reused_slides"] == 3
+    # Only the chart slide's title changes: the picture and text slides are transplanted
+    stats = build(make_deck(image_path, chart_title="Sales (edited)"), output)
+    assert (stats["slides"], stats["reused_slides"]) == (3, 2)
+
+    slides = list(Presentation(output).slides)[-3:]
+    assert slides[0].shapes.title.text == "Sales (edited)"
+    assert any(shape.has_chart for shape in slides[0].shapes)
+    pictures = [shape for shape in slides[1].shapes if shape.shape_type == MSO_SHAPE_TYPE.PICTURE]
+    with open(image_path, "rb") as f:
+        assert [p.image.blob for p in pictures] == [f.read()]
+
+    # Slides transplanted from an already transplanted slide keep their chart and picture too
+    assert build(make_deck(image_path, chart_title="Sales (edited)"), output)["reused_slides"] == 3
+    slides = list(Presentation(output).slides)[-3:]
+    assert any(shape.has_chart for shape in slides[0].shapes)
+    assert [s.shape_type for s in slides[1].shapes].count(MSO_SHAPE_TYPE.PICTURE) == 1
+
+
+def test_manifest_is_replaced_atomically(tmp_path, monkeypatch):
+    output = str(tmp_path / "deck.pptx")
+    incremental.write_manifest(output, "key-1", 2, ["a", "b"])
+
+    def broken_dump(obj, f, **kwargs):
+        f.write('{"build_key": ')
+        raise OSError("disk full")
+
+    monkeypatch.setattr(incremental.json, "dump", broken_dump)
+    with pytest.raises(OSError):
+        incremental.write_manifest(output, "key-2", 2, ["c"])
+
+    with open(incremental.manifest_path_for(output), encoding="utf-8") as f:
+        assert json.load(f) == {"build_key": "key-1", "slide_offset": 2, "slides": ["a", "b"]}
+    assert os.listdir(tmp_path) == [os.path.basename(incremental.manifest_path_for(output))]
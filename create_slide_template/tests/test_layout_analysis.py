@@ -0,0 +1,83 @@
+"""
+PDF text layout: wrapped lines are merged into paragraphs and paragraphs are put in reading order.
+
+Run from create_slide_template/:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import fitz
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.converters.layout_analysis import TextLine, TextParagraph, analyze_text_layout, merge_lines, reading_order
+
+
+def line(x0, y0, text, size=12.0, width=200.0, tabular=False):
+    return TextLine(x0, y0, x0 + width, y0 + size * 1.2, text, size, tabular)
+
+
+def paragraph(x0, y0, x1, text):
+    return TextParagraph(x0, y0, x1, y0 + 14, text, 12.0, 1)
+
+
+def test_wrapped_lines_become_one_paragraph():
+    paragraphs = merge_lines([
+        line(50, 100, "The quick brown"), line(50, 115, "fox jumps over"), line(50, 130, "the lazy dog."),
+        line(50, 200, "日本語の文章は行末で"), line(50, 215, "折り返されても空白を入れない。"),
+    ])
+    assert [(p.text, p.line_count) for p in paragraphs] == [
+        ("The quick brown fox jumps over the lazy dog.", 3),
+        ("日本語の文章は行末で折り返されても空白を入れない。", 2),
+    ]
+    assert (paragraphs[0].y0, paragraphs[0].y1) == (100, 130 + 12 * 1.2)
+
+
+def test_lines_are_not_merged_across_size_gap_or_tables():
+    paragraphs = merge_lines([
+        line(50, 100, "Heading", size=24), line(50, 130, "Body under the heading"),
+        # A gap larger than MAX_LINE_GAP starts a new paragraph
+        line(50, 160, "Next paragraph"),
+        line(50, 200, "Name   Value", tabular=True), line(50, 215, "Alpha   1", tabular=True),
+    ])
+    assert [p.text for p in paragraphs] == ["Heading", "Body under the heading", "Next paragraph",
+                                            "Name   Value", "Alpha   1"]
+
+
+def test_centered_lines_merge():
+    paragraphs = merge_lines([line(100, 100, "A centered title that wraps", width=300),
+                              line(160, 115, "onto a second line", width=180)])
+    assert [p.text for p in paragraphs] == ["A centered title that wraps onto a second line"]
+
+
+def test_columns_are_read_left_then_right_between_spanning_paragraphs():
+    page_width = 600
+    shuffled = [
+        paragraph(320, 120, 560, "right 1"),
+        paragraph(40, 400, 560, "full-width footer"),
+        paragraph(40, 180, 280, "left 2"),
+        paragraph(40, 40, 560, "full-width title"),
+        paragraph(320, 180, 560, "right 2"),
+        paragraph(40, 120, 280, "left 1"),
+        paragraph(40, 450, 280, "after footer"),
+    ]
+    assert [p.text for p in reading_order(shuffled, page_width)] == [
+        "full-width title", "left 1", "left 2", "right 1", "right 2", "full-width footer", "after footer"]
+
+
+def test_two_column_pdf_page():
+    doc = fitz.open()
+    page = doc.new_page(width=600, height=800)
+    page.insert_text((40, 60), "Report title spanning the whole page width here", fontsize=20)
+    for i, y in enumerate((120, 135, 150)):
+        page.insert_text((40, y), f"left column line {i}", fontsize=11)
+        page.insert_text((320, y), f"right column line {i}", fontsize=11)
+
+    paragraphs = analyze_text_layout(page.get_text("dict"), page.rect.width)
+    doc.close()
+    assert [p.text for p in paragraphs] == [
+        "Report title spanning the whole page width here",
+        "left column line 0 left column line 1 left column line 2",
+        "right column line 0 right column line 1 right column line 2",
+    ]
@@ -0,0 +1,62 @@
+"""
+MarkdownParser element directives.
+
+Run from create_slide_template/:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.markdown_parser.md_parser import MarkdownParser
+from src.markdown_parser.tokenizer import canonical_element, parse_params
+
+
+@pytest.mark.parametrize("directive", [
+    "type=text, size=big",
+    "type=text, rect=[0.1, 0.1, 0.2, 0.2], color=[0.5,1,2]",
+    "type=text, rect=0.5",
+    "type=text, rect=[a, b, c, d]",
+    "type=text, rect=[0.1, 0.1, 0.2, 0.2], size=[12]",
+    "type=text, rect=[0.1, 0.1",
+])
+def test_malformed_directive_is_skipped_with_warning(directive, capsys):
+    md = f"# Title\n<!-- element: {directive} -->\nloose line\n<!-- element: type=text, rect=[0.1, 0.2, 0.3, 0.4] -->\nkept\n"
+    slide = MarkdownParser().parse(md).slides[0]
+
+    assert "Skipping malformed element directive" in capsys.readouterr().out
+    assert [content for _, content, _, _, _, _ in slide.elements.rows()] == ["kept"]
+    assert slide.body == "loose line"
+
+
+def test_deck_to_md_directive_fast_path_matches_general_parser():
+    parser = MarkdownParser()
+    for directive in [
+        "type=text, rect=[0.1000, 0.2000, 0.3000, 0.0400], size=12.0, color=[51, 51, 51]",
+        "type=image, rect=[0.5000, 0.5000, 0.2500, 0.2500]",
+        "type=text, rect=[], size=9",
+        "type=text, rect=[1, 2, 3, 4], color=[]",
+    ]:
+        fields = canonical_element(directive)
+        assert fields is not None
+        assert (*fields, {}) == parser._element_fields(parse_params(directive))
+
+
+def test_attributes_after_canonical_fields():
+    assert parse_params("type=text, rect=[0.1, 0.2, 0.3, 0.4], size=12.0, bold=true, label=\"a, b\"") == {
+        "type": "text", "rect": [0.1, 0.2, 0.3, 0.4], "size": 12.0, "bold": True, "label": "a, b"}
+    assert canonical_element("type=text, rect=[0.1, 0.2, 0.3, 0.4], bold=true") is None
+
+
+def test_block_hashes_only_when_requested():
+    md = "# One\n---\n# Two\n"
+    parser = MarkdownParser()
+    parser.parse(md)
+    assert parser.slide_hashes == [] and parser.changed_slides == [0, 1]
+
+    parser = MarkdownParser(track_hashes=True)
+    parser.parse(md)
+    assert len(parser.slide_hashes) == 2 and parser.changed_slides == [0, 1]
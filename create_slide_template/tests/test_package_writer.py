@@ -0,0 +1,111 @@
+"""
+save_presentation: non-seekable outputs and the per-part compression policy.
+
+Run from create_slide_template/:
+    python -m pytest -q tests
+"""
+import io
+import os
+import sys
+import threading
+import zipfile
+
+import pytest
+from PIL import Image
+from pptx import Presentation
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.builder.package_writer import COMPRESSION_POLICIES, CompressionPolicy
+from src.builder.slide_builder import SlideBuilder
+from src.schema.slide_schema import PresentationDeck, SlideContent, SlideType
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', '..', 'original_templates', 'JMDC2022_16対9(標準)_v1.1.pptx')
+
+needs_template = pytest.mark.skipif(not os.path.exists(TEMPLATE), reason="template not available")
+
+
+class NonSeekable(io.RawIOBase):
+    """Write-only stream without tell()/seek(), like a socket"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def value(self) -> bytes:
+        return b"".join(self.chunks)
+
+
+@pytest.fixture
+def deck(tmp_path):
+    image_path = str(tmp_path / "photo.png")
+    Image.new("RGB", (64, 48), (20, 120, 200)).save(image_path)
+    slide = SlideContent(type=SlideType.CONTENT, title="Picture")
+    slide.elements.append("image", image_path, [0.1, 0.2, 0.4, 0.4])
+    return PresentationDeck(title="t", slides=[slide])
+
+
+@needs_template
+def test_non_seekable_stream(deck):
+    out = NonSeekable()
+    stats = SlideBuilder(TEMPLATE).build(deck, out)
+
+    data = out.value()
+    assert not out.closed
+    assert stats["bytes_written"] == len(data)
+    assert Presentation(io.BytesIO(data)).slides[-1].shapes.title.text == "Picture"
+
+
+@needs_template
+def test_pipe(deck):
+    read_fd, write_fd = os.pipe()
+    received = []
+    reader = threading.Thread(target=lambda: received.append(os.fdopen(read_fd, "rb").read()))
+    reader.start()
+    with os.fdopen(write_fd, "wb") as pipe:
+        stats = SlideBuilder(TEMPLATE).build(deck, pipe)
+    reader.join()
+
+    assert stats["bytes_written"] == len(received[0])
+    assert zipfile.ZipFile(io.BytesIO(received[0])).testzip() is None
+
+
+@needs_template
+def test_bytes_written_counts_from_the_current_position(deck):
+    buf = io.BytesIO()
+    buf.write(b"prefix")
+    stats = SlideBuilder(TEMPLATE).build(deck, buf)
+    assert stats["bytes_written"] == len(buf.getvalue()) - len(b"prefix")
+
+
+@needs_template
+@pytest.mark.parametrize("name", sorted(COMPRESSION_POLICIES))
+def test_compression_policy(deck, name):
+    buf = io.BytesIO()
+    stats = SlideBuilder(TEMPLATE).build(deck, buf, compression=name)
+    infos = zipfile.ZipFile(io.BytesIO(buf.getvalue())).infolist()
+
+    stored = [i.filename for i in infos if i.compress_type == zipfile.ZIP_STORED]
+    assert stats["parts"] == len(infos)
+    assert stats["stored_parts"] == len(stored)
+    assert stats["uncompressed_bytes"] == sum(i.file_size for i in infos)
+    pictures = [i.filename for i in infos if i.filename.startswith("ppt/media/") and i.filename.endswith(".png")]
+    assert pictures
+    if name == "legacy":
+        assert stored == []
+    else:
+        assert set(pictures) <= set(stored)
+        assert all(not f.endswith((".xml", ".rels")) for f in stored)
+
+
+def test_member_settings():
+    policy = CompressionPolicy(xml_level=0, binary_level=9, store_extensions=["png"])
+    assert policy.member_settings("ppt/media/image1.PNG") == (zipfile.ZIP_STORED, 0)
+    assert policy.member_settings("ppt/slides/slide1.xml") == (zipfile.ZIP_STORED, 0)
+    assert policy.member_settings("ppt/media/image2.emf") == (zipfile.ZIP_DEFLATED, 9)
@@ -0,0 +1,60 @@
+"""
+IntelligentPdfParser parallel mode.
+
+Run from create_slide_template/:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import fitz
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.converters.page_cache import PageCache
+from src.converters.pdf_intelligent import PARSER_VERSION, STATS_SAMPLE_PAGES, IntelligentPdfParser
+
+
+def make_pdf(path, n_pages):
+    doc = fitz.open()
+    for i in range(n_pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Heading {i}", fontsize=24)
+        page.insert_text((72, 120), f"Body text of page {i}", fontsize=11)
+    doc.save(path)
+    doc.close()
+
+
+def test_parallel_analyzes_each_page_once(tmp_path, capsys):
+    pdf = str(tmp_path / "deck.pdf")
+    n_pages = STATS_SAMPLE_PAGES + 36
+    make_pdf(pdf, n_pages)
+
+    sequential = IntelligentPdfParser().parse(pdf, str(tmp_path / "images_seq"))
+    parser = IntelligentPdfParser(workers=2, pages_per_task=8, page_cache_dir=str(tmp_path / "cache"))
+    parallel = parser.parse(pdf, str(tmp_path / "images_par"))
+
+    assert f"Page cache: 0 pages reused, {n_pages} analyzed" in capsys.readouterr().out
+    assert [s.title for s in parallel.slides] == [s.title for s in sequential.slides]
+    assert [s.type for s in parallel.slides] == [s.type for s in sequential.slides]
+
+
+def test_cover_page_shares_cache_entries_with_identical_pages(tmp_path):
+    doc = fitz.open()
+    for _ in range(3):
+        page = doc.new_page()
+        page.insert_text((72, 72), "Same heading", fontsize=24)
+        page.insert_text((72, 120), "Same body", fontsize=11)
+    pdf = str(tmp_path / "same.pdf")
+    doc.save(pdf)
+    doc.close()
+
+    cache = PageCache(str(tmp_path / "cache"), PARSER_VERSION)
+    with fitz.open(pdf) as doc:
+        assert len({cache.page_key(doc, page_num) for page_num in range(3)}) == 1
+
+    # The cached analysis is taken before the cover slide is classified, so sharing the entry is safe
+    uncached = IntelligentPdfParser().parse(pdf, str(tmp_path / "images"))
+    cached = IntelligentPdfParser(page_cache_dir=str(tmp_path / "cache")).parse(pdf, str(tmp_path / "images"))
+    assert [s.type for s in cached.slides] == [s.type for s in uncached.slides]
+    assert cached.slides[0].type != cached.slides[1].type
@@ -0,0 +1,71 @@
+"""
+Intermediate Markdown markers (convert_pdf.py decides whether to build from an edited intermediate).
+
+Run from create_slide_template/:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.converters.pdf_pipeline import (intermediate_edited, intermediate_stale, intermediate_unchanged,
+                                         tee_markdown, write_intermediate)
+from src.schema.slide_schema import SlideContent, SlideType
+
+
+def slides(n, fail_at=None):
+    for i in range(n):
+        if i == fail_at:
+            raise RuntimeError("extraction failed")
+        yield SlideContent(type=SlideType.CONTENT, title=f"Slide {i}")
+
+
+@pytest.fixture
+def paths(tmp_path):
+    pdf = tmp_path / "input.pdf"
+    pdf.write_bytes(b"%PDF-1.4 first version")
+    return str(pdf), str(tmp_path / "input_intermediate.md")
+
+
+def test_failed_stream_keeps_previous_intermediate(paths):
+    pdf, md = paths
+    list(tee_markdown(slides(3), md, pdf))
+    with open(md, encoding="utf-8") as f:
+        before = f.read()
+
+    with pytest.raises(RuntimeError):
+        list(tee_markdown(slides(3, fail_at=1), md, pdf))
+
+    with open(md, encoding="utf-8") as f:
+        assert f.read() == before
+    assert intermediate_unchanged(md)
+    assert not intermediate_edited(md, pdf)
+    assert [name for name in os.listdir(os.path.dirname(md)) if name.endswith(".tmp")] == []
+
+
+def test_closed_stream_keeps_previous_intermediate(paths):
+    pdf, md = paths
+    write_intermediate(md, "# old\n", pdf)
+    pages = tee_markdown(slides(3), md, pdf)
+    next(pages)
+    pages.close()
+    assert intermediate_unchanged(md)
+
+
+def test_edit_wins_only_for_the_same_pdf(paths):
+    pdf, md = paths
+    write_intermediate(md, "# extracted\n", pdf)
+    assert not intermediate_edited(md, pdf)
+
+    with open(md, "a", encoding="utf-8") as f:
+        f.write("edited\n")
+    assert intermediate_edited(md, pdf)
+    assert not intermediate_stale(md, pdf)
+
+    with open(pdf, "wb") as f:
+        f.write(b"%PDF-1.4 revised version")
+    assert not intermediate_edited(md, pdf)
+    assert intermediate_stale(md, pdf)
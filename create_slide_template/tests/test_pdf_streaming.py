@@ -0,0 +1,83 @@
+"""
+Streaming PDF extraction: pages in flight stay within max_in_flight while all workers are busy.
+
+Run from create_slide_template/:
+    python -m pytest -q tests
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.converters import pdf_intelligent
+from src.converters.pdf_intelligent import IntelligentPdfParser
+from src.converters.pdf_pipeline import bounded_stage
+from src.schema.slide_schema import SlideContent, SlideType
+
+LOG_DIR_ENV = "TEST_PDF_STREAMING_LOG"
+
+
+def slow_analyze_range(page_range):
+    """Stand-in for the worker: records which process analyzed which pages, and when"""
+    start = time.time()
+    time.sleep(0.1 * (page_range[1] - page_range[0]))
+    with open(os.path.join(os.environ[LOG_DIR_ENV], f"{page_range[0]}.log"), "w") as f:
+        f.write(f"{os.getpid()} {page_range[0]} {page_range[1]} {start} {time.time()}")
+    slides = [SlideContent(type=SlideType.CONTENT, title=f"Page {n}") for n in range(*page_range)]
+    return slides, {}, {}
+
+
+def read_log(log_dir):
+    ranges = []
+    for name in os.listdir(log_dir):
+        with open(os.path.join(log_dir, name)) as f:
+            pid, first, end, started, finished = f.read().split()
+            ranges.append((int(pid), int(first), int(end), float(started), float(finished)))
+    return ranges
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="relies on fork to run the patched worker function")
+@pytest.mark.parametrize("workers, max_in_flight", [(4, 8), (3, 8), (2, 1)])
+def test_pages_in_flight_are_bounded_and_workers_overlap(workers, max_in_flight, tmp_path, monkeypatch):
+    monkeypatch.setenv(LOG_DIR_ENV, str(tmp_path))
+    monkeypatch.setattr(pdf_intelligent, "_analyze_range", slow_analyze_range)
+    monkeypatch.setattr(pdf_intelligent, "_init_worker", lambda *args: None)
+    parser = IntelligentPdfParser(workers=workers, pages_per_task=16)
+    page_count = 24
+
+    consumed = []
+    for slide in parser._iter_parallel("unused.pdf", page_count, str(tmp_path), max_in_flight, None, {}):
+        consumed.append((time.time(), slide.title))
+        time.sleep(0.03) # slow consumer
+
+    assert [title for _, title in consumed] == [f"Page {n}" for n in range(page_count)]
+    ranges = read_log(tmp_path)
+    assert all(end - first <= max(1, max_in_flight // workers) for _, first, end, _, _ in ranges)
+    # Pages whose analysis had started, minus pages the consumer already took
+    for _, _, _, started, _ in ranges:
+        analyzed = sum(end - first for _, first, end, s, _ in ranges if s <= started)
+        taken = sum(1 for t, _ in consumed if t < started)
+        assert analyzed - taken <= max(max_in_flight, 1)
+    if max_in_flight >= workers:
+        overlapping_pids = {pid for pid, _, _, s, f in ranges
+                            for _, _, _, s2, f2 in ranges if s < f2 and s2 < f and (s, f) != (s2, f2)}
+        assert len(overlapping_pids) > 1
+
+
+def test_bounded_stage_holds_at_most_maxsize_plus_one():
+    produced = []
+
+    def pages():
+        for i in range(20):
+            produced.append(i)
+            yield i
+
+    stage = bounded_stage(pages(), 3)
+    assert next(stage) == 0
+    time.sleep(0.3)
+    # 1 consumed, 3 queued, 1 waiting for room in the queue
+    assert len(produced) == 5
+    assert list(stage) == list(range(1, 20))
@@ -0,0 +1,66 @@
+"""
+PdfToMarkdownConverter: text backends and parallel extraction produce the same Markdown.
+
+Run from create_slide_template/:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import fitz
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.converters.pdf_to_md import TEXT_BACKENDS, PdfToMarkdownConverter
+from src.markdown_parser.md_parser import MarkdownParser
+
+N_PAGES = 23
+
+
+@pytest.fixture(scope="module")
+def pdf(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("pdf") / "deck.pdf")
+    doc = fitz.open()
+    for i in range(N_PAGES):
+        page = doc.new_page()
+        if i == 5:
+            continue # blank page: no slide
+        page.insert_text((72, 72), f"Title {i}", fontsize=24)
+        page.insert_text((72, 110), f"Subtitle {i}", fontsize=14)
+        page.insert_text((72, 150), f"- bullet {i}", fontsize=11)
+        page.insert_text((72, 170), f"Body line of page {i}", fontsize=11)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def slide_fields(md):
+    return [(s.type, s.title, s.subtitle, s.body) for s in MarkdownParser().parse(md).slides]
+
+
+def test_backends_agree(pdf):
+    converter = PdfToMarkdownConverter()
+    markdown = {name: converter.convert(pdf, backend=name) for name in TEXT_BACKENDS}
+    fields = {name: slide_fields(md) for name, md in markdown.items()}
+
+    assert len(fields["pymupdf"]) == N_PAGES - 1
+    assert fields["pypdf"] == fields["pymupdf"]
+    assert fields["pymupdf"][1][1:3] == ("Title 1", "Subtitle 1")
+
+
+@pytest.mark.parametrize("backend", sorted(TEXT_BACKENDS))
+def test_parallel_matches_sequential(pdf, backend, tmp_path):
+    sequential = PdfToMarkdownConverter(backend=backend).convert(pdf)
+    parallel = PdfToMarkdownConverter(backend=backend, workers=2, pages_per_task=4)
+    assert parallel.convert(pdf) == sequential
+
+    md_path = str(tmp_path / "out" / "deck.md")
+    assert parallel.convert_to_file(pdf, md_path) == N_PAGES - 1
+    with open(md_path, encoding="utf-8") as f:
+        assert f.read() == sequential
+
+
+def test_unknown_backend(pdf):
+    with pytest.raises(ValueError, match="Unknown PDF text backend"):
+        PdfToMarkdownConverter(backend="pdfminer").convert(pdf)
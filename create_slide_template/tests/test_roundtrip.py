@@ -0,0 +1,96 @@
+"""
+Round trip of positioned elements: deck -> intermediate Markdown -> parse -> PPTX.
+
+Run from create_slide_template/:
+    python -m pytest -q tests
+"""
+import io
+import json
+import os
+import sys
+
+import pytest
+from pptx import Presentation
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.builder.slide_builder import SlideBuilder
+from src.converters.deck_to_md import DeckToMarkdownConverter
+from src.markdown_parser.md_parser import MarkdownParser
+from src.schema.slide_schema import PresentationDeck, SlideContent, SlideType
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', '..', 'original_templates', 'JMDC2022_16対9(標準)_v1.1.pptx')
+
+
+def make_deck() -> PresentationDeck:
+    slide = SlideContent(type=SlideType.CONTENT, title="Bold round trip")
+    slide.elements.append("text", "Bold heading", [0.1, 0.1, 0.5, 0.1], 24.0, None, {"bold": True})
+    slide.elements.append("text", "Regular body", [0.1, 0.3, 0.5, 0.1], 12.0, None, {"bold": False})
+    slide.elements.append("text", "No attribute", [0.1, 0.5, 0.5, 0.1], 12.0)
+    return PresentationDeck(title="Round trip", slides=[slide])
+
+
+def test_bold_attribute_is_parsed_as_bool():
+    md = DeckToMarkdownConverter().convert(make_deck())
+    assert "bold=true" in md
+
+    deck = MarkdownParser().parse(md)
+    attributes = [attrs for _, _, _, _, _, attrs in deck.slides[0].elements.rows()]
+    assert attributes == [{"bold": True}, {"bold": False}, {}]
+
+
+@pytest.mark.skipif(not os.path.exists(TEMPLATE), reason="template not available")
+def test_deck_markdown_parse_build():
+    md = DeckToMarkdownConverter().convert(make_deck())
+    deck = MarkdownParser().parse(md)
+
+    buf = io.BytesIO()
+    SlideBuilder(TEMPLATE, image_pipeline=None).build(deck, buf)
+
+    runs = {}
+    for shape in Presentation(io.BytesIO(buf.getvalue())).slides[-1].shapes:
+        if shape.has_text_frame:
+            for paragraph in shape.text_frame.paragraphs:
+                for run in paragraph.runs:
+                    runs[run.text] = run.font.bold
+    assert runs["Bold heading"] is True
+    assert runs["Regular body"] is False
+    assert runs["No attribute"] is False
+
+
+@pytest.mark.skipif(not os.path.exists(TEMPLATE), reason="template not available")
+def test_missing_placeholder_warning_is_printed_once_per_template(tmp_path, capsys):
+    mapping = tmp_path / "layout_mapping.json"
+    mapping.write_text(json.dumps({"layouts": {"コンテンツ": {"title": {"idx": 0}, "body": {"idx": 999}}}}),
+                       encoding="utf-8")
+
+    SlideBuilder(TEMPLATE, layout_mapping_path=str(mapping), image_pipeline=None)
+    assert capsys.readouterr().out.count("Placeholder idx 999") == 1
+    SlideBuilder(TEMPLATE, layout_mapping_path=str(mapping), image_pipeline=None)
+    assert "Placeholder idx" not in capsys.readouterr().out
+
+
+@pytest.mark.skipif(not os.path.exists(TEMPLATE), reason="template not available")
+def test_pictures_are_embedded_unchanged_by_default():
+    assert SlideBuilder(TEMPLATE).image_pipeline is None
+
+
+@pytest.mark.skipif(not os.path.exists(TEMPLATE), reason="template not available")
+def test_failing_placeholder_does_not_lose_the_rest_of_the_slide(monkeypatch, capsys):
+    builder = SlideBuilder(TEMPLATE, image_pipeline=None)
+    apply_text_style = builder._apply_text_style
+
+    def flaky(shape, style_type, text):
+        if text == "Broken":
+            raise ValueError("bad run")
+        apply_text_style(shape, style_type, text)
+
+    monkeypatch.setattr(builder, "_apply_text_style", flaky)
+    buf = io.BytesIO()
+    builder.build(PresentationDeck(title="t", slides=[
+        SlideContent(type=SlideType.CONTENT, title="Broken", body="Body survives")]), buf)
+
+    assert "Warning: Failed to fill placeholder" in capsys.readouterr().out
+    texts = [shape.text_frame.text for shape in Presentation(io.BytesIO(buf.getvalue())).slides[-1].shapes
+             if shape.has_text_frame]
+    assert "Body survives" in texts
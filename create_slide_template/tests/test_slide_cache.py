@@ -0,0 +1,75 @@
+"""
+SlideCache: re-parsing an edited deck only re-parses the changed slide blocks.
+
+Run from create_slide_template/:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.markdown_parser import slide_cache
+from src.markdown_parser.md_parser import MarkdownParser
+from src.markdown_parser.slide_cache import SlideCache
+
+DECK = "# One\nfirst body\n---\n# Two\n```chart:column\n売上\n部門, 2024年\n営業1課, 650\n```\n---\n# Three\nthird body\n"
+
+
+def test_only_changed_slides_are_reparsed():
+    parser = MarkdownParser(cache=SlideCache())
+    first = parser.parse(DECK)
+    assert parser.changed_slides == [0, 1, 2]
+    assert (parser.cache.hits, parser.cache.misses) == (0, 3)
+
+    assert parser.parse(DECK) == first
+    assert parser.changed_slides == []
+    assert parser.cache.hits == 3
+
+    edited = DECK.replace("third body", "third body, edited")
+    deck = parser.parse(edited)
+    assert parser.changed_slides == [2]
+    assert deck == MarkdownParser().parse(edited)
+    # Whitespace around a block does not change its hash
+    parser.parse(DECK.replace("# Two", "\n\n# Two"))
+    assert parser.changed_slides == []
+
+
+def test_disk_cache_is_reused_across_instances(tmp_path):
+    parser = MarkdownParser(cache=SlideCache(str(tmp_path)))
+    expected = parser.parse(DECK)
+    assert len(os.listdir(tmp_path)) == 3
+
+    parser = MarkdownParser(cache=SlideCache(str(tmp_path)))
+    assert parser.parse(DECK) == expected
+    assert parser.changed_slides == []
+
+
+def test_parser_version_invalidates_entries(tmp_path, monkeypatch):
+    MarkdownParser(cache=SlideCache(str(tmp_path))).parse(DECK)
+
+    monkeypatch.setattr(slide_cache, "PARSER_VERSION", slide_cache.PARSER_VERSION + "-next")
+    parser = MarkdownParser(cache=SlideCache(str(tmp_path)))
+    parser.parse(DECK)
+    assert parser.changed_slides == [0, 1, 2]
+
+
+def test_unreadable_entry_is_reparsed(tmp_path, capsys):
+    MarkdownParser(cache=SlideCache(str(tmp_path))).parse(DECK)
+    for name in os.listdir(tmp_path):
+        (tmp_path / name).write_text("{not json", encoding="utf-8")
+
+    parser = MarkdownParser(cache=SlideCache(str(tmp_path)))
+    assert parser.parse(DECK) == MarkdownParser().parse(DECK)
+    assert parser.changed_slides == [0, 1, 2]
+    assert "Ignoring unreadable slide cache entry" in capsys.readouterr().out
+
+
+def test_memory_cache_is_bounded():
+    cache = SlideCache(max_entries=2)
+    parser = MarkdownParser(cache=cache)
+    parser.parse(DECK)
+    assert len(cache._memory) == 2
+    # Without a cache_dir the evicted first slide has to be parsed again
+    parser.parse(DECK)
+    assert 0 in parser.changed_slides
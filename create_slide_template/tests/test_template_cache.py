@@ -0,0 +1,80 @@
+"""
+TemplateCache: every SlideBuilder gets an independent copy of the parsed template.
+
+Run from create_slide_template/:
+    python -m pytest -q tests
+"""
+import io
+import os
+import shutil
+import sys
+
+import pytest
+from pptx import Presentation
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.builder.slide_builder import SlideBuilder
+from src.builder.template_cache import TemplateCache
+from src.schema.slide_schema import PresentationDeck, SlideContent, SlideType
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', '..', 'original_templates', 'JMDC2022_16対9(標準)_v1.1.pptx')
+
+pytestmark = pytest.mark.skipif(not os.path.exists(TEMPLATE), reason="template not available")
+
+
+def build(builder, titles):
+    deck = PresentationDeck(title="t", slides=[SlideContent(type=SlideType.CONTENT, title=t) for t in titles])
+    buf = io.BytesIO()
+    builder.build(deck, buf)
+    return Presentation(io.BytesIO(buf.getvalue()))
+
+
+def test_copies_are_independent():
+    cache = TemplateCache()
+    n_template_slides = len(Presentation(TEMPLATE).slides)
+
+    first = SlideBuilder(TEMPLATE, template_cache=cache)
+    second = SlideBuilder(TEMPLATE, template_cache=cache)
+    assert first.prs is not second.prs
+    first.prs.core_properties.title = "changed by the first builder"
+
+    a = build(first, ["A1", "A2"])
+    b = build(second, ["B1"])
+    assert len(a.slides) == n_template_slides + 2
+    assert len(b.slides) == n_template_slides + 1
+    assert b.slides[-1].shapes.title.text == "B1"
+    assert b.core_properties.title != "changed by the first builder"
+
+    # A builder created after both builds still starts from the unmodified template
+    third = SlideBuilder(TEMPLATE, template_cache=cache)
+    assert len(third.prs.slides) == n_template_slides
+    assert len(cache._templates) == 1
+
+
+def test_cached_copy_builds_the_same_slides_as_a_fresh_load():
+    cached = build(SlideBuilder(TEMPLATE, template_cache=TemplateCache()), ["Same"])
+    fresh = build(SlideBuilder(TEMPLATE, template_cache=None), ["Same"])
+    assert [s.slide_layout.name for s in cached.slides] == [s.slide_layout.name for s in fresh.slides]
+    assert [[sh.name for sh in s.shapes] for s in cached.slides] == [[sh.name for sh in s.shapes] for s in fresh.slides]
+
+
+def test_entries_are_keyed_by_content(tmp_path):
+    cache = TemplateCache()
+    template = str(tmp_path / "template.pptx")
+    shutil.copy(TEMPLATE, template)
+    cache.load(template)
+
+    # Same content under another mtime (and another path) shares the parsed master
+    os.utime(template, ns=(1, 1))
+    cache.load(template)
+    copy_path = str(tmp_path / "copy.pptx")
+    shutil.copy(TEMPLATE, copy_path)
+    cache.load(copy_path)
+    assert len(cache._templates) == 1
+
+    prs = Presentation(template)
+    prs.core_properties.title = "edited template"
+    prs.save(template)
+    assert cache.load(template).core_properties.title == "edited template"
+    assert len(cache._templates) == 2
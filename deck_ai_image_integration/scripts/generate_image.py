@@ -1,20 +1,31 @@
 import argparse
 import os
 import sys
-import base64
-import requests
-import json
 
-def generate_image(prompt_file, output_file):
-    """
-    Generates an image using Gemini/Imagen API based on the prompt in prompt_file
-    and saves it to output_file.
+# Shared image generation client (create_slide_template/src/utils/image_client.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'create_slide_template'))
+try:
+    from src.utils.image_client import DEFAULT_BASE_URL, ImageGenerationClient, ImageGenerationError
+except ImportError as e:
+    sys.exit(f"Error: {e}. This script needs the sibling create_slide_template directory (../create_slide_template); see README.md.")
+
+def sample_paths(output_file, samples):
+    """output.png for one sample, output_1.png, output_2.png, ... for several"""
+    if samples <= 1:
+        return [output_file]
+    base, ext = os.path.splitext(output_file)
+    return [f"{base}_{i}{ext}" for i in range(1, samples + 1)]
+
+def generate_image(prompt_file, output_file, base_url=DEFAULT_BASE_URL, samples=1):
     """
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        print("Error: GEMINI_API_KEY environment variable not set.", file=sys.stderr)
-        sys.exit(1)
+    Generates `samples` images (sampleCount) using Gemini/Imagen API based on the
+    prompt in prompt_file and saves them to output_file (see sample_paths).
 
+    The request itself (connection pooling, retry with backoff on 429/5xx) is done by
+    ImageGenerationClient, which process_slides.py also uses in-process. The response
+    is streamed and decoded straight into the files, so memory does not grow with
+    the image size or the number of samples.
+    """
     try:
         with open(prompt_file, 'r', encoding='utf-8') as f:
             prompt = f.read().strip()
@@ -28,66 +39,26 @@ def generate_image(prompt_file, output_file):
 
     print(f"Generating image for prompt: {prompt[:50]}...")
 
-    # API Endpoint for Imagen on Google AI Studio
-    # Note: Using v1beta/models/imagen-3.0-generate-001:predict
+    # Model: imagen-3.0-generate-001 via v1beta/models/...:predict (see image_client.DEFAULT_MODEL).
     # If this specific model/endpoint is not available for the key, it will fail.
-    # Users may need to adjust the model name (e.g. to 'gemini-2.0-flash-exp' if that supports image gen via generateContent).
-    
-    # Attempt 1: Imagen 3.0 via REST
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/imagen-3.0-generate-001:predict?key={api_key}"
-    headers = {
-        "Content-Type": "application/json"
-    }
-    data = {
-        "instances": [
-            {"prompt": prompt}
-        ],
-        "parameters": {
-            "sampleCount": 1,
-            "aspectRatio": "16:9" # Useful for slides
-        }
-    }
-
     try:
-        response = requests.post(url, headers=headers, json=data)
-        
-        if response.status_code != 200:
-            print(f"Error calling API: {response.status_code} - {response.text}", file=sys.stderr)
-            # Fallback suggestion or handling specific errors could go here
-            sys.exit(1)
-            
-        result = response.json()
-        
-        # Parse the response (structure depends on the specific endpoint version, but typically:)
-        # { "predictions": [ { "bytesBase64Encoded": "..." } ] }
-        # OR 
-        # { "predictions": [ { "mimeType": "image/png", "bytesBase64Encoded": "..." } ] }
-        
-        predictions = result.get("predictions")
-        if not predictions:
-            print(f"No predictions found in response: {result}", file=sys.stderr)
-            sys.exit(1)
-            
-        image_data_b64 = predictions[0].get("bytesBase64Encoded")
-        if not image_data_b64:
-             print(f"No image data in prediction: {predictions[0]}", file=sys.stderr)
-             sys.exit(1)
-             
-        image_bytes = base64.b64decode(image_data_b64)
-        
-        with open(output_file, "wb") as f:
-            f.write(image_bytes)
-            
-        print(f"Image successfully saved to {output_file}")
-
-    except Exception as e:
-        print(f"Exception during generation: {e}", file=sys.stderr)
+        with ImageGenerationClient(base_url=base_url) as client:
+            written = client.generate_to_files(prompt, sample_paths(output_file, samples))
+    except (ImageGenerationError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
 
+    for path in written:
+        print(f"Image successfully saved to {path}")
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate image from prompt file.")
     parser.add_argument("prompt_file", help="Path to file containing the prompt")
     parser.add_argument("-o", "--output", required=True, help="Path to output image file")
+    parser.add_argument("--api-base-url", default=DEFAULT_BASE_URL,
+                        help="Image API base URL (default: $IMAGE_API_BASE_URL or Google AI Studio)")
+    parser.add_argument("-n", "--samples", type=int, default=1,
+                        help="Number of images to generate (sampleCount); saved as OUTPUT_1.png, OUTPUT_2.png, ... when > 1")
     args = parser.parse_args()
     
-    generate_image(args.prompt_file, args.output)
+    generate_image(args.prompt_file, args.output, args.api_base_url, args.samples)
@@ -3,19 +3,111 @@ import os
 import re
 import subprocess
 import sys
-import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-def generate_image_filename(prompt):
-    """Generates a consistent filename based on the prompt hash."""
-    prompt_hash = hashlib.md5(prompt.encode('utf-8')).hexdigest()[:8]
-    return f"ai_gen_{prompt_hash}.png"
+# Shared image generation client and generated-image cache (create_slide_template/src/utils/)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'create_slide_template'))
+try:
+    from src.utils.image_client import DEFAULT_BASE_URL, ImageGenerationClient, ImageGenerationError
+    from src.utils.generated_image_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, GeneratedImageCache
+except ImportError as e:
+    sys.exit(f"Error: {e}. This script needs the sibling create_slide_template directory (../create_slide_template); see README.md.")
 
-def process_slides(input_file, execute_deck=True):
+# Regex to find ai-image blocks
+# Looking for ```ai-image ... ```
+# capturing the content inside.
+AI_IMAGE_PATTERN = re.compile(r'```ai-image\s+(.*?)```', re.DOTALL)
+
+OUTPUT_DIR = "assets/generated"
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TIMEOUT = 120 # seconds per API request attempt (connect to last byte), retries not included
+DEFAULT_REQUESTS_PER_MINUTE = 60
+
+def generate_image_filename(client, prompt):
+    """
+    Generates a consistent filename from the SHA-256 of the prompt, model and
+    generation parameters (the same key as the generated-image cache).
+    """
+    return f"ai_gen_{client.cache_key(prompt)}.png"
+
+def collect_prompts(content):
+    """Returns the unique non-empty prompts of the ai-image blocks, in document order."""
+    prompts = []
+    seen = set()
+    for match in AI_IMAGE_PATTERN.finditer(content):
+        prompt = match.group(1).strip()
+        if prompt and prompt not in seen:
+            seen.add(prompt)
+            prompts.append(prompt)
+    return prompts
+
+def image_path_for(client, prompt):
+    return os.path.join(OUTPUT_DIR, generate_image_filename(client, prompt))
+
+def generate_one(client, image_cache, prompt):
+    """
+    Generates the image for one prompt in-process (or takes it from the cache)
+    and returns the Markdown that replaces its ai-image block.
+    """
+    output_path = image_path_for(client, prompt)
+    print(f"Generating image for: {os.path.basename(output_path)}")
+    try:
+        # Cache and file errors are raised as ImageGenerationError too, so one failed image never aborts the run
+        client.generate_cached_to(prompt, image_cache, output_path)
+    except ImageGenerationError as e:
+        print(f"Error generating image: {e}")
+        # Leave a placeholder text error in the slide
+        return f"**FAILED TO GENERATE IMAGE: {prompt}**"
+    print(f"Image successfully saved to {output_path}")
+    return f"![{prompt}]({output_path})"
+
+def generate_all(prompts, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT,
+                 requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, image_cache=None, base_url=DEFAULT_BASE_URL):
+    """
+    Generates the images of all prompts with at most `concurrency` API requests in flight.
+    Returns {prompt: replacement Markdown}.
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    image_cache = image_cache or GeneratedImageCache()
+    # One client for all images: pooled keep-alive connections, retries and the rate limit are shared
+    client = ImageGenerationClient(timeout=timeout, requests_per_minute=requests_per_minute,
+                                   pool_size=max(1, concurrency), base_url=base_url)
+
+    replacements = {}
+    missing = []
+    for prompt in prompts:
+        # Check if it exists to save time/cost
+        output_path = image_path_for(client, prompt)
+        if os.path.exists(output_path):
+            print(f"Image already exists, skipping generation: {os.path.basename(output_path)}")
+            replacements[prompt] = f"![{prompt}]({output_path})"
+        else:
+            missing.append(prompt)
+
+    with client:
+        if concurrency <= 1 or len(missing) <= 1:
+            replacements.update((prompt, generate_one(client, image_cache, prompt)) for prompt in missing)
+        else:
+            # Each job mostly waits on one HTTP round trip, so threads are enough
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                futures = {prompt: pool.submit(generate_one, client, image_cache, prompt) for prompt in missing}
+                replacements.update((prompt, future.result()) for prompt, future in futures.items())
+    if missing:
+        print(f"Image API: {client.stats['requests']} requests ({client.stats['retries']} retries), "
+              f"cache: {image_cache.stats['hits']} hits, {image_cache.stats['misses']} misses")
+    return replacements
+
+def process_slides(input_file, execute_deck=True, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT,
+                   requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, image_cache=None, base_url=DEFAULT_BASE_URL):
     """
     Parses the input markdown file, finds 'ai-image' blocks,
-    generates images using generate_image.py, and creates a processed
+    generates images with ImageGenerationClient, and creates a processed
     markdown file with standard image links.
+
+    Phase 1 collects the unique prompts, phase 2 generates them concurrently
+    (at most `concurrency` at a time, `timeout` seconds per API request), and
+    the results are then substituted back in document order.
     """
     
     if not os.path.exists(input_file):
@@ -25,66 +117,18 @@ def process_slides(input_file, execute_deck=True):
     with open(input_file, 'r', encoding='utf-8') as f:
         content = f.read()
 
-    # Regex to find ai-image blocks
-    # Looking for ```ai-image ... ```
-    # capturing the content inside.
-    pattern = re.compile(r'```ai-image\s+(.*?)```', re.DOTALL)
+    prompts = collect_prompts(content)
+    for prompt in prompts:
+        print(f"Found ai-image prompt: {prompt[:30]}...")
+
+    replacements = generate_all(prompts, concurrency, timeout, requests_per_minute, image_cache, base_url)
 
     def replace_match(match):
         prompt = match.group(1).strip()
-        if not prompt:
-            return match.group(0) # parsing error or empty, leave it? or warn.
-        
-        print(f"Found ai-image prompt: {prompt[:30]}...")
-        
-        # Ensure regex doesn't capture leading/trailing newline issues if user formatted weirdly
-        # The prompt is literally the text inside the block.
-        
-        # Prepare output directory
-        output_dir = "assets/generated"
-        os.makedirs(output_dir, exist_ok=True)
-        
-        filename = generate_image_filename(prompt)
-        output_path = os.path.join(output_dir, filename)
-        
-        # Check if we should generate (could skip if exists, but for now force or check?)
-        # Let's check if it exists to save time/cost, unless forced.
-        # For this implementation, we will check if it exists.
-        
-        if not os.path.exists(output_path):
-            print(f"Generating image for: {filename}")
-            
-            # Create a localized temp prompt file to pass to generate_image.py
-            # because generate_image.py expects a file path.
-            temp_prompt_file = f"_temp_prompt_{filename}.txt"
-            with open(temp_prompt_file, 'w', encoding='utf-8') as tf:
-                tf.write(prompt)
-            
-            # Call generate_image.py
-            cmd = [
-                sys.executable,
-                "scripts/generate_image.py",
-                temp_prompt_file,
-                "-o", output_path
-            ]
-            
-            try:
-                subprocess.run(cmd, check=True)
-            except subprocess.CalledProcessError as e:
-                print(f"Error generating image: {e}")
-                # If generation fails, maybe keep the block or put a placeholder?
-                # For now, we'll error out or leave the block?
-                # Let's leave a placeholder text error in the slide
-                return f"**FAILED TO GENERATE IMAGE: {prompt}**"
-            finally:
-                if os.path.exists(temp_prompt_file):
-                    os.remove(temp_prompt_file)
-        else:
-            print(f"Image already exists, skipping generation: {filename}")
-
-        return f"![{prompt}]({output_path})"
+        # Empty blocks are left as they are
+        return replacements.get(prompt, match.group(0))
 
-    new_content = pattern.sub(replace_match, content)
+    new_content = AI_IMAGE_PATTERN.sub(replace_match, content)
 
     # Output processed file
     base, ext = os.path.splitext(input_file)
@@ -112,7 +156,26 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Process markdown for AI images and run deck.")
     parser.add_argument("input_file", help="Input markdown file")
     parser.add_argument("--no-deck", action="store_true", help="Skip running deck, just generate markdown")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Maximum number of images generated at the same time (default: {DEFAULT_CONCURRENCY}, 1 = one by one)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help=f"Timeout in seconds for each API request attempt, from connecting to reading the "
+                             f"last byte; retries get a new timeout (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument("--requests-per-minute", type=float, default=DEFAULT_REQUESTS_PER_MINUTE,
+                        help=f"Client-side rate limit of API requests (default: {DEFAULT_REQUESTS_PER_MINUTE}, 0 = unlimited)")
+    parser.add_argument("--api-base-url", default=DEFAULT_BASE_URL,
+                        help="Image API base URL, e.g. a local benchmarks/fake_imagen_server.py "
+                             "(default: $IMAGE_API_BASE_URL or Google AI Studio)")
+    
+    parser.add_argument("--image-cache-dir", default=DEFAULT_CACHE_DIR,
+                        help=f"Generated-image cache shared across runs and projects (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--image-cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / (1 << 20),
+                        help="Size budget of the generated-image cache; least recently used images are evicted (default: 1024)")
     
     args = parser.parse_args()
     
-    process_slides(args.input_file, execute_deck=not args.no_deck)
+    image_cache = GeneratedImageCache(args.image_cache_dir, max_bytes=int(args.image_cache_max_mb * (1 << 20)))
+    process_slides(args.input_file, execute_deck=not args.no_deck,
+                   concurrency=args.concurrency, timeout=args.timeout,
+                   requests_per_minute=args.requests_per_minute or None,
+                   image_cache=image_cache, base_url=args.api_base_url)
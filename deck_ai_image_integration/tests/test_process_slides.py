@@ -0,0 +1,128 @@
+"""
+process_slides.py: duplicate ai-image prompts are generated once, concurrently, and a
+request that times out becomes an error placeholder without stopping the others.
+
+Run from deck_ai_image_integration/:
+    python -m pytest -q tests
+(needs the sibling ../create_slide_template, see README.md)
+"""
+import base64
+import io
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import process_slides
+from src.utils.generated_image_cache import GeneratedImageCache
+
+SLOW_SECONDS = 3.0
+LATENCY = 0.3
+
+
+@pytest.fixture
+def server():
+    """Answers after LATENCY seconds, or SLOW_SECONDS for prompts containing "slow"; records prompts and peak concurrency"""
+    buf = io.BytesIO()
+    Image.new("RGB", (16, 9), (0, 128, 255)).save(buf, format="PNG")
+    body = json.dumps({"predictions": [{"bytesBase64Encoded": base64.b64encode(buf.getvalue()).decode()}]}).encode()
+    state = {"prompts": Counter(), "active": 0, "peak": 0, "lock": threading.Lock()}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            prompt = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["instances"][0]["prompt"]
+            with state["lock"]:
+                state["prompts"][prompt] += 1
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            try:
+                time.sleep(SLOW_SECONDS if "slow" in prompt else LATENCY)
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except OSError:
+                pass
+            finally:
+                with state["lock"]:
+                    state["active"] -= 1
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    state["base_url"] = f"http://127.0.0.1:{httpd.server_port}/v1beta/models"
+    yield state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # OUTPUT_DIR (assets/generated) is relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GEMINI_API_KEY", "dummy")
+    return tmp_path
+
+
+def run(workdir, server, markdown, **kwargs):
+    (workdir / "deck.md").write_text(markdown, encoding="utf-8")
+    # No client-side rate limit: the default 60/min would space out the request starts by a second
+    process_slides.process_slides("deck.md", execute_deck=False, base_url=server["base_url"], requests_per_minute=None,
+                                  image_cache=GeneratedImageCache(str(workdir / "cache")), **kwargs)
+    return (workdir / "deck_processed.md").read_text(encoding="utf-8")
+
+
+def block(prompt):
+    return f"```ai-image\n{prompt}\n```\n"
+
+
+def test_duplicate_prompts_are_generated_once_and_concurrently(workdir, server):
+    prompts = ["a red apple", "a blue car", "a green tree", "a yellow sun"]
+    markdown = "# Slides\n" + "".join(block(p) for p in prompts + prompts[:2]) + "```ai-image\n```\n"
+
+    t0 = time.monotonic()
+    output = run(workdir, server, markdown, concurrency=4)
+    elapsed = time.monotonic() - t0
+
+    assert server["prompts"] == Counter(prompts)
+    assert server["peak"] > 1
+    assert elapsed < len(prompts) * LATENCY
+    # Every occurrence is replaced by the same image link; the empty block is left as it is
+    links = [line for line in output.splitlines() if line.startswith("![")]
+    assert len(links) == 6 and links[0] == links[4] and links[1] == links[5]
+    assert len(set(links)) == 4
+    assert "```ai-image\n```" in output
+    for link in set(links):
+        assert os.path.exists(link[link.index("](") + 2:-1])
+
+
+def test_concurrency_one_is_sequential(workdir, server):
+    run(workdir, server, "".join(block(p) for p in ["one", "two", "three"]), concurrency=1)
+    assert server["peak"] == 1
+
+
+def test_timeout_leaves_a_placeholder_and_other_images_finish(workdir, server, monkeypatch):
+    # One retry without backoff, so the timed-out prompt costs two request timeouts
+    client_class = process_slides.ImageGenerationClient
+    monkeypatch.setattr(process_slides, "ImageGenerationClient",
+                        lambda **kwargs: client_class(max_retries=1, backoff_base=0.0, **kwargs))
+
+    t0 = time.monotonic()
+    output = run(workdir, server, block("a slow drawing") + block("a quick sketch"), concurrency=2, timeout=1.0)
+    elapsed = time.monotonic() - t0
+
+    assert "**FAILED TO GENERATE IMAGE: a slow drawing**" in output
+    assert "![a quick sketch](" in output
+    assert server["prompts"]["a slow drawing"] == 2
+    assert elapsed < 2 * SLOW_SECONDS